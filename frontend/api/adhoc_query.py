@@ -0,0 +1,267 @@
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, List, Optional, Sequence, Tuple
+
+import psycopg2
+import psycopg2.extensions
+
+from .db_config import db_config
+
+
+class QueryCancelled(Exception):
+    """Запрос остановлен пользователем или по statement_timeout"""
+
+    def __init__(self, message: str, timed_out: bool = False):
+        super().__init__(message)
+        self.timed_out = timed_out
+
+
+class QueryLimitReached(Exception):
+    """Уже выполняется максимальное число пользовательских запросов"""
+
+
+# Общий лимит одновременных пользовательских запросов (каждый занимает соединение пула)
+_slots = threading.BoundedSemaphore(max(1, db_config.adhoc_max_queries))
+
+
+class AdhocQuery:
+    """Один пользовательский SQL-запрос (построитель запросов, текстовый поиск).
+
+    Выполняется с statement_timeout в собственной транзакции, которая всегда
+    откатывается. run() блокирует вызывающий (фоновый) поток; cancel() можно
+    вызвать из любого потока - серверу отправляется отмена текущего запроса.
+    """
+
+    def __init__(self, db, sql: str, params: Optional[Sequence[Any]] = None, timeout: Optional[float] = None):
+        self.db = db
+        self.sql = sql
+        self.params = params
+        self.timeout = db_config.adhoc_timeout if timeout is None else timeout
+
+        self.started_at = None
+        self.finished_at = None
+        self.cancelled = False
+        self._conn = None
+        self._lock = threading.Lock()
+
+    @property
+    def elapsed(self) -> float:
+        """Время выполнения, сек (для идущего запроса - на текущий момент)"""
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.perf_counter()) - self.started_at
+
+    @property
+    def running(self) -> bool:
+        return self.started_at is not None and self.finished_at is None
+
+    def cancel(self):
+        """Отмена запроса (до начала выполнения - запрос не будет отправлен)"""
+        with self._lock:
+            self.cancelled = True
+            if self._conn is not None:
+                try:
+                    self._conn.cancel()
+                except psycopg2.Error as e:
+                    print(f"Error cancelling query: {e}")
+
+    def _execute(self, cursor) -> Tuple[List[str], List[tuple]]:
+        """Выполнение запроса в открытой транзакции (переопределяется для EXPLAIN)"""
+        cursor.execute(self.sql, self.params)
+        columns = [desc[0] for desc in cursor.description] if cursor.description else []
+        rows = cursor.fetchall() if cursor.description else []
+        return columns, rows
+
+    def run(self) -> Tuple[List[str], List[tuple]]:
+        """Выполнение запроса: (столбцы, строки)"""
+        self._open()
+        try:
+            with self._statement():
+                return self._execute(self._conn.cursor())
+        finally:
+            self._close()
+
+    def _open(self):
+        """Слот лимита, соединение из пула и транзакция с statement_timeout"""
+        if not _slots.acquire(blocking=False):
+            raise QueryLimitReached(f"Too many queries running (limit {db_config.adhoc_max_queries}), "
+                                    f"wait for one to finish or cancel it")
+        self.started_at = time.perf_counter()
+        try:
+            conn = self.db.get_connection()
+        except Exception:
+            self.finished_at = time.perf_counter()
+            _slots.release()
+            raise
+        with self._lock:
+            self._conn = conn
+
+        try:
+            with self._statement():
+                # SET LOCAL действует до конца транзакции, соединение возвращается в пул с прежними настройками
+                conn.cursor().execute("SET LOCAL statement_timeout = %s", (int(self.timeout * 1000),))
+        except Exception:
+            self._close()
+            raise
+
+    def _close(self):
+        """Возврат соединения в пул (пул откатывает незавершенную транзакцию) и освобождение слота"""
+        with self._lock:
+            conn, self._conn = self._conn, None
+        if conn is None:
+            return
+        self.finished_at = time.perf_counter()
+        self.db.release_connection(conn)
+        _slots.release()
+
+    @contextmanager
+    def _statement(self):
+        """Выполнение команды с переводом отмены сервером в QueryCancelled"""
+        if self.cancelled:
+            raise QueryCancelled("Query cancelled")
+        try:
+            yield
+        except psycopg2.extensions.QueryCanceledError:
+            if self.cancelled:
+                raise QueryCancelled("Query cancelled")
+            raise QueryCancelled(f"Query timed out after {self.timeout:g} s (statement_timeout)", timed_out=True)
+
+
+class StreamingQuery(AdhocQuery):
+    """Пользовательский запрос с чтением результата через серверный курсор.
+
+    Строки читаются пакетами по batch_size (fetchmany), поэтому в памяти клиента
+    не оказывается весь результат. Между вызовами fetch() курсор, соединение и
+    слот лимита остаются занятыми, а открытая транзакция держит снимок и
+    блокировки таблиц - после просмотра запрос нужно закрыть через close()
+    (закрывается и сам, когда строки закончились). Отмена или ошибка также
+    закрывают запрос. Если клиент не закрыл запрос, сервер завершит сеанс через
+    idle_timeout + IDLE_GRACE секунд простоя (idle_in_transaction_session_timeout).
+    """
+
+    # Запас серверного ограничения простоя сверх idle_timeout (закрыть запрос должен клиент)
+    IDLE_GRACE = 10.0
+
+    def __init__(self, db, sql: str, params: Optional[Sequence[Any]] = None,
+                 timeout: Optional[float] = None, batch_size: int = 500,
+                 idle_timeout: Optional[float] = None, count_sql: Optional[str] = None):
+        super().__init__(db, sql, params, timeout)
+        self.batch_size = batch_size
+        # Запрос для подсчета строк (те же параметры), например без ORDER BY; по умолчанию - sql
+        self.count_sql = count_sql
+        self.idle_timeout = db_config.adhoc_stream_idle if idle_timeout is None else idle_timeout
+        self.columns: List[str] = []
+        self.fetched = 0
+        self.exhausted = False
+        self._cursor = None
+
+    @property
+    def is_open(self) -> bool:
+        return self._conn is not None
+
+    def close(self):
+        """Закрытие курсора и освобождение соединения"""
+        self._cursor = None
+        self._close()
+
+    def _open(self):
+        super()._open()
+        if self.idle_timeout <= 0:
+            return
+        try:
+            with self._statement():
+                self._conn.cursor().execute("SET LOCAL idle_in_transaction_session_timeout = %s",
+                                            (int((self.idle_timeout + self.IDLE_GRACE) * 1000),))
+        except Exception:
+            self._close()
+            raise
+
+    def iter_batches(self, limit: Optional[int] = None) -> Iterator[List[tuple]]:
+        """Следующие строки результата пакетами, не больше limit строк (None - до конца)"""
+        if self.exhausted:
+            return
+        try:
+            if self._cursor is None:
+                self._open()
+                with self._statement():
+                    self._cursor = self._conn.cursor(name=f"adhoc_{id(self):x}")
+                    self._cursor.execute(self.sql, self.params)
+
+            remaining = limit
+            while remaining is None or remaining > 0:
+                size = self.batch_size if remaining is None else min(self.batch_size, remaining)
+                with self._statement():
+                    rows = self._cursor.fetchmany(size)
+                    # У серверного курсора описание столбцов появляется после первого чтения
+                    if not self.columns and self._cursor.description:
+                        self.columns = [desc[0] for desc in self._cursor.description]
+                self.fetched += len(rows)
+                if remaining is not None:
+                    remaining -= len(rows)
+                if len(rows) < size:
+                    self.exhausted = True
+                if rows:
+                    yield rows
+                if self.exhausted:
+                    self.close()
+                    return
+        except psycopg2.OperationalError:
+            idle_closed = self._conn is not None and self._conn.closed
+            self.close()
+            if idle_closed:
+                raise QueryCancelled(f"Result was closed by the server after {self.idle_timeout:g} s idle, "
+                                     f"run the query again", timed_out=True)
+            raise
+        except Exception:
+            self.close()
+            raise
+
+    def fetch(self, limit: int, on_batch: Callable[[List[tuple]], None]) -> int:
+        """Чтение не больше limit строк с передачей каждого пакета в on_batch; возвращает число строк"""
+        count = 0
+        for rows in self.iter_batches(limit):
+            on_batch(rows)
+            count += len(rows)
+        return count
+
+    @staticmethod
+    def count_query(sql: str) -> str:
+        """COUNT(*) по результату запроса.
+
+        Завершающие ";" отбрасываются, закрывающая скобка - на новой строке (после
+        комментария "--" в конце запроса). ORDER BY запроса сохраняется, и сервер
+        сортирует весь результат еще раз - сортировку стоит убрать через count_sql.
+        """
+        sql = re.sub(r"[\s;]+$", "", sql)
+        return f"SELECT COUNT(*) FROM ({sql}\n) AS adhoc_rows"
+
+    def count(self) -> Optional[int]:
+        """Общее число строк результата отдельным запросом COUNT(*) в той же транзакции.
+
+        None - если посчитать не удалось (например, по statement_timeout); курсор при этом остается открытым.
+        """
+        if self.exhausted:
+            return self.fetched
+        if self._conn is None:
+            return None
+        cursor = self._conn.cursor()
+        # Ошибка без точки сохранения прервала бы транзакцию вместе с открытым курсором
+        cursor.execute("SAVEPOINT adhoc_count")
+        try:
+            with self._statement():
+                cursor.execute(self.count_query(self.count_sql or self.sql), self.params)
+                total = cursor.fetchone()[0]
+            cursor.execute("RELEASE SAVEPOINT adhoc_count")
+            return total
+        except QueryCancelled as e:
+            if not e.timed_out:
+                self.close()
+                raise
+            cursor.execute("ROLLBACK TO SAVEPOINT adhoc_count")
+            return None
+        except psycopg2.Error as e:
+            print(f"Error counting query rows: {e}")
+            cursor.execute("ROLLBACK TO SAVEPOINT adhoc_count")
+            return None
@@ -0,0 +1,543 @@
+import asyncio
+import concurrent.futures
+import inspect
+import threading
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Callable
+
+import psycopg2.extras
+
+from .db_config import db_config
+from .connection_pool import AsyncConnectionPool, wait_ready
+from .prepared_statements import PreparedStatementConnection
+from .attack_queries import AttackQueries
+from .db_manager import DatabaseManager
+
+
+class AsyncDatabaseManager(AttackQueries):
+    """Асинхронный вариант DatabaseManager для asyncio.
+
+    Операции и SQL те же, что у DatabaseManager, но запросы не блокируют поток:
+    пока один запрос ждет ответа сервера, цикл событий обслуживает остальные.
+    Методы вызываются из потока цикла событий (см. EventLoopThread).
+    """
+
+    def __init__(self, config=None):
+        self.config = config or db_config
+        self.pool = AsyncConnectionPool(
+            dict(self.config.connect_kwargs, connection_factory=PreparedStatementConnection),
+            min_size=self.config.pool_min_size,
+            max_size=self.config.pool_max_size,
+            timeout=self.config.pool_timeout,
+            validation_interval=self.config.pool_validation_interval
+        )
+
+    def get_pool_stats(self) -> Dict[str, Any]:
+        """Статистика пула соединений"""
+        return self.pool.stats()
+
+    async def close(self):
+        """Закрытие всех соединений пула"""
+        await self.pool.closeall()
+
+    @asynccontextmanager
+    async def _cursor(self, transaction: bool = False):
+        """Курсор на соединении из пула, при transaction=True - внутри BEGIN/COMMIT"""
+        conn = await self.pool.getconn()
+        try:
+            cursor = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
+            if transaction:
+                await self._execute(cursor, "BEGIN")
+            yield cursor
+            if transaction:
+                await self._execute(cursor, "COMMIT")
+        finally:
+            # Незавершенная транзакция откатывается при возврате соединения в пул
+            await self.pool.putconn(conn)
+
+    @staticmethod
+    async def _execute(cursor, query, params=None):
+        cursor.execute(query, params)
+        await wait_ready(cursor.connection)
+
+    async def _execute_prepared(self, cursor, sql: str, params=()):
+        """Выполнение частого запроса через подготовленное на соединении выражение"""
+        commands, query = self._prepared_commands(cursor.connection, sql, params)
+        try:
+            for command in commands:
+                await self._execute(cursor, command)
+        except psycopg2.Error:
+            self._forget_prepared(cursor.connection, sql)
+            raise
+        try:
+            await self._execute(cursor, query, params)
+        except psycopg2.Error as e:
+            self._prepared_failed(cursor.connection, sql, e)
+            raise
+
+    async def _hydrate_attacks(self, cursor, attack_rows) -> List[Dict[str, Any]]:
+        """Загрузка целей для набора атак одним запросом"""
+        attacks = [self._row_to_attack(row) for row in attack_rows]
+        if not attacks:
+            return attacks
+
+        await self._execute_prepared(cursor, *self._targets_query(attacks))
+        return self._attach_targets(attacks, cursor.fetchall())
+
+    async def _execute_values(self, cursor, query: str, rows: List[tuple], template: Optional[str] = None):
+        """Многострочный запрос одним выражением (асинхронный курсор не поддерживает COPY)"""
+        # page_size=len(rows): execute_values выполнит ровно один execute, его и дожидаемся
+        psycopg2.extras.execute_values(cursor, query, rows, template=template, page_size=len(rows))
+        await wait_ready(cursor.connection)
+
+    async def _sync_targets(self, cursor, attack_id: str, targets: List[Dict[str, Any]]) -> Dict[str, int]:
+        """Синхронизация целей атаки по разнице с сохраненными"""
+        await self._execute(cursor, self.LOCK_TARGETS_SQL, (attack_id,))
+        updates, deletes, inserts, unchanged = self._plan_target_sync(attack_id, cursor.fetchall(), targets)
+
+        if updates:
+            await self._execute_values(cursor, self.UPDATE_TARGETS_SQL, updates, self.UPDATE_TARGETS_TEMPLATE)
+        if deletes:
+            await self._execute(cursor, "DELETE FROM targets WHERE id = ANY(%s)", (deletes,))
+        if inserts:
+            await self._execute_values(cursor, *self._target_insert(inserts))
+
+        return self._sync_summary(updates, deletes, inserts, unchanged)
+
+    async def check_database_status(self) -> Dict[str, Any]:
+        """Проверка статуса БД и существования таблиц"""
+        try:
+            async with self._cursor() as cursor:
+                await self._execute(cursor, """
+                    SELECT table_name FROM information_schema.tables
+                    WHERE table_schema = 'public'
+                    AND table_name IN ('attacks', 'targets')
+                """)
+                tables = cursor.fetchall()
+
+            return {
+                "success": True,
+                "data": {
+                    "tablesExist": len(tables) == 2,
+                    "database": self.config.database,
+                    "tables": [table[0] for table in tables]
+                }
+            }
+        except Exception as e:
+            return {
+                "success": False,
+                "error": str(e),
+                "data": {"tablesExist": False}
+            }
+
+    async def get_all_attacks(self) -> List[Dict[str, Any]]:
+        """Получение всех атак с целями"""
+        try:
+            async with self._cursor() as cursor:
+                await self._execute_prepared(cursor, self.SELECT_ALL_ATTACKS_SQL)
+                return await self._hydrate_attacks(cursor, cursor.fetchall())
+        except Exception as e:
+            print(f"Error fetching attacks: {e}")
+            return []
+
+    async def get_attacks_page(self, page_size: Optional[int] = None, cursor: Optional[str] = None,
+                               frequencies: List[str] = None, danger_levels: List[str] = None,
+                               attack_types: List[str] = None, protocols: List[str] = None,
+                               ports: List[int] = None, source_ips: List[str] = None,
+                               tags: List[str] = None, created_from: datetime = None,
+                               created_to: datetime = None) -> Dict[str, Any]:
+        """Страница атак с целями (keyset-пагинация, см. DatabaseManager.get_attacks_page)"""
+        page_size = page_size or self.PAGE_SIZE
+        try:
+            sql, params, direction = self._page_query(page_size, cursor, frequencies, danger_levels, attack_types,
+                                                      protocols, ports, source_ips, tags, created_from, created_to)
+
+            async with self._cursor() as db_cursor:
+                await self._execute_prepared(db_cursor, sql, params)
+                rows, has_more = self._page_rows(db_cursor.fetchall(), page_size, direction)
+                attacks = await self._hydrate_attacks(db_cursor, rows)
+
+            return self._page_result(attacks, direction, has_more, cursor)
+
+        except Exception as e:
+            print(f"Error fetching attacks page: {e}")
+            return {"items": [], "next_cursor": None, "prev_cursor": None}
+
+    async def get_attack(self, attack_id: str) -> Optional[Dict[str, Any]]:
+        """Получение конкретной атаки по ID"""
+        try:
+            async with self._cursor() as cursor:
+                await self._execute_prepared(cursor, self.SELECT_ATTACK_SQL, [attack_id])
+                attack_row = cursor.fetchone()
+                if not attack_row:
+                    return None
+                return (await self._hydrate_attacks(cursor, [attack_row]))[0]
+        except Exception as e:
+            print(f"Error fetching attack {attack_id}: {e}")
+            return None
+
+    async def get_attack_stats(self) -> Dict[str, Any]:
+        """Счетчики для панелей статистики и разрезы по перечислениям одним запросом"""
+        try:
+            async with self._cursor() as cursor:
+                await self._execute_prepared(cursor, self.STATS_SQL)
+                return self._stats_result(cursor.fetchone())
+        except Exception as e:
+            print(f"Error fetching attack stats: {e}")
+            return {}
+
+    async def get_dashboard_rollups(self, days: int = 30) -> Dict[str, Any]:
+        """Сводки Dashboard и их устаревание (см. DatabaseManager.get_dashboard_rollups)"""
+        try:
+            async with self._cursor() as cursor:
+                await self._execute_prepared(cursor, self.ROLLUP_TYPE_DANGER_SQL)
+                by_type_danger = [dict(row) for row in cursor.fetchall()]
+                await self._execute_prepared(cursor, self.ROLLUP_PROTOCOL_SQL)
+                by_protocol = [dict(row) for row in cursor.fetchall()]
+                await self._execute_prepared(cursor, self.ROLLUP_DAY_SQL, [days])
+                by_day = [dict(row) for row in cursor.fetchall()]
+                await self._execute(cursor, self.ROLLUP_STATE_SQL)
+                state = dict(cursor.fetchone())
+                return {"by_type_danger": by_type_danger, "by_protocol": by_protocol, "by_day": by_day,
+                        "state": state}
+        except Exception as e:
+            print(f"Error fetching dashboard rollups: {e}")
+            return {}
+
+    async def get_attack_changes(self, since: Optional[str] = None) -> Dict[str, Any]:
+        """Изменения атак после отметки since (см. DatabaseManager.get_attack_changes)"""
+        async with self._cursor(transaction=True) as cursor:
+            await self._execute(cursor, "SET TRANSACTION ISOLATION LEVEL REPEATABLE READ READ ONLY")
+            await self._execute(cursor, self.SYNC_CLOCK_SQL, (self.SYNC_OVERLAP, self.TOMBSTONE_RETENTION_DAYS))
+            safe_until, retention_horizon, table_oid = cursor.fetchone()
+
+            position = self._watermark_position(since)
+            full = self._needs_full_sync(position, retention_horizon, table_oid)
+
+            deleted_ids = []
+            if full:
+                await self._execute_prepared(cursor, self.SELECT_ALL_ATTACKS_SQL)
+                attacks = await self._hydrate_attacks(cursor, cursor.fetchall())
+            else:
+                await self._execute_prepared(cursor, self.SELECT_CHANGED_ATTACKS_SQL, list(position[:2]))
+                attacks = await self._hydrate_attacks(cursor, cursor.fetchall())
+                await self._execute_prepared(cursor, self.SELECT_TOMBSTONES_SQL, list(position[2:4]))
+                deleted_ids = [row[0] for row in cursor.fetchall()]
+
+            return self._changes_result(attacks, deleted_ids, safe_until, table_oid, position, full)
+
+    async def get_attacks_by_ids(self, attack_ids: List[str]) -> Optional[List[Dict[str, Any]]]:
+        """Получение атак по списку ID: отсутствующих в результате нет, None - ошибка запроса"""
+        if not attack_ids:
+            return []
+        try:
+            async with self._cursor() as cursor:
+                await self._execute_prepared(cursor, self.SELECT_ATTACKS_BY_IDS_SQL, [list(attack_ids)])
+                return await self._hydrate_attacks(cursor, cursor.fetchall())
+        except Exception as e:
+            print(f"Error fetching attacks by ids: {e}")
+            return None
+
+    async def filter_attacks(self, frequencies: List[str] = None, danger_levels: List[str] = None,
+                             attack_types: List[str] = None, protocols: List[str] = None,
+                             ports: List[int] = None, source_ips: List[str] = None,
+                             tags: List[str] = None, created_from: datetime = None,
+                             created_to: datetime = None) -> List[Dict[str, Any]]:
+        """Фильтрация атак по параметрам"""
+        try:
+            where, params = self._build_filter_clause(frequencies, danger_levels, attack_types, protocols,
+                                                      ports, source_ips, tags, created_from, created_to)
+            async with self._cursor() as cursor:
+                await self._execute_prepared(cursor, f"{self.SELECT_ATTACKS}{where} ORDER BY a.created_at DESC, a.id DESC",
+                                             params)
+                return await self._hydrate_attacks(cursor, cursor.fetchall())
+        except Exception as e:
+            print(f"Error filtering attacks: {e}")
+            return []
+
+    async def create_attack(self, attack_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Создание новой атаки"""
+        try:
+            attack_id = attack_data.get("id") or self._generate_id()
+            current_time = datetime.now().isoformat()
+            targets = attack_data.get("targets", [])
+
+            async with self._cursor(transaction=True) as cursor:
+                await self._execute(
+                    cursor,
+                    self.INSERT_ATTACK_SQL,
+                    (attack_id,) + self._attack_values(attack_data) + (current_time, current_time)
+                )
+                attack = self._row_to_attack(cursor.fetchone())
+
+                rows = [self._target_row(attack_id, target_data) for target_data in targets]
+                if rows:
+                    await self._execute_values(cursor, *self._target_insert(rows))
+
+            attack["targets"] = self._written_targets(targets)
+            return {
+                "success": True,
+                "data": attack,
+                "message": "Attack created successfully"
+            }
+
+        except Exception as e:
+            return {
+                "success": False,
+                "error": f"Failed to create attack: {e}"
+            }
+
+    async def update_attack(self, attack_id: str, attack_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Обновление атаки"""
+        try:
+            current_time = datetime.now().isoformat()
+
+            async with self._cursor(transaction=True) as cursor:
+                await self._execute(cursor, self.UPDATE_ATTACK_SQL,
+                                    self._attack_values(attack_data) + (current_time, attack_id))
+                attack_row = cursor.fetchone()
+                if attack_row is None:
+                    return {
+                        "success": False,
+                        "error": f"Attack {attack_id} not found"
+                    }
+                attack = (await self._hydrate_attacks(cursor, [attack_row]))[0]
+
+            return {
+                "success": True,
+                "data": attack,
+                "message": "Attack updated successfully"
+            }
+
+        except Exception as e:
+            return {
+                "success": False,
+                "error": f"Failed to update attack {attack_id}: {e}"
+            }
+
+    async def update_attack_with_targets(self, attack_id: str, data: Dict[str, Any],
+                                         sync_targets: bool = True) -> Dict[str, Any]:
+        """Обновление атаки с целями (см. DatabaseManager.update_attack_with_targets)"""
+        try:
+            current_time = datetime.now().isoformat()
+            targets = data.get("targets", [])
+
+            async with self._cursor(transaction=True) as cursor:
+                await self._execute(cursor, self.UPDATE_ATTACK_SQL, self._attack_values(data) + (current_time, attack_id))
+                attack_row = cursor.fetchone()
+                if attack_row is None:
+                    return {
+                        "success": False,
+                        "error": f"Attack {attack_id} not found"
+                    }
+                attack = self._row_to_attack(attack_row)
+
+                if sync_targets:
+                    sync = await self._sync_targets(cursor, attack_id, targets)
+                else:
+                    await self._execute(cursor, "DELETE FROM targets WHERE attack_id = %s", (attack_id,))
+                    deleted = cursor.rowcount
+                    rows = [self._target_row(attack_id, target_data) for target_data in targets]
+                    if rows:
+                        await self._execute_values(cursor, *self._target_insert(rows))
+                    sync = {
+                        "inserted": len(rows),
+                        "updated": 0,
+                        "deleted": deleted,
+                        "unchanged": 0,
+                        "rows_touched": len(rows) + deleted
+                    }
+
+            attack["targets"] = self._written_targets(targets)
+            return {
+                "success": True,
+                "data": attack,
+                "targets_sync": sync,
+                "message": f"Attack with targets updated successfully ({sync['rows_touched']} target rows touched)"
+            }
+
+        except Exception as e:
+            return {
+                "success": False,
+                "error": f"Failed to update attack {attack_id} with targets: {e}"
+            }
+
+    async def sync_attack_targets(self, attack_id: str, targets: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Обновление только целей атаки по разнице с сохраненными"""
+        try:
+            async with self._cursor(transaction=True) as cursor:
+                await self._execute(cursor, "UPDATE attacks SET updated_at = %s WHERE id = %s",
+                                    (datetime.now().isoformat(), attack_id))
+                if cursor.rowcount == 0:
+                    return {
+                        "success": False,
+                        "error": f"Attack {attack_id} not found"
+                    }
+                sync = await self._sync_targets(cursor, attack_id, targets)
+
+            return {
+                "success": True,
+                "data": sync,
+                "message": f"Targets synchronized ({sync['rows_touched']} rows touched)"
+            }
+
+        except Exception as e:
+            return {
+                "success": False,
+                "error": f"Failed to sync targets of attack {attack_id}: {e}"
+            }
+
+    async def delete_attack(self, attack_id: str) -> Dict[str, Any]:
+        """Удаление атаки"""
+        try:
+            async with self._cursor() as cursor:
+                # Цели удалятся каскадно
+                await self._execute(cursor, "DELETE FROM attacks WHERE id = %s RETURNING id", (attack_id,))
+                if cursor.rowcount == 0:
+                    return {
+                        "success": False,
+                        "error": f"Attack {attack_id} not found"
+                    }
+
+            return {
+                "success": True,
+                "message": f"Attack {attack_id} deleted successfully"
+            }
+
+        except Exception as e:
+            return {
+                "success": False,
+                "error": f"Failed to delete attack {attack_id}: {e}"
+            }
+
+    async def delete_attacks(self, attack_ids) -> Dict[str, Any]:
+        """Удаление набора атак в одной транзакции (см. DatabaseManager.delete_attacks)"""
+        attack_ids = list(dict.fromkeys(attack_ids))
+        try:
+            async with self._cursor(transaction=True) as cursor:
+                await self._execute(cursor, self.DELETE_ATTACKS_TARGETS_SQL, (attack_ids,))
+                await self._execute(cursor, self.DELETE_ATTACKS_SQL, (attack_ids,))
+                deleted = [row["id"] for row in cursor.fetchall()]
+
+            return self._bulk_result("deleted", attack_ids, deleted, {"deleted": deleted})
+
+        except Exception as e:
+            return {
+                "success": False,
+                "error": f"Failed to delete attacks: {e}"
+            }
+
+    async def update_attacks(self, attack_ids, fields: Dict[str, Any]) -> Dict[str, Any]:
+        """Изменение полей набора атак одним UPDATE (см. DatabaseManager.update_attacks)"""
+        attack_ids = list(dict.fromkeys(attack_ids))
+        try:
+            sql, params = self._bulk_update_query(attack_ids, fields)
+            async with self._cursor(transaction=True) as cursor:
+                await self._execute(cursor, sql, params)
+                attacks = await self._hydrate_attacks(cursor, cursor.fetchall())
+
+            return self._bulk_result("updated", attack_ids, [attack["id"] for attack in attacks],
+                                     {"updated": attacks})
+
+        except Exception as e:
+            return {
+                "success": False,
+                "error": f"Failed to update attacks: {e}"
+            }
+
+
+class EventLoopThread:
+    """Один фоновый поток с циклом asyncio для всех запросов приложения.
+
+    Корутины передаются через submit() из любого потока; submit_to_tk() возвращает
+    результат в главный поток Tk через widget.after, как и остальной код интерфейса.
+    """
+
+    def __init__(self, name: str = "db-event-loop"):
+        # Selector-цикл нужен для add_reader/add_writer (Proactor в Windows их не поддерживает)
+        self.loop = asyncio.SelectorEventLoop()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def start(self):
+        """Запуск потока цикла событий"""
+        if not self._thread.is_alive():
+            self._thread.start()
+
+    def submit(self, coro) -> concurrent.futures.Future:
+        """Запуск корутины в цикле событий"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro, timeout: Optional[float] = None):
+        """Запуск корутины и ожидание результата в вызывающем потоке"""
+        return self.submit(coro).result(timeout)
+
+    def submit_to_tk(self, coro, widget, on_result: Callable[[Any], None],
+                     on_error: Optional[Callable[[Exception], None]] = None) -> concurrent.futures.Future:
+        """Запуск корутины с передачей результата в главный поток Tk"""
+        future = self.submit(coro)
+
+        def deliver(done: concurrent.futures.Future):
+            if done.cancelled():
+                return
+            error = done.exception()
+            if error is None:
+                widget.after(0, on_result, done.result())
+            elif on_error is not None:
+                widget.after(0, on_error, error)
+            else:
+                print(f"Background database task failed: {error}")
+
+        future.add_done_callback(deliver)
+        return future
+
+    def stop(self, timeout: float = 5.0):
+        """Остановка цикла событий"""
+        if self._thread.is_alive():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join(timeout)
+        if not self.loop.is_running():
+            self.loop.close()
+
+
+class SyncDatabaseFacade:
+    """Синхронный интерфейс DatabaseManager поверх AsyncDatabaseManager.
+
+    Операции, которые есть у AsyncDatabaseManager, выполняются в общем цикле событий,
+    остальные (схема, импорт, потоковое чтение, прямые соединения) - синхронным
+    DatabaseManager. Позволяет DDOSDatabaseClient работать без изменений.
+    """
+
+    def __init__(self, config=None):
+        self.runner = EventLoopThread()
+        self.runner.start()
+        self.async_db = AsyncDatabaseManager(config)
+        self.sync_db = DatabaseManager(config)
+
+    def is_async(self, name: str) -> bool:
+        """Есть ли у операции асинхронная реализация"""
+        return inspect.iscoroutinefunction(getattr(self.async_db, name, None))
+
+    def __getattr__(self, name):
+        if self.is_async(name):
+            method = getattr(self.async_db, name)
+            return lambda *args, **kwargs: self.runner.run(method(*args, **kwargs))
+        return getattr(self.sync_db, name)
+
+    def get_pool_stats(self) -> Dict[str, Any]:
+        """Статистика асинхронного пула (и синхронного в sync_pool)"""
+        stats = self.async_db.get_pool_stats()
+        stats["sync_pool"] = self.sync_db.get_pool_stats()
+        return stats
+
+    def close(self):
+        """Закрытие соединений и остановка цикла событий"""
+        try:
+            self.runner.run(self.async_db.close(), timeout=10)
+        finally:
+            self.runner.stop()
+            self.sync_db.close()
@@ -0,0 +1,620 @@
+import base64
+import hashlib
+import json
+from datetime import date, datetime
+from typing import List, Dict, Any, Optional, Tuple
+
+import psycopg2.errorcodes
+import psycopg2.extras
+
+from .prepared_statements import PreparedStatementConnection, prepare_statement, execute_statement
+
+
+def stats_sql(facets: Dict[str, tuple]) -> str:
+    """Запрос счетчиков статистики: разрезы по атрибутам атаки - FILTER по значению,
+    по протоколу - по флагам "есть цель с протоколом", собранным для каждой атаки заранее"""
+    columns = [
+        "count(*) AS total",
+        "count(*) FILTER (WHERE a.danger = 'critical') AS critical",
+        "count(*) FILTER (WHERE a.danger IN ('high', 'critical')) AS high_danger",
+        "count(*) FILTER (WHERE a.frequency IN ('high', 'very_high', 'continuous')) AS high_frequency",
+        "count(*) FILTER (WHERE a.created_at >= localtimestamp - interval '1 day') AS last_24h",
+        "max(a.created_at) AS last_attack_at",
+        "coalesce(sum(t.target_count), 0)::bigint AS targets"
+    ]
+    for facet in ("frequency", "danger", "attack_type"):
+        columns += [f"count(*) FILTER (WHERE a.{facet} = '{value}') AS {facet}__{value}" for value in facets[facet]]
+    columns += [f"count(*) FILTER (WHERE t.has_{value}) AS protocol__{value}" for value in facets["protocol"]]
+    has_protocol = ", ".join(f"bool_or(protocol = '{value}') AS has_{value}" for value in facets["protocol"])
+
+    return "SELECT " + ", ".join(columns) + f"""
+        FROM attacks a
+        LEFT JOIN (
+            SELECT attack_id, count(*) AS target_count, {has_protocol}
+            FROM targets GROUP BY attack_id
+        ) t ON t.attack_id = a.id
+    """
+
+
+class AttackQueries:
+    """SQL и преобразование строк, общие для DatabaseManager и AsyncDatabaseManager.
+
+    Здесь нет работы с соединениями: менеджеры только выполняют готовые запросы
+    своим способом (блокирующим или через asyncio).
+    """
+
+    TARGET_COLUMNS = ("attack_id", "target_ip", "target_domain", "port", "protocol", "tags")
+
+    ATTACK_COLUMNS = ("id", "name", "frequency", "danger", "attack_type", "source_ips", "affected_ports",
+                      "mitigation_strategies", "created_at", "updated_at")
+
+    # Размер страницы по умолчанию
+    PAGE_SIZE = 50
+
+    # Канал NOTIFY, в который триггеры отправляют id измененных атак
+    CHANGES_CHANNEL = "attack_changes"
+
+    # Значения перечислений, по которым считаются разрезы статистики (как в формах приложения)
+    FACETS = {
+        "frequency": ("low", "medium", "high", "very_high", "continuous"),
+        "danger": ("low", "medium", "high", "critical"),
+        "attack_type": ("volumetric", "protocol", "application", "amplification"),
+        "protocol": ("tcp", "udp", "dns", "http", "https", "icmp")
+    }
+
+    # Запас синхронизации на транзакции, зафиксированные позже записи updated_at, сек:
+    # изменения моложе запаса приходят при следующей синхронизации повторно
+    SYNC_OVERLAP = 60
+
+    # Срок хранения записей об удаленных атаках, дней (более старая отметка - полная загрузка)
+    TOMBSTONE_RETENTION_DAYS = 30
+
+    INSERT_ATTACK_SQL = """
+        INSERT INTO attacks 
+        (id, name, frequency, danger, attack_type, source_ips, affected_ports, mitigation_strategies, created_at, updated_at)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+        RETURNING *
+    """
+
+    UPDATE_ATTACK_SQL = """
+        UPDATE attacks 
+        SET name = %s, frequency = %s, danger = %s, attack_type = %s, 
+            source_ips = %s, affected_ports = %s, mitigation_strategies = %s, updated_at = %s
+        WHERE id = %s
+        RETURNING *
+    """
+
+    # Явные списки столбцов: подготовленные выражения не ломаются при добавлении столбцов
+    SELECT_ATTACKS = "SELECT " + ", ".join(f"a.{column}" for column in ATTACK_COLUMNS) + " FROM attacks a"
+
+    SELECT_ATTACK_SQL = SELECT_ATTACKS + " WHERE a.id = %s"
+
+    SELECT_ATTACKS_BY_IDS_SQL = SELECT_ATTACKS + " WHERE a.id = ANY(%s)"
+
+    SELECT_ALL_ATTACKS_SQL = SELECT_ATTACKS + " ORDER BY a.created_at DESC, a.id DESC"
+
+    # Синхронизация по отметке: атаки, измененные после (updated_at, id), и удаленные после (deleted_at, id)
+    SELECT_CHANGED_ATTACKS_SQL = SELECT_ATTACKS + " WHERE (a.updated_at, a.id) > (%s, %s) ORDER BY a.updated_at, a.id"
+
+    SELECT_TOMBSTONES_SQL = """
+        SELECT attack_id FROM attack_tombstones
+        WHERE (deleted_at, attack_id) > (%s, %s) ORDER BY deleted_at, attack_id
+    """
+
+    # Счетчики панели статистики одним проходом по attacks (см. stats_sql)
+    STATS_SQL = stats_sql(FACETS)
+
+    # Сводки Dashboard (материализованные представления, см. DatabaseManager.ROLLUPS)
+    ROLLUP_TYPE_DANGER_SQL = """
+        SELECT attack_type, danger, attacks, last_attack_at
+        FROM rollup_attacks_by_type_danger ORDER BY attack_type, danger
+    """
+
+    ROLLUP_PROTOCOL_SQL = "SELECT protocol, attacks, targets FROM rollup_attacks_by_protocol ORDER BY attacks DESC"
+
+    ROLLUP_DAY_SQL = """
+        SELECT day, attacks, critical FROM rollup_attacks_by_day
+        WHERE day > current_date - %s::integer ORDER BY day
+    """
+
+    # Насколько устарели сводки: время последнего обновления и число изменений атак после него
+    ROLLUP_STATE_SQL = """
+        WITH state AS (
+            SELECT min(refreshed_at) AS refreshed_at, sum(duration_ms) AS duration_ms FROM rollup_refreshes
+        )
+        SELECT s.refreshed_at,
+               extract(epoch FROM clock_timestamp()::timestamp - s.refreshed_at)::float AS age_seconds,
+               s.duration_ms,
+               (SELECT count(*) FROM attacks a WHERE a.updated_at > s.refreshed_at)
+               + (SELECT count(*) FROM attack_tombstones d WHERE d.deleted_at > s.refreshed_at) AS pending_changes
+        FROM state s
+    """
+
+    # Часы сервера (ими же триггеры ставят updated_at): граница надежно прочитанного и срок хранения удалений.
+    # oid таблицы attacks меняется при ее пересоздании (сброс базы) - старая отметка тогда недействительна
+    SYNC_CLOCK_SQL = """
+        SELECT clock_timestamp()::timestamp - make_interval(secs => %s),
+               clock_timestamp()::timestamp - make_interval(days => %s),
+               'attacks'::regclass::oid::bigint
+    """
+
+    # Массовые операции: один запрос на таблицу для всего набора id
+    DELETE_ATTACKS_TARGETS_SQL = "DELETE FROM targets WHERE attack_id = ANY(%s)"
+
+    DELETE_ATTACKS_SQL = "DELETE FROM attacks WHERE id = ANY(%s) RETURNING id"
+
+    # Поля атаки, которые можно задать сразу набору атак (update_attacks)
+    BULK_UPDATE_FIELDS = ("name", "frequency", "danger", "attack_type", "source_ips", "affected_ports",
+                          "mitigation_strategies")
+
+    SELECT_TARGETS_SQL = """
+        SELECT id, attack_id, target_ip, target_domain, port, protocol, tags
+        FROM targets WHERE attack_id = ANY(%s) ORDER BY id
+    """
+
+    LOCK_TARGETS_SQL = """
+        SELECT id, target_ip, target_domain, port, protocol, tags
+        FROM targets WHERE attack_id = %s ORDER BY id FOR UPDATE
+    """
+
+    INSERT_TARGETS_SQL = f"INSERT INTO targets ({', '.join(TARGET_COLUMNS)}) VALUES %s"
+
+    # Секционированная targets хранит created_at атаки (ключ секции). Триггер BEFORE не может
+    # задать ключ секции, поэтому он берется из attacks в самом запросе; ord сохраняет порядок целей
+    INSERT_PARTITIONED_TARGETS_SQL = f"""
+        INSERT INTO targets ({', '.join(TARGET_COLUMNS)}, attack_created_at)
+        SELECT {', '.join(f'v.{column}' for column in TARGET_COLUMNS)}, a.created_at
+        FROM (VALUES %s) AS v (ord, {', '.join(TARGET_COLUMNS)})
+        JOIN attacks a ON a.id = v.attack_id
+        ORDER BY v.ord
+    """
+    INSERT_PARTITIONED_TARGETS_TEMPLATE = "(%s, %s, %s, %s, %s::integer, %s, %s::jsonb)"
+
+    # Цели страницы атак с границами created_at: читаются только секции этих месяцев
+    SELECT_PARTITIONED_TARGETS_SQL = """
+        SELECT id, attack_id, target_ip, target_domain, port, protocol, tags
+        FROM targets WHERE attack_id = ANY(%s) AND attack_created_at BETWEEN %s AND %s ORDER BY id
+    """
+
+    UPDATE_TARGETS_SQL = """
+        UPDATE targets AS t
+        SET target_ip = v.target_ip, target_domain = v.target_domain,
+            port = v.port, protocol = v.protocol, tags = v.tags
+        FROM (VALUES %s) AS v (id, target_ip, target_domain, port, protocol, tags)
+        WHERE t.id = v.id
+    """
+    UPDATE_TARGETS_TEMPLATE = "(%s, %s, %s, %s::integer, %s, %s::jsonb)"
+
+    def _parse_json_field(self, field_value):
+        """Парсинг JSON полей из БД"""
+        if isinstance(field_value, (list, dict)):
+            return field_value
+        elif field_value:
+            try:
+                return json.loads(field_value)
+            except (json.JSONDecodeError, TypeError):
+                return []
+        else:
+            return []
+
+    def _row_to_attack(self, attack_row) -> Dict[str, Any]:
+        """Преобразование строки таблицы attacks в словарь атаки"""
+        attack = dict(attack_row)
+        # Служебный столбец upsert_attacks (строки RETURNING *)
+        attack.pop("content_hash", None)
+
+        # Парсим JSON поля
+        attack["source_ips"] = self._parse_json_field(attack["source_ips"])
+        attack["affected_ports"] = self._parse_json_field(attack["affected_ports"])
+        attack["mitigation_strategies"] = self._parse_json_field(attack["mitigation_strategies"])
+        return attack
+
+    @staticmethod
+    def _generate_id() -> str:
+        """Генерация ID новой атаки"""
+        # Импортируем здесь чтобы избежать циклических импортов
+        import sys
+        import os
+        sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        from utils.helpers import generate_id
+        return generate_id()
+
+    def _target_row(self, attack_id: str, target_data: Dict[str, Any]) -> tuple:
+        """Подготовка строки таблицы targets"""
+        return (
+            attack_id,
+            target_data.get("target_ip", ""),
+            target_data.get("target_domain", ""),
+            target_data.get("port", 80),
+            target_data.get("protocol", "tcp"),
+            json.dumps(target_data.get("tags", []))
+        )
+
+    def _bulk_update_query(self, attack_ids: List[str], fields: Dict[str, Any]) -> Tuple[str, list]:
+        """UPDATE набора атак одним запросом: (sql, параметры). ValueError - недопустимые поля"""
+        unknown = sorted(set(fields) - set(self.BULK_UPDATE_FIELDS))
+        if unknown:
+            raise ValueError(f"Fields cannot be updated in bulk: {', '.join(unknown)}")
+        if not fields:
+            raise ValueError("No fields to update")
+
+        assignments = []
+        params = []
+        for field in self.BULK_UPDATE_FIELDS:
+            if field in fields:
+                assignments.append(f"{field} = %s")
+                value = fields[field]
+                params.append(psycopg2.extras.Json(value) if field in ("source_ips", "affected_ports",
+                                                                        "mitigation_strategies") else value)
+        assignments.append("updated_at = %s")
+        params += [datetime.now().isoformat(), attack_ids]
+        return f"UPDATE attacks SET {', '.join(assignments)} WHERE id = ANY(%s) RETURNING *", params
+
+    @staticmethod
+    def _bulk_result(action: str, attack_ids: List[str], done_ids: List[str], data: Dict[str, Any]) -> Dict[str, Any]:
+        """Ответ массовой операции: обработанные атаки и id, которых нет в БД"""
+        done = set(done_ids)
+        data["missing"] = [attack_id for attack_id in attack_ids if attack_id not in done]
+        return {
+            "success": True,
+            "data": data,
+            "message": f"{action.capitalize()} {len(done)} of {len(attack_ids)} attacks"
+        }
+
+    def _target_insert(self, rows: List[tuple]) -> Tuple[str, List[tuple], Optional[str]]:
+        """Вставка строк targets: (sql для execute_values, строки, шаблон)"""
+        if not self.config.partitioned:
+            return self.INSERT_TARGETS_SQL, rows, None
+        return (self.INSERT_PARTITIONED_TARGETS_SQL, [(index,) + row for index, row in enumerate(rows)],
+                self.INSERT_PARTITIONED_TARGETS_TEMPLATE)
+
+    def _targets_query(self, attacks: List[Dict[str, Any]]) -> Tuple[str, list]:
+        """Запрос целей набора атак: (sql, параметры)"""
+        attack_ids = [attack["id"] for attack in attacks]
+        created = [attack["created_at"] for attack in attacks if isinstance(attack.get("created_at"), datetime)]
+        if not self.config.partitioned or len(created) != len(attacks):
+            return self.SELECT_TARGETS_SQL, [attack_ids]
+        return self.SELECT_PARTITIONED_TARGETS_SQL, [attack_ids, min(created), max(created)]
+
+    @staticmethod
+    def _month_start(value: date, shift: int = 0) -> date:
+        """Первый день месяца value, сдвинутого на shift месяцев"""
+        month = value.year * 12 + value.month - 1 + shift
+        return date(month // 12, month % 12 + 1, 1)
+
+    @staticmethod
+    def _partition_name(table: str, month: date) -> str:
+        """Имя месячной секции таблицы: attacks_p202510"""
+        return f"{table}_p{month:%Y%m}"
+
+    def _content_hash(self, record: Dict[str, Any]) -> str:
+        """Хеш содержимого атаки с целями (без id и дат): одинаковые версии дают одинаковый хеш"""
+        content = [record["name"], record["frequency"], record["danger"], record["attack_type"],
+                   record.get("source_ips", []), record.get("affected_ports", []),
+                   record.get("mitigation_strategies", []),
+                   [self._target_row(None, target_data)[1:] for target_data in record.get("targets", [])]]
+        return hashlib.sha256(json.dumps(content, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+    def _written_targets(self, targets: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Цели в том виде, в котором они записаны в БД (без повторного чтения)"""
+        written = []
+        for target_data in targets:
+            row = self._target_row(None, target_data)
+            target = dict(zip(self.TARGET_COLUMNS[1:], row[1:]))
+            target["tags"] = target_data.get("tags", [])
+            written.append(target)
+        return written
+
+    @staticmethod
+    def _encode_page_cursor(direction: str, attack: Dict[str, Any]) -> str:
+        """Кодирование ключа (created_at, id) в непрозрачный курсор страницы"""
+        created_at = attack["created_at"]
+        if isinstance(created_at, datetime):
+            created_at = created_at.isoformat()
+        payload = json.dumps([direction, created_at, attack["id"]]).encode("utf-8")
+        return base64.urlsafe_b64encode(payload).decode("ascii")
+
+    @staticmethod
+    def _decode_page_cursor(cursor: str):
+        """Разбор курсора страницы: (направление, created_at, id)"""
+        try:
+            direction, created_at, attack_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        except (ValueError, TypeError) as e:
+            raise ValueError(f"Invalid page cursor: {e}")
+        if direction not in ("next", "prev"):
+            raise ValueError(f"Invalid page cursor direction: {direction}")
+        return direction, created_at, attack_id
+
+    @staticmethod
+    def _encode_watermark(updated_at: datetime, attack_id: str, deleted_at: datetime, deleted_id: str,
+                          table_oid: int) -> str:
+        """Кодирование отметки синхронизации в непрозрачную строку"""
+        payload = json.dumps([updated_at.isoformat(), attack_id, deleted_at.isoformat(), deleted_id,
+                              table_oid]).encode("utf-8")
+        return base64.urlsafe_b64encode(payload).decode("ascii")
+
+    @staticmethod
+    def _decode_watermark(watermark: str) -> Tuple[datetime, str, datetime, str, int]:
+        """Разбор отметки синхронизации: (updated_at, id, deleted_at, id удаленной, oid таблицы attacks)"""
+        try:
+            updated_at, attack_id, deleted_at, deleted_id, table_oid = json.loads(
+                base64.urlsafe_b64decode(watermark.encode("ascii")))
+            return (datetime.fromisoformat(updated_at), attack_id, datetime.fromisoformat(deleted_at), deleted_id,
+                    int(table_oid))
+        except (ValueError, TypeError) as e:
+            raise ValueError(f"Invalid sync watermark: {e}")
+
+    def _watermark_position(self, since: Optional[str]) -> Optional[tuple]:
+        """Позиция отметки; нечитаемая отметка (например, из снимка старой версии) означает полную загрузку"""
+        if not since:
+            return None
+        try:
+            return self._decode_watermark(since)
+        except ValueError as e:
+            print(f"Ignoring sync watermark: {e}")
+            return None
+
+    @staticmethod
+    def _needs_full_sync(position: Optional[tuple], retention_horizon: datetime, table_oid: int) -> bool:
+        """Нужна ли полная загрузка вместо изменений после отметки"""
+        return position is None or position[2] < retention_horizon or position[4] != table_oid
+
+    def _stats_result(self, row) -> Dict[str, Any]:
+        """Строка STATS_SQL в виде {счетчик: значение, "facets": {разрез: {значение: количество}}}"""
+        row = dict(row)
+        stats = {name: value for name, value in row.items() if "__" not in name}
+        stats["facets"] = {
+            facet: {value: row[f"{facet}__{value}"] for value in values}
+            for facet, values in self.FACETS.items()
+        }
+        return stats
+
+    def _changes_result(self, attacks: List[Dict[str, Any]], deleted_ids: List[str], safe_until: datetime,
+                        table_oid: int, position: Optional[tuple], full: bool) -> Dict[str, Any]:
+        """Ответ get_attack_changes со следующей отметкой.
+
+        Отметка не заходит дальше safe_until: изменения из еще не зафиксированных
+        транзакций моложе этой границы и будут прочитаны в следующий раз.
+        """
+        boundary = (safe_until, "")
+        if full:
+            changed_after = deleted_after = boundary
+        else:
+            changed_after = max(position[:2], boundary)
+            deleted_after = max(position[2:4], boundary)
+
+        # Атака, удаленная и созданная заново с тем же id, жива
+        alive = {attack["id"] for attack in attacks}
+        return {
+            "changed": attacks,
+            "deleted_ids": [attack_id for attack_id in deleted_ids if attack_id not in alive],
+            "watermark": self._encode_watermark(*changed_after, *deleted_after, table_oid),
+            "full": full
+        }
+
+    @staticmethod
+    def _jsonpath_any(values) -> str:
+        """jsonpath "массив содержит любое из значений" (строки экранируются как в JSON)"""
+        return " || ".join(f"$[*] == {json.dumps(value)}" for value in values)
+
+    def _build_filter_clause(self, frequencies: List[str] = None, danger_levels: List[str] = None,
+                             attack_types: List[str] = None, protocols: List[str] = None,
+                             ports: List[int] = None, source_ips: List[str] = None, tags: List[str] = None,
+                             created_from: datetime = None, created_to: datetime = None):
+        """Построение условия WHERE для фильтрации атак (алиас таблицы attacks - a).
+
+        Каждый фильтр - один параметр (значение, массив или jsonpath), поэтому текст
+        запроса не зависит от количества значений в фильтрах. Период [created_from, created_to)
+        при секционировании ограничивает чтение секциями этих месяцев.
+        """
+        conditions = []
+        params = []
+
+        if created_from:
+            conditions.append("a.created_at >= %s")
+            params.append(created_from)
+        if created_to:
+            conditions.append("a.created_at < %s")
+            params.append(created_to)
+
+        # Добавляем условия фильтрации. Одно значение сравнивается через "=": только так
+        # индекс (столбец, created_at, id) отдает строки сразу в порядке сортировки
+        for column, values in (("frequency", frequencies), ("danger", danger_levels),
+                               ("attack_type", attack_types)):
+            if not values:
+                continue
+            if len(values) == 1:
+                conditions.append(f"a.{column} = %s")
+                params.append(values[0])
+            else:
+                conditions.append(f"a.{column} = ANY(%s)")
+                params.append(list(values))
+
+        # При секционировании цели атаки ищутся только в секции ее месяца
+        same_partition = " AND t.attack_created_at = a.created_at" if self.config.partitioned else ""
+
+        # Фильтрация по протоколу через EXISTS: атака попадает в выборку один раз,
+        # сколько бы целей с этим протоколом у нее ни было
+        if protocols:
+            conditions.append(f"""EXISTS (
+                SELECT 1 FROM targets t 
+                WHERE t.attack_id = a.id{same_partition} AND t.protocol = ANY(%s)
+            )""")
+            params.append(list(protocols))
+
+        # Запросы jsonpath (@@) используют GIN индексы: атака подходит,
+        # если содержит хотя бы одно из значений
+        if ports:
+            conditions.append("a.affected_ports @@ %s::jsonpath")
+            params.append(self._jsonpath_any(int(port) for port in ports))
+
+        if source_ips:
+            conditions.append("a.source_ips @@ %s::jsonpath")
+            params.append(self._jsonpath_any(source_ips))
+
+        if tags:
+            conditions.append(f"""EXISTS (
+                SELECT 1 FROM targets t 
+                WHERE t.attack_id = a.id{same_partition} AND t.tags @@ %s::jsonpath
+            )""")
+            params.append(self._jsonpath_any(tags))
+
+        where = " WHERE " + " AND ".join(conditions) if conditions else ""
+        return where, params
+
+    def _prepared_commands(self, conn, sql: str, params) -> Tuple[List[str], str]:
+        """Запрос через подготовленное выражение.
+
+        Возвращает (PREPARE/DEALLOCATE, которые нужно выполнить сначала, запрос для params).
+        Если подготовленные выражения выключены, запрос возвращается как есть.
+        """
+        if not self.config.prepared_statements or not isinstance(conn, PreparedStatementConnection):
+            return [], sql
+
+        name = conn.prepared_name(sql)
+        commands = [f"DEALLOCATE {stale}" for stale in conn.take_stale()]
+        if name is None:
+            name, evicted = conn.add_prepared(sql)
+            if evicted:
+                commands.append(f"DEALLOCATE {evicted}")
+            commands.append(prepare_statement(name, sql))
+        return commands, execute_statement(name, len(params))
+
+    @staticmethod
+    def _forget_prepared(conn, sql: str):
+        """Сброс выражения после ошибки PREPARE: на сервере его нет"""
+        if isinstance(conn, PreparedStatementConnection):
+            conn.forget_prepared(sql)
+
+    @staticmethod
+    def _prepared_failed(conn, sql: str, error: psycopg2.Error):
+        """Ошибка EXECUTE подготовленного выражения.
+
+        Обычная ошибка (таймаут, ограничение) выражение не портит - оно остается в кеше.
+        Если выражения на сервере нет, оно подготавливается заново; если устарело после
+        изменения схемы - дополнительно удаляется на сервере при следующем обращении.
+        """
+        if not isinstance(conn, PreparedStatementConnection):
+            return
+        if error.pgcode == psycopg2.errorcodes.INVALID_SQL_STATEMENT_NAME:
+            conn.forget_prepared(sql)
+        elif error.pgcode == psycopg2.errorcodes.FEATURE_NOT_SUPPORTED and "cached plan" in str(error):
+            conn.discard_prepared(sql)
+
+    def _attack_values(self, data: Dict[str, Any]) -> tuple:
+        """Значения изменяемых столбцов атаки для INSERT/UPDATE"""
+        return (
+            data["name"],
+            data["frequency"],
+            data["danger"],
+            data["attack_type"],
+            psycopg2.extras.Json(data["source_ips"]),
+            psycopg2.extras.Json(data["affected_ports"]),
+            psycopg2.extras.Json(data["mitigation_strategies"])
+        )
+
+    def _attach_targets(self, attacks: List[Dict[str, Any]], target_rows) -> List[Dict[str, Any]]:
+        """Раскладка строк targets (результат SELECT_TARGETS_SQL) по атакам"""
+        targets_by_attack = {attack["id"]: [] for attack in attacks}
+        for target_row in target_rows:
+            target = dict(target_row)
+            target["tags"] = self._parse_json_field(target["tags"])
+            # Удаляем внутренние поля
+            attack_id = target.pop("attack_id")
+            del target["id"]
+            targets_by_attack[attack_id].append(target)
+
+        for attack in attacks:
+            attack["targets"] = targets_by_attack[attack["id"]]
+        return attacks
+
+    def _page_query(self, page_size: int, cursor: Optional[str], frequencies: List[str] = None,
+                    danger_levels: List[str] = None, attack_types: List[str] = None,
+                    protocols: List[str] = None, ports: List[int] = None, source_ips: List[str] = None,
+                    tags: List[str] = None, created_from: datetime = None,
+                    created_to: datetime = None) -> Tuple[str, list, str]:
+        """Запрос страницы атак: (sql, параметры, направление чтения)"""
+        direction = "next"
+        where, params = self._build_filter_clause(frequencies, danger_levels, attack_types, protocols,
+                                                  ports, source_ips, tags, created_from, created_to)
+
+        if cursor:
+            direction, created_at, attack_id = self._decode_page_cursor(cursor)
+            # Сравнение кортежей использует индекс по (created_at, id)
+            operator = "<" if direction == "next" else ">"
+            keyset = f"(a.created_at, a.id) {operator} (%s, %s)"
+            where = f"{where} AND {keyset}" if where else f" WHERE {keyset}"
+            params = params + [created_at, attack_id]
+
+        order = "DESC" if direction == "next" else "ASC"
+
+        # Лишняя строка показывает, есть ли еще страница в направлении чтения. LIMIT - константа:
+        # с параметром общий план подготовленного выражения оценивается дороже и не используется
+        sql = f"{self.SELECT_ATTACKS}{where} ORDER BY a.created_at {order}, a.id {order} LIMIT {int(page_size) + 1}"
+        return sql, params, direction
+
+    @staticmethod
+    def _page_rows(rows: list, page_size: int, direction: str) -> Tuple[list, bool]:
+        """Строки страницы в порядке отображения и признак продолжения"""
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if direction == "prev":
+            rows.reverse()
+        return rows, has_more
+
+    def _page_result(self, attacks: List[Dict[str, Any]], direction: str, has_more: bool,
+                     cursor: Optional[str]) -> Dict[str, Any]:
+        """Ответ get_attacks_page с курсорами соседних страниц"""
+        if direction == "next":
+            has_next, has_prev = has_more, cursor is not None
+        else:
+            has_next, has_prev = True, has_more
+
+        return {
+            "items": attacks,
+            "next_cursor": self._encode_page_cursor("next", attacks[-1]) if attacks and has_next else None,
+            "prev_cursor": self._encode_page_cursor("prev", attacks[0]) if attacks and has_prev else None
+        }
+
+    def _plan_target_sync(self, attack_id: str, stored_rows, targets: List[Dict[str, Any]]):
+        """Разница между сохраненными целями (LOCK_TARGETS_SQL) и новым списком.
+
+        Совпадающие по содержимому цели не трогаются, оставшиеся пары старая/новая
+        обновляются на месте, лишние старые удаляются, лишние новые вставляются.
+        Возвращает (updates, deletes, inserts, unchanged).
+        """
+        # Содержимое цели -> id сохраненных строк с таким содержимым
+        stored = {}
+        for target_id, target_ip, target_domain, port, protocol, tags in stored_rows:
+            key = (target_ip, target_domain, port, protocol, json.dumps(tags))
+            stored.setdefault(key, []).append(target_id)
+
+        unchanged = 0
+        new_rows = []
+        for target_data in targets:
+            row = self._target_row(attack_id, target_data)
+            ids = stored.get(row[1:])
+            if ids:
+                ids.pop(0)
+                unchanged += 1
+            else:
+                new_rows.append(row)
+
+        stale_ids = sorted(target_id for ids in stored.values() for target_id in ids)
+
+        # Измененные цели переписываем в существующие строки вместо удаления и вставки
+        updates = [(target_id,) + row[1:] for target_id, row in zip(stale_ids, new_rows)]
+        deletes = stale_ids[len(updates):]
+        inserts = new_rows[len(updates):]
+        return updates, deletes, inserts, unchanged
+
+    @staticmethod
+    def _sync_summary(updates: list, deletes: list, inserts: list, unchanged: int) -> Dict[str, int]:
+        """Счетчики синхронизации целей"""
+        return {
+            "inserted": len(inserts),
+            "updated": len(updates),
+            "deleted": len(deletes),
+            "unchanged": unchanged,
+            "rows_touched": len(inserts) + len(updates) + len(deletes)
+        }
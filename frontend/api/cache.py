@@ -0,0 +1,361 @@
+import inspect
+import sys
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple, FrozenSet
+
+from .db_manager import DatabaseManager
+
+# Параметры фильтров DatabaseManager
+FILTER_NAMES = ("frequencies", "danger_levels", "attack_types", "protocols", "ports", "source_ips", "tags",
+                "created_from", "created_to")
+
+# Фильтры-границы периода created_at (одно значение, а не список)
+RANGE_FILTERS = ("created_from", "created_to")
+
+
+def normalize_filters(filters: Dict[str, Any]) -> tuple:
+    """Фильтры в виде ключа кеша: порядок и повторы значений не важны"""
+    normalized = []
+    for name in FILTER_NAMES:
+        values = filters.get(name)
+        if values and name in RANGE_FILTERS:
+            normalized.append((name, datetime.fromisoformat(values) if isinstance(values, str) else values))
+        elif values:
+            if name == "ports":
+                values = [int(value) for value in values]
+            normalized.append((name, tuple(sorted(set(values)))))
+    return tuple(normalized)
+
+
+def attack_matches(attack: Dict[str, Any], filters: tuple) -> bool:
+    """Проверка атаки на нормализованные фильтры (та же логика, что в _build_filter_clause)"""
+    targets = attack.get("targets", [])
+    for name, values in filters:
+        if name in RANGE_FILTERS:
+            created_at = attack.get("created_at")
+            if not isinstance(created_at, datetime):
+                return False
+            if (created_at < values) if name == "created_from" else (created_at >= values):
+                return False
+            continue
+
+        values = set(values)
+        if name == "frequencies":
+            matched = attack.get("frequency") in values
+        elif name == "danger_levels":
+            matched = attack.get("danger") in values
+        elif name == "attack_types":
+            matched = attack.get("attack_type") in values
+        elif name == "protocols":
+            matched = any(target.get("protocol") in values for target in targets)
+        elif name == "ports":
+            matched = bool(values.intersection(attack.get("affected_ports", [])))
+        elif name == "source_ips":
+            matched = bool(values.intersection(attack.get("source_ips", [])))
+        else:
+            matched = any(values.intersection(target.get("tags") or []) for target in targets)
+        if not matched:
+            return False
+    return True
+
+
+def estimate_size(value) -> int:
+    """Приблизительный объем значения в памяти, байт"""
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple, set)):
+        return sys.getsizeof(value) + sum(estimate_size(item) for item in value)
+    return sys.getsizeof(value)
+
+
+@dataclass
+class CacheEntry:
+    value: Any
+    expires_at: float
+    size: int
+    # id атак в значении
+    members: FrozenSet[str]
+    # Фильтры списка (None - запись по id атаки)
+    filters: Optional[tuple]
+
+
+class AttackCache:
+    """Потокобезопасный LRU-кеш атак и списков атак.
+
+    Записи живут не дольше ttl секунд, суммарный объем ограничен max_bytes:
+    при превышении вытесняются давно не использованные записи.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, ttl: float = 30.0):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Any, CacheEntry]" = OrderedDict()
+        self._bytes = 0
+
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "invalidations": 0
+        }
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+
+    def get(self, key) -> Tuple[bool, Any]:
+        """(найдено, значение)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at <= time.monotonic():
+                self._remove(key)
+                self._stats["expirations"] += 1
+                entry = None
+
+            if entry is None:
+                self._stats["misses"] += 1
+                return False, None
+
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return True, entry.value
+
+    def peek(self, key) -> Any:
+        """Значение без учета в статистике и без продления (None, если нет)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.expires_at <= time.monotonic():
+                return None
+            return entry.value
+
+    def put(self, key, value, members=(), filters: Optional[tuple] = None, ttl: Optional[float] = None):
+        """Сохранение значения"""
+        size = estimate_size(value)
+        if size > self.max_bytes:
+            return
+
+        entry = CacheEntry(value, time.monotonic() + (self.ttl if ttl is None else ttl),
+                           size, frozenset(members), filters)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            self._bytes += size
+
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self._stats["evictions"] += 1
+
+    def invalidate_attack(self, attack_id: str, attack: Optional[Dict[str, Any]] = None):
+        """Сброс записей, на которые влияет изменение атаки.
+
+        Сбрасываются запись атаки, списки, в которых она есть, и списки, под фильтры
+        которых подходит ее новая версия attack (None - атака удалена).
+        """
+        with self._lock:
+            stale = [
+                key for key, entry in self._entries.items()
+                if attack_id in entry.members
+                or (attack is not None and entry.filters is not None and attack_matches(attack, entry.filters))
+            ]
+            for key in stale:
+                self._remove(key)
+            self._stats["invalidations"] += len(stale)
+
+    def invalidate_attacks(self, attack_ids, attacks=()):
+        """Сброс записей для набора атак за один проход (id измененных и удаленных, новые версии)"""
+        attack_ids = set(attack_ids)
+        attacks = list(attacks)
+        with self._lock:
+            stale = [
+                key for key, entry in self._entries.items()
+                if not attack_ids.isdisjoint(entry.members)
+                or (entry.filters is not None and any(attack_matches(attack, entry.filters) for attack in attacks))
+            ]
+            for key in stale:
+                self._remove(key)
+            self._stats["invalidations"] += len(stale)
+
+    def invalidate_lists(self):
+        """Сброс всех списков (записи отдельных атак остаются)"""
+        with self._lock:
+            stale = [key for key, entry in self._entries.items() if entry.filters is not None]
+            for key in stale:
+                self._remove(key)
+            self._stats["invalidations"] += len(stale)
+
+    def clear(self):
+        """Полная очистка кеша"""
+        with self._lock:
+            self._stats["invalidations"] += len(self._entries)
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Счетчики кеша"""
+        with self._lock:
+            stats = dict(self._stats)
+            lookups = stats["hits"] + stats["misses"]
+            stats.update({
+                "hit_rate": stats["hits"] / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "ttl": self.ttl
+            })
+        return stats
+
+
+class CachedDatabaseManager:
+    """Кеширующая прослойка над DatabaseManager (или SyncDatabaseFacade).
+
+    Чтения атак и списков идут через AttackCache, операции записи после успешного
+    выполнения сбрасывают затронутые записи. Остальные атрибуты передаются как есть.
+    Возвращаемые атаки общие с кешем и не должны изменяться вызывающим кодом.
+    """
+
+    CACHED_READS = ("get_attack", "get_all_attacks", "filter_attacks", "get_attacks_page")
+
+    # Чтения изменений: сами не кешируются, но обновляют кеш
+    CHANGE_FEEDS = ("get_attack_changes",)
+
+    WRITES = ("create_attack", "update_attack", "update_attack_with_targets", "sync_attack_targets",
+              "delete_attack", "delete_attacks", "update_attacks", "bulk_import_attacks", "upsert_attacks",
+              "initialize_database", "reset_database", "expire_partitions")
+
+    def __init__(self, db, cache: AttackCache):
+        self.db = db
+        self.cache = cache
+
+    def __getattr__(self, name):
+        attribute = getattr(self.db, name)
+        if name in self.CACHED_READS:
+            def cached_read(*args, **kwargs):
+                key, hit, value = self.lookup(name, *args, **kwargs)
+                if hit:
+                    return value
+                value = attribute(*args, **kwargs)
+                self.remember(key, value)
+                return value
+            return cached_read
+
+        if name in self.CHANGE_FEEDS:
+            def change_feed(*args, **kwargs):
+                result = attribute(*args, **kwargs)
+                self.apply_delta(result)
+                return result
+            return change_feed
+
+        if name in self.WRITES:
+            def write(*args, **kwargs):
+                result = attribute(*args, **kwargs)
+                self.after_write(name, result, *args, **kwargs)
+                return result
+            return write
+
+        return attribute
+
+    @staticmethod
+    def _arguments(operation: str, args, kwargs) -> Dict[str, Any]:
+        """Аргументы операции по именам параметров DatabaseManager"""
+        bound = inspect.signature(getattr(DatabaseManager, operation)).bind(None, *args, **kwargs)
+        arguments = dict(bound.arguments)
+        arguments.pop("self", None)
+        return arguments
+
+    def lookup(self, operation: str, *args, **kwargs) -> Tuple[Any, bool, Any]:
+        """Поиск результата чтения в кеше: (ключ, найдено, значение)"""
+        arguments = self._arguments(operation, args, kwargs)
+        filters = normalize_filters(arguments)
+
+        if operation == "get_attack":
+            key = ("attack", arguments["attack_id"])
+        elif operation == "get_attacks_page":
+            page_size = arguments.get("page_size") or DatabaseManager.PAGE_SIZE
+            key = ("page", page_size, arguments.get("cursor"), filters)
+        else:
+            # get_all_attacks - тот же список, что и filter_attacks без фильтров
+            key = ("attacks", filters)
+
+        hit, value = self.cache.get(key)
+        if hit and isinstance(value, list):
+            # Копия списка: сортировка или удаление элементов у вызывающего не портят кеш
+            value = list(value)
+        elif hit and key[0] == "page":
+            value = dict(value, items=list(value["items"]))
+        return key, hit, value
+
+    def remember(self, key, value):
+        """Сохранение результата чтения, полученного по ключу из lookup"""
+        kind = key[0]
+        if kind == "attack":
+            # Отсутствующая атака не кешируется: ее могут создать в любой момент
+            if value is not None:
+                self.cache.put(key, value, members=(value["id"],))
+        elif kind == "page":
+            self.cache.put(key, value, members=[attack["id"] for attack in value["items"]], filters=key[3])
+        else:
+            self.cache.put(key, list(value), members=[attack["id"] for attack in value], filters=key[1])
+
+    def apply_changes(self, attacks, deleted_ids):
+        """Учет изменений, сделанных другими клиентами (новые версии атак и id удаленных)"""
+        self.cache.invalidate_attacks([attack["id"] for attack in attacks] + list(deleted_ids), attacks)
+        for attack in attacks:
+            self.cache.put(("attack", attack["id"]), attack, members=(attack["id"],))
+
+    def apply_delta(self, delta: Dict[str, Any]):
+        """Учет ответа get_attack_changes"""
+        if delta["full"]:
+            # Полная загрузка: изменения с прошлой отметки неизвестны
+            self.cache.clear()
+        else:
+            self.apply_changes(delta["changed"], delta["deleted_ids"])
+
+    def after_write(self, operation: str, result, *args, **kwargs):
+        """Сброс записей кеша после успешной операции записи"""
+        if not isinstance(result, dict) or not result.get("success"):
+            return
+
+        arguments = self._arguments(operation, args, kwargs)
+
+        if operation in ("create_attack", "update_attack", "update_attack_with_targets"):
+            attack = result["data"]
+            self.cache.invalidate_attack(attack["id"], attack)
+            # Ответ записи - полная атака, сразу кладем ее в кеш
+            self.cache.put(("attack", attack["id"]), attack, members=(attack["id"],))
+
+        elif operation == "sync_attack_targets":
+            attack_id = arguments["attack_id"]
+            cached = self.cache.peek(("attack", attack_id))
+            if cached is None:
+                # Новая версия неизвестна - списки с фильтрами по целям могли измениться
+                self.cache.invalidate_lists()
+                self.cache.invalidate_attack(attack_id)
+            else:
+                self.cache.invalidate_attack(attack_id, dict(cached, targets=arguments["targets"]))
+
+        elif operation == "delete_attack":
+            self.cache.invalidate_attack(arguments["attack_id"])
+
+        elif operation in ("delete_attacks", "update_attacks"):
+            self.apply_changes(result["data"].get("updated", []), result["data"].get("deleted", []))
+
+        elif operation == "bulk_import_attacks":
+            # Существующие атаки импорт не меняет (ON CONFLICT DO NOTHING)
+            self.cache.invalidate_lists()
+
+        elif operation == "upsert_attacks":
+            # Новые версии не возвращаются: сбрасываем записанные атаки и все списки
+            self.cache.invalidate_attacks(result["data"]["inserted_ids"] + result["data"]["updated_ids"])
+            self.cache.invalidate_lists()
+
+        else:
+            self.cache.clear()
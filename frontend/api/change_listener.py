@@ -0,0 +1,127 @@
+import json
+import select
+import threading
+import time
+from typing import Callable, Optional, Set
+
+import psycopg2
+import psycopg2.extensions
+
+from .db_config import db_config
+from .attack_queries import AttackQueries
+
+
+class ChangeListener:
+    """Фоновый поток, слушающий уведомления об изменениях атак (LISTEN).
+
+    Уведомления, пришедшие в течение debounce секунд, объединяются: on_changes
+    получает множество id атак, которые нужно перечитать. После потери соединения
+    поток переподключается с нарастающей задержкой и вызывает on_resync - уведомления,
+    отправленные без подписки, потеряны, и данные нужно загрузить заново.
+    Колбэки вызываются в потоке слушателя.
+    """
+
+    # Период проверки простаивающего соединения, сек (обрыв сети select сам не заметит)
+    KEEPALIVE_INTERVAL = 30.0
+
+    def __init__(self, on_changes: Callable[[Set[str]], None], on_resync: Optional[Callable[[], None]] = None,
+                 config=None, debounce: float = 0.2, max_reconnect_delay: float = 30.0):
+        self.config = config or db_config
+        self.on_changes = on_changes
+        self.on_resync = on_resync
+        self.debounce = debounce
+        self.max_reconnect_delay = max_reconnect_delay
+
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Запуск потока слушателя"""
+        if self._thread is not None:
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="db-change-listener", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """Остановка потока слушателя"""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _connect(self):
+        conn = psycopg2.connect(**self.config.connect_kwargs)
+        conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+        conn.cursor().execute(f"LISTEN {AttackQueries.CHANGES_CHANNEL}")
+        return conn
+
+    @staticmethod
+    def _collect(conn, attack_ids: Set[str]):
+        """Разбор полученных уведомлений в множество id атак"""
+        conn.poll()
+        while conn.notifies:
+            notify = conn.notifies.pop(0)
+            try:
+                attack_ids.update(json.loads(notify.payload)["ids"])
+            except (ValueError, KeyError, TypeError):
+                print(f"Error parsing change notification: {notify.payload!r}")
+
+    def _wait(self, conn, timeout: float) -> bool:
+        """Ожидание данных на соединении: True, если они пришли"""
+        return bool(select.select([conn], [], [], timeout)[0])
+
+    def _listen(self, conn):
+        last_activity = time.monotonic()
+        while not self._stopped.is_set():
+            # Таймаут ограничивает задержку реакции на stop()
+            if not self._wait(conn, 1.0):
+                if time.monotonic() - last_activity >= self.KEEPALIVE_INTERVAL:
+                    conn.cursor().execute("SELECT 1")
+                    last_activity = time.monotonic()
+                # Уведомления, пришедшие вместе с ответом на проверку, уже прочитаны
+                if not conn.notifies:
+                    continue
+            last_activity = time.monotonic()
+
+            attack_ids = set()
+            self._collect(conn, attack_ids)
+
+            # Пачка изменений (импорт, серия правок) обрабатывается одним перечитыванием
+            deadline = time.monotonic() + self.debounce
+            while not self._stopped.is_set():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._wait(conn, remaining):
+                    break
+                self._collect(conn, attack_ids)
+
+            if attack_ids and not self._stopped.is_set():
+                try:
+                    self.on_changes(attack_ids)
+                except Exception as e:
+                    print(f"Error applying attack changes: {e}")
+
+    def _run(self):
+        delay = 1.0
+        first_attempt = True
+        while not self._stopped.is_set():
+            conn = None
+            try:
+                conn = self._connect()
+                delay = 1.0
+                # Изменения между неудачной попыткой (или разрывом) и подпиской не были доставлены
+                if not first_attempt and self.on_resync is not None:
+                    self.on_resync()
+                first_attempt = False
+                self._listen(conn)
+            except (psycopg2.Error, OSError) as e:
+                first_attempt = False
+                print(f"Change listener connection lost: {e}")
+                self._stopped.wait(delay)
+                delay = min(delay * 2, self.max_reconnect_delay)
+            finally:
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except psycopg2.Error:
+                        pass
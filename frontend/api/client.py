@@ -1,11 +1,165 @@
-from typing import List, Dict, Any, Optional
+import threading
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Iterable, Iterator, Callable
+from .db_config import db_config
 from .db_manager import DatabaseManager
+from .async_db_manager import SyncDatabaseFacade
+from .cache import AttackCache, CachedDatabaseManager
+from .change_listener import ChangeListener
+from .rollups import RollupScheduler
+from .adhoc_query import AdhocQuery, StreamingQuery
+from .query_plan import ExplainQuery
 
 
 class DDOSDatabaseClient:
-    def __init__(self):
+    def __init__(self, use_async: Optional[bool] = None, use_cache: Optional[bool] = None):
         # Для PostgreSQL убираем параметр db_path
-        self.db = DatabaseManager()
+        if use_async is None:
+            use_async = db_config.use_async
+        if use_cache is None:
+            use_cache = db_config.cache_enabled
+        self.engine = SyncDatabaseFacade() if use_async else DatabaseManager()
+
+        self.cache = None
+        self.db = self.engine
+        if use_cache:
+            self.cache = AttackCache(max_bytes=db_config.cache_max_mb * 1024 * 1024, ttl=db_config.cache_ttl)
+            self.db = CachedDatabaseManager(self.engine, self.cache)
+
+        self.listener = None
+        self.rollup_scheduler = None
+
+    def submit(self, widget, operation: str, on_result: Callable[[Any], None],
+               on_error: Optional[Callable[[Exception], None]] = None, *args, **kwargs):
+        """Фоновое выполнение операции DatabaseManager с результатом в главном потоке Tk.
+
+        Чтения сначала ищутся в кеше. В асинхронном режиме запрос выполняется
+        в общем цикле событий, иначе - в отдельном потоке.
+        """
+        cached = isinstance(self.db, CachedDatabaseManager)
+        key = None
+        if cached and operation in CachedDatabaseManager.CACHED_READS:
+            key, hit, value = self.db.lookup(operation, *args, **kwargs)
+            if hit:
+                widget.after(0, on_result, value)
+                return
+
+        def deliver(result):
+            if key is not None:
+                self.db.remember(key, result)
+            elif cached and operation in CachedDatabaseManager.WRITES:
+                self.db.after_write(operation, result, *args, **kwargs)
+            elif cached and operation in CachedDatabaseManager.CHANGE_FEEDS:
+                self.db.apply_delta(result)
+            on_result(result)
+
+        if isinstance(self.engine, SyncDatabaseFacade) and self.engine.is_async(operation):
+            coro = getattr(self.engine.async_db, operation)(*args, **kwargs)
+            self.engine.runner.submit_to_tk(coro, widget, deliver, on_error)
+            return
+
+        def worker():
+            try:
+                result = getattr(self.engine, operation)(*args, **kwargs)
+            except Exception as e:
+                if on_error is not None:
+                    widget.after(0, on_error, e)
+                return
+            widget.after(0, deliver, result)
+
+        thread = threading.Thread(target=worker)
+        thread.daemon = True
+        thread.start()
+
+    def start_change_listener(self, widget, on_changes: Callable[[List[Dict[str, Any]], List[str]], None],
+                              on_resync: Optional[Callable[[], None]] = None):
+        """Живые обновления: изменения атак другими клиентами приходят через LISTEN/NOTIFY.
+
+        Измененные атаки перечитываются одним запросом, кеш обновляется, затем
+        on_changes(измененные атаки, id удаленных) вызывается в главном потоке Tk.
+        on_resync вызывается, когда изменения могли быть пропущены (переподключение).
+        """
+        if self.listener is not None or not db_config.live_updates:
+            return
+
+        def resync():
+            self.clear_cache()
+            if on_resync is not None:
+                widget.after(0, on_resync)
+
+        def apply(attack_ids):
+            attacks = self.engine.get_attacks_by_ids(sorted(attack_ids))
+            if attacks is None:
+                # Без новых версий нельзя отличить удаление от ошибки
+                resync()
+                return
+            found = {attack["id"] for attack in attacks}
+            deleted_ids = [attack_id for attack_id in attack_ids if attack_id not in found]
+            if isinstance(self.db, CachedDatabaseManager):
+                self.db.apply_changes(attacks, deleted_ids)
+            widget.after(0, on_changes, attacks, deleted_ids)
+
+        self.listener = ChangeListener(apply, resync)
+        self.listener.start()
+
+    def stop_change_listener(self):
+        """Остановка живых обновлений"""
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+
+    def start_rollup_scheduler(self, widget, on_refreshed: Optional[Callable[[Dict[str, Any]], None]] = None):
+        """Фоновое обновление сводок Dashboard раз в DB_ROLLUP_INTERVAL секунд"""
+        if self.rollup_scheduler is not None or db_config.rollup_interval <= 0:
+            return
+
+        def refreshed(result):
+            if on_refreshed is not None:
+                widget.after(0, on_refreshed, result)
+
+        self.rollup_scheduler = RollupScheduler(self.db, db_config.rollup_interval, refreshed)
+        self.rollup_scheduler.start()
+
+    def stop_rollup_scheduler(self):
+        """Остановка фонового обновления сводок"""
+        if self.rollup_scheduler is not None:
+            self.rollup_scheduler.stop()
+            self.rollup_scheduler = None
+
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Счетчики клиентского кеша (пустой словарь, если кеш выключен)"""
+        return self.cache.stats() if self.cache is not None else {}
+
+    def clear_cache(self):
+        """Сброс клиентского кеша"""
+        if self.cache is not None:
+            self.cache.clear()
+
+    def get_pool_stats(self) -> Dict[str, Any]:
+        """Статистика пула соединений"""
+        return self.db.get_pool_stats()
+
+    def close(self):
+        """Закрытие соединений с БД"""
+        self.stop_change_listener()
+        self.stop_rollup_scheduler()
+        self.db.close()
+
+    def adhoc_query(self, sql: str, params: Optional[Iterable[Any]] = None,
+                    timeout: Optional[float] = None) -> AdhocQuery:
+        """Пользовательский SQL-запрос с ограничением времени и отменой (выполнять через run())"""
+        return AdhocQuery(self.db, sql, params, timeout)
+
+    def stream_query(self, sql: str, params: Optional[Iterable[Any]] = None, timeout: Optional[float] = None,
+                     batch_size: int = 500, idle_timeout: Optional[float] = None,
+                     count_sql: Optional[str] = None) -> StreamingQuery:
+        """Пользовательский SQL-запрос с чтением строк пакетами через серверный курсор"""
+        return StreamingQuery(self.db, sql, params, timeout, batch_size, idle_timeout, count_sql)
+
+    def explain_query(self, sql: str, params: Optional[Iterable[Any]] = None, analyze: bool = False,
+                      timeout: Optional[float] = None) -> ExplainQuery:
+        """План пользовательского запроса (с analyze - с выполнением в откатываемой транзакции)"""
+        return ExplainQuery(self.db, sql, params, analyze, timeout)
 
     def check_database_status(self) -> Dict[str, Any]:
         """Проверка статуса БД"""
@@ -15,10 +169,95 @@ class DDOSDatabaseClient:
         """Создание таблиц"""
         return self.db.initialize_database()
 
+    def upgrade_indexes(self, concurrently: bool = True) -> Dict[str, Any]:
+        """Создание недостающих индексов в существующей базе"""
+        return self.db.upgrade_indexes(concurrently=concurrently)
+
+    def ensure_partitions(self, months_ahead: Optional[int] = None,
+                          since: Optional[datetime] = None) -> Dict[str, Any]:
+        """Создание месячных секций attacks и targets заранее"""
+        return self.db.ensure_partitions(months_ahead=months_ahead, since=since)
+
+    def list_partitions(self) -> List[Dict[str, Any]]:
+        """Секции attacks и targets"""
+        return self.db.list_partitions()
+
+    def expire_partitions(self, retain_months: Optional[int] = None, drop: bool = False) -> Dict[str, Any]:
+        """Отсоединение или удаление секций старше срока хранения"""
+        return self.db.expire_partitions(retain_months=retain_months, drop=drop)
+
+    def maintain_partitions(self) -> Dict[str, Any]:
+        """Плановое обслуживание секций: новые месяцы вперед и отсоединение устаревших"""
+        result = self.ensure_partitions()
+        if result.get("success") and db_config.partition_retain_months > 0:
+            expired = self.expire_partitions()
+            if not expired.get("success"):
+                return expired
+            result["message"] += f"; {expired['message']}"
+        return result
+
     def get_all_attacks(self) -> List[Dict[str, Any]]:
         """Получение всех атак"""
         return self.db.get_all_attacks()
 
+    def get_attack_stats(self) -> Dict[str, Any]:
+        """Счетчики статистики и разрезы по частоте, опасности, типу атаки и протоколу"""
+        return self.db.get_attack_stats()
+
+    def get_dashboard_rollups(self, days: int = 30) -> Dict[str, Any]:
+        """Сводки Dashboard: по типу и опасности, по протоколу, по дням и их устаревание"""
+        return self.db.get_dashboard_rollups(days=days)
+
+    def refresh_rollups(self, concurrently: bool = True) -> Dict[str, Any]:
+        """Обновление сводок Dashboard"""
+        return self.db.refresh_rollups(concurrently=concurrently)
+
+    def get_attack_changes(self, since: Optional[str] = None) -> Dict[str, Any]:
+        """Изменения атак после отметки: {"changed", "deleted_ids", "watermark", "full"}"""
+        return self.db.get_attack_changes(since=since)
+
+    def iter_attacks(self, batch_size: Optional[int] = None, frequencies: Optional[List[str]] = None,
+                     danger_levels: Optional[List[str]] = None, attack_types: Optional[List[str]] = None,
+                     protocols: Optional[List[str]] = None, ports: Optional[List[int]] = None,
+                     source_ips: Optional[List[str]] = None, tags: Optional[List[str]] = None,
+                     created_from: Optional[datetime] = None,
+                     created_to: Optional[datetime] = None) -> Iterator[List[Dict[str, Any]]]:
+        """Потоковое получение атак пакетами"""
+        return self.db.iter_attacks(
+            batch_size=batch_size,
+            frequencies=frequencies,
+            danger_levels=danger_levels,
+            attack_types=attack_types,
+            protocols=protocols,
+            ports=ports,
+            source_ips=source_ips,
+            tags=tags,
+            created_from=created_from,
+            created_to=created_to
+        )
+
+    def get_attacks_page(self, page_size: Optional[int] = None, cursor: Optional[str] = None,
+                         frequencies: Optional[List[str]] = None, danger_levels: Optional[List[str]] = None,
+                         attack_types: Optional[List[str]] = None,
+                         protocols: Optional[List[str]] = None, ports: Optional[List[int]] = None,
+                         source_ips: Optional[List[str]] = None, tags: Optional[List[str]] = None,
+                         created_from: Optional[datetime] = None,
+                         created_to: Optional[datetime] = None) -> Dict[str, Any]:
+        """Получение страницы атак: {"items", "next_cursor", "prev_cursor"}"""
+        return self.db.get_attacks_page(
+            page_size=page_size,
+            cursor=cursor,
+            frequencies=frequencies,
+            danger_levels=danger_levels,
+            attack_types=attack_types,
+            protocols=protocols,
+            ports=ports,
+            source_ips=source_ips,
+            tags=tags,
+            created_from=created_from,
+            created_to=created_to
+        )
+
     def get_attack(self, attack_id: str) -> Dict[str, Any]:
         """Получение конкретной атаки"""
         result = self.db.get_attack(attack_id)
@@ -30,34 +269,33 @@ class DDOSDatabaseClient:
         """Создание новой атаки"""
         return self.db.create_attack(attack_data)
 
+    def bulk_import_attacks(self, attacks: Iterable[Dict[str, Any]], batch_size: Optional[int] = None) -> Dict[str, Any]:
+        """Массовый импорт атак с целями"""
+        return self.db.bulk_import_attacks(attacks, batch_size=batch_size)
+
+    def upsert_attacks(self, attacks: Iterable[Dict[str, Any]], batch_size: Optional[int] = None) -> Dict[str, Any]:
+        """Идемпотентная запись пакета атак по id (неизмененные пропускаются)"""
+        return self.db.upsert_attacks(attacks, batch_size=batch_size)
+
+    def upsert_attack(self, attack_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Идемпотентная запись одной атаки по id"""
+        result = self.upsert_attacks([attack_data])
+        if result.get("success") and result["data"]["errors"]:
+            return {"success": False, "error": result["data"]["errors"][0]["error"]}
+        return result
+
     def update_attack(self, attack_id: str, attack_data: Dict[str, Any]) -> Dict[str, Any]:
         """Обновление атаки"""
         return self.db.update_attack(attack_id, attack_data)
 
-    def update_attack_with_targets(self, attack_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
+    def update_attack_with_targets(self, attack_id: str, data: Dict[str, Any],
+                                   sync_targets: bool = True) -> Dict[str, Any]:
         """Обновление атаки с целями"""
-        return self.db.update_attack_with_targets(attack_id, data)
+        return self.db.update_attack_with_targets(attack_id, data, sync_targets=sync_targets)
 
     def update_attack_targets(self, attack_id: str, targets: List[Dict[str, Any]]) -> Dict[str, Any]:
-        """Обновление только целей атаки"""
-        # Получаем текущую атаку
-        current_attack = self.db.get_attack(attack_id)
-        if not current_attack:
-            raise Exception(f"Attack {attack_id} not found")
-
-        # Обновляем только цели
-        update_data = {
-            "name": current_attack["name"],
-            "frequency": current_attack["frequency"],
-            "danger": current_attack["danger"],
-            "attack_type": current_attack["attack_type"],
-            "source_ips": current_attack["source_ips"],
-            "affected_ports": current_attack["affected_ports"],
-            "mitigation_strategies": current_attack["mitigation_strategies"],
-            "targets": targets
-        }
-
-        return self.db.update_attack_with_targets(attack_id, update_data)
+        """Обновление только целей атаки (записываются только изменения)"""
+        return self.db.sync_attack_targets(attack_id, targets)
 
     def update_target(self, target_id: str, target_data: Dict[str, Any]) -> Dict[str, Any]:
         """Обновление конкретной цели"""
@@ -67,6 +305,14 @@ class DDOSDatabaseClient:
         """Удаление атаки"""
         return self.db.delete_attack(attack_id)
 
+    def delete_attacks(self, attack_ids: Iterable[str]) -> Dict[str, Any]:
+        """Удаление набора атак одной транзакцией"""
+        return self.db.delete_attacks(attack_ids)
+
+    def update_attacks(self, attack_ids: Iterable[str], fields: Dict[str, Any]) -> Dict[str, Any]:
+        """Изменение полей набора атак одним запросом"""
+        return self.db.update_attacks(attack_ids, fields)
+
     def reset_database(self) -> Dict[str, Any]:
         """Сброс базы данных"""
         return self.db.reset_database()
@@ -96,16 +342,44 @@ class DDOSDatabaseClient:
             return self.get_all_attacks()
         return self.db.filter_attacks(protocols=protocols)
 
+    def filter_attacks_by_port(self, ports: List[int]) -> List[Dict[str, Any]]:
+        """Фильтрация атак по затронутым портам"""
+        if not ports:
+            return self.get_all_attacks()
+        return self.db.filter_attacks(ports=ports)
+
+    def filter_attacks_by_source_ip(self, source_ips: List[str]) -> List[Dict[str, Any]]:
+        """Фильтрация атак по IP-адресам источников"""
+        if not source_ips:
+            return self.get_all_attacks()
+        return self.db.filter_attacks(source_ips=source_ips)
+
+    def filter_attacks_by_target_tag(self, tags: List[str]) -> List[Dict[str, Any]]:
+        """Фильтрация атак по тегам целей"""
+        if not tags:
+            return self.get_all_attacks()
+        return self.db.filter_attacks(tags=tags)
+
     def filter_attacks_by_multiple(self, frequencies: Optional[List[str]] = None,
                                    danger_levels: Optional[List[str]] = None,
                                    attack_types: Optional[List[str]] = None,
-                                   protocols: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+                                   protocols: Optional[List[str]] = None,
+                                   ports: Optional[List[int]] = None,
+                                   source_ips: Optional[List[str]] = None,
+                                   tags: Optional[List[str]] = None,
+                                   created_from: Optional[datetime] = None,
+                                   created_to: Optional[datetime] = None) -> List[Dict[str, Any]]:
         """Фильтрация атак по нескольким параметрам"""
         return self.db.filter_attacks(
             frequencies=frequencies,
             danger_levels=danger_levels,
             attack_types=attack_types,
-            protocols=protocols
+            protocols=protocols,
+            ports=ports,
+            source_ips=source_ips,
+            tags=tags,
+            created_from=created_from,
+            created_to=created_to
         )
 
     def _extract_attacks_data(self, data: Any) -> List[Dict[str, Any]]:
@@ -0,0 +1,480 @@
+import asyncio
+import threading
+import time
+from typing import Dict, Any, List, Tuple
+
+import psycopg2
+import psycopg2.extensions
+
+
+class PoolError(Exception):
+    """Ошибка пула соединений"""
+
+
+class PoolTimeoutError(PoolError):
+    """Не удалось получить соединение за отведенное время"""
+
+
+class ConnectionPool:
+    """Потокобезопасный пул соединений PostgreSQL.
+
+    Соединения выдаются через getconn() и возвращаются через putconn().
+    Перед выдачей соединение проверяется, сломанные соединения выбрасываются
+    из пула и заменяются новыми.
+    """
+
+    def __init__(self, connect_kwargs: Dict[str, Any], min_size: int = 1, max_size: int = 10,
+                 timeout: float = 30.0, validation_interval: float = 30.0,
+                 max_idle_time: float = 300.0):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError(f"Invalid pool size: min={min_size}, max={max_size}")
+
+        self._connect_kwargs = dict(connect_kwargs)
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        # Соединения, простаивавшие дольше этого интервала, проверяются запросом SELECT 1
+        self.validation_interval = validation_interval
+        # Простаивающие соединения сверх min_size закрываются после этого времени
+        self.max_idle_time = max_idle_time
+
+        self._cond = threading.Condition()
+        self._idle: List[Tuple[Any, float]] = []
+        self._in_use: Dict[int, Any] = {}
+        self._size = 0
+        self._waiting = 0
+        self._closed = False
+        self._prefilled = False
+
+        self._stats = {
+            "created": 0,
+            "reused": 0,
+            "discarded": 0,
+            "checkouts": 0,
+            "timeouts": 0,
+            "wait_time": 0.0
+        }
+
+    def _connect(self):
+        """Открытие нового физического соединения"""
+        conn = psycopg2.connect(**self._connect_kwargs)
+        with self._cond:
+            self._stats["created"] += 1
+        return conn
+
+    def _prefill(self):
+        """Открытие min_size соединений при первом обращении к пулу"""
+        with self._cond:
+            if self._prefilled:
+                return
+            self._prefilled = True
+            missing = max(0, self.min_size - self._size)
+            self._size += missing
+
+        opened = 0
+        try:
+            for _ in range(missing):
+                conn = self._connect()
+                opened += 1
+                with self._cond:
+                    self._idle.append((conn, time.monotonic()))
+                    self._cond.notify()
+        except Exception:
+            # Недоступная БД не должна ломать пул - недостающие соединения откроются по требованию
+            with self._cond:
+                self._size -= missing - opened
+                self._prefilled = False
+
+    def _reserve(self, deadline: float):
+        """Резервирование слота: простаивающее соединение или право открыть новое"""
+        with self._cond:
+            started = time.monotonic()
+            waited = False
+            try:
+                while True:
+                    if self._closed:
+                        raise PoolError("Connection pool is closed")
+
+                    if self._idle:
+                        conn, last_used = self._idle.pop()
+                        return conn, last_used
+
+                    if self._size < self.max_size:
+                        self._size += 1
+                        return None, None
+
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats["timeouts"] += 1
+                        raise PoolTimeoutError(
+                            f"Timed out after {self.timeout}s waiting for a database connection "
+                            f"(pool size {self.max_size})"
+                        )
+
+                    if not waited:
+                        waited = True
+                        self._waiting += 1
+                    self._cond.wait(remaining)
+            finally:
+                if waited:
+                    self._waiting -= 1
+                    self._stats["wait_time"] += time.monotonic() - started
+
+    def _is_usable(self, conn, last_used: float) -> bool:
+        """Проверка соединения перед выдачей"""
+        if conn.closed:
+            return False
+        if conn.get_transaction_status() == psycopg2.extensions.TRANSACTION_STATUS_UNKNOWN:
+            return False
+        if time.monotonic() - last_used < self.validation_interval:
+            return True
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT 1")
+            cursor.close()
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    def _close_quietly(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _drop(self, conn):
+        """Удаление соединения из пула"""
+        self._close_quietly(conn)
+        with self._cond:
+            self._size -= 1
+            self._stats["discarded"] += 1
+            self._cond.notify()
+
+    def getconn(self):
+        """Получение соединения из пула"""
+        self._prefill()
+        deadline = time.monotonic() + self.timeout
+
+        while True:
+            conn, last_used = self._reserve(deadline)
+
+            if conn is None:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+                reused = False
+            elif self._is_usable(conn, last_used):
+                reused = True
+            else:
+                self._drop(conn)
+                continue
+
+            with self._cond:
+                self._in_use[id(conn)] = conn
+                self._stats["checkouts"] += 1
+                if reused:
+                    self._stats["reused"] += 1
+            return conn
+
+    def putconn(self, conn, discard: bool = False):
+        """Возврат соединения в пул"""
+        with self._cond:
+            if self._in_use.pop(id(conn), None) is None:
+                raise PoolError("Connection does not belong to this pool")
+
+        broken = discard or self._closed or conn.closed
+        if not broken:
+            try:
+                # Незавершенная транзакция не должна переходить к следующему владельцу
+                if conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+                if conn.autocommit:
+                    conn.autocommit = False
+            except Exception:
+                broken = True
+
+        if broken:
+            self._drop(conn)
+            return
+
+        now = time.monotonic()
+        expired = []
+        with self._cond:
+            self._idle.append((conn, now))
+            # Закрываем давно простаивающие соединения сверх минимального размера
+            while self._size - len(expired) > self.min_size and self._idle \
+                    and now - self._idle[0][1] > self.max_idle_time:
+                expired.append(self._idle.pop(0)[0])
+            self._cond.notify()
+
+        for stale in expired:
+            self._drop(stale)
+
+    def stats(self) -> Dict[str, Any]:
+        """Статистика пула"""
+        with self._cond:
+            stats = dict(self._stats)
+            stats.update({
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": len(self._in_use),
+                "waiting": self._waiting,
+                "closed": self._closed
+            })
+        return stats
+
+    def closeall(self):
+        """Закрытие всех соединений. Выданные соединения закроются при возврате"""
+        with self._cond:
+            self._closed = True
+            idle = [conn for conn, _ in self._idle]
+            self._idle = []
+            self._size -= len(idle)
+            self._cond.notify_all()
+
+        for conn in idle:
+            self._close_quietly(conn)
+
+
+async def wait_ready(conn):
+    """Ожидание готовности асинхронного соединения psycopg2 без блокировки цикла событий"""
+    loop = asyncio.get_running_loop()
+    while True:
+        state = conn.poll()
+        if state == psycopg2.extensions.POLL_OK:
+            return
+        if state == psycopg2.extensions.POLL_READ:
+            add, remove = loop.add_reader, loop.remove_reader
+        elif state == psycopg2.extensions.POLL_WRITE:
+            add, remove = loop.add_writer, loop.remove_writer
+        else:
+            raise psycopg2.OperationalError(f"Unexpected poll state: {state}")
+
+        ready = loop.create_future()
+        fd = conn.fileno()
+        add(fd, lambda: ready.done() or ready.set_result(None))
+        try:
+            await ready
+        finally:
+            remove(fd)
+
+
+class AsyncConnectionPool:
+    """Пул асинхронных соединений PostgreSQL для asyncio.
+
+    Соединения открываются в асинхронном режиме psycopg2 (async_=1) и ожидаются
+    через цикл событий, поэтому один поток обслуживает много запросов сразу.
+    Все методы вызываются из потока цикла событий. Асинхронные соединения
+    работают в режиме autocommit: транзакции открываются явным BEGIN.
+    """
+
+    def __init__(self, connect_kwargs: Dict[str, Any], min_size: int = 1, max_size: int = 10,
+                 timeout: float = 30.0, validation_interval: float = 30.0,
+                 max_idle_time: float = 300.0):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError(f"Invalid pool size: min={min_size}, max={max_size}")
+
+        self._connect_kwargs = dict(connect_kwargs)
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.validation_interval = validation_interval
+        self.max_idle_time = max_idle_time
+
+        # Условие создается в цикле событий при первом обращении
+        self._cond = None
+        self._idle: List[Tuple[Any, float]] = []
+        self._in_use: Dict[int, Any] = {}
+        self._size = 0
+        self._waiting = 0
+        self._closed = False
+
+        self._stats = {
+            "created": 0,
+            "reused": 0,
+            "discarded": 0,
+            "checkouts": 0,
+            "timeouts": 0,
+            "wait_time": 0.0
+        }
+
+    def _condition(self) -> asyncio.Condition:
+        if self._cond is None:
+            self._cond = asyncio.Condition()
+        return self._cond
+
+    async def _connect(self):
+        """Открытие нового асинхронного соединения"""
+        conn = psycopg2.connect(async_=1, **self._connect_kwargs)
+        try:
+            await wait_ready(conn)
+        except BaseException:
+            conn.close()
+            raise
+        self._stats["created"] += 1
+        return conn
+
+    async def _reserve(self, deadline: float):
+        """Резервирование слота: простаивающее соединение или право открыть новое"""
+        cond = self._condition()
+        async with cond:
+            started = time.monotonic()
+            waited = False
+            try:
+                while True:
+                    if self._closed:
+                        raise PoolError("Connection pool is closed")
+
+                    if self._idle:
+                        return self._idle.pop()
+
+                    if self._size < self.max_size:
+                        self._size += 1
+                        return None, None
+
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats["timeouts"] += 1
+                        raise PoolTimeoutError(
+                            f"Timed out after {self.timeout}s waiting for a database connection "
+                            f"(pool size {self.max_size})"
+                        )
+
+                    if not waited:
+                        waited = True
+                        self._waiting += 1
+                    try:
+                        await asyncio.wait_for(cond.wait(), remaining)
+                    except asyncio.TimeoutError:
+                        pass
+            finally:
+                if waited:
+                    self._waiting -= 1
+                    self._stats["wait_time"] += time.monotonic() - started
+
+    async def _is_usable(self, conn, last_used: float) -> bool:
+        """Проверка соединения перед выдачей"""
+        if conn.closed:
+            return False
+        if time.monotonic() - last_used < self.validation_interval:
+            return True
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT 1")
+            await wait_ready(conn)
+            cursor.close()
+            return True
+        except Exception:
+            return False
+
+    async def _release_slot(self):
+        cond = self._condition()
+        async with cond:
+            self._size -= 1
+            cond.notify()
+
+    async def _drop(self, conn):
+        """Удаление соединения из пула"""
+        try:
+            conn.close()
+        except Exception:
+            pass
+        self._stats["discarded"] += 1
+        await self._release_slot()
+
+    async def getconn(self):
+        """Получение соединения из пула"""
+        deadline = time.monotonic() + self.timeout
+
+        while True:
+            conn, last_used = await self._reserve(deadline)
+
+            if conn is None:
+                try:
+                    conn = await self._connect()
+                except BaseException:
+                    await self._release_slot()
+                    raise
+                reused = False
+            elif await self._is_usable(conn, last_used):
+                reused = True
+            else:
+                await self._drop(conn)
+                continue
+
+            self._in_use[id(conn)] = conn
+            self._stats["checkouts"] += 1
+            if reused:
+                self._stats["reused"] += 1
+            return conn
+
+    async def putconn(self, conn, discard: bool = False):
+        """Возврат соединения в пул"""
+        if self._in_use.pop(id(conn), None) is None:
+            raise PoolError("Connection does not belong to this pool")
+
+        # Прерванный на середине запрос оставляет соединение в неизвестном состоянии
+        broken = discard or self._closed or conn.closed or conn.isexecuting()
+        if not broken and conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+            try:
+                # Незавершенная транзакция не должна переходить к следующему владельцу
+                cursor = conn.cursor()
+                cursor.execute("ROLLBACK")
+                await wait_ready(conn)
+            except Exception:
+                broken = True
+
+        if broken:
+            await self._drop(conn)
+            return
+
+        now = time.monotonic()
+        expired = []
+        cond = self._condition()
+        async with cond:
+            self._idle.append((conn, now))
+            # Закрываем давно простаивающие соединения сверх минимального размера
+            while self._size - len(expired) > self.min_size and self._idle \
+                    and now - self._idle[0][1] > self.max_idle_time:
+                expired.append(self._idle.pop(0)[0])
+            cond.notify()
+
+        for stale in expired:
+            await self._drop(stale)
+
+    def stats(self) -> Dict[str, Any]:
+        """Статистика пула"""
+        stats = dict(self._stats)
+        stats.update({
+            "min_size": self.min_size,
+            "max_size": self.max_size,
+            "size": self._size,
+            "idle": len(self._idle),
+            "in_use": len(self._in_use),
+            "waiting": self._waiting,
+            "closed": self._closed
+        })
+        return stats
+
+    async def closeall(self):
+        """Закрытие всех соединений. Выданные соединения закроются при возврате"""
+        cond = self._condition()
+        async with cond:
+            self._closed = True
+            idle = [conn for conn, _ in self._idle]
+            self._idle = []
+            self._size -= len(idle)
+            cond.notify_all()
+
+        for conn in idle:
+            try:
+                conn.close()
+            except Exception:
+                pass
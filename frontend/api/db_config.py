@@ -10,6 +10,64 @@ class DatabaseConfig:
     username: str = os.getenv("DB_USER", "postgres")
     password: str = os.getenv("DB_PASSWORD", "zukozuko_2019A1")
 
+    # Параметры пула соединений
+    pool_min_size: int = int(os.getenv("DB_POOL_MIN_SIZE", "1"))
+    pool_max_size: int = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+    pool_timeout: float = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+    pool_validation_interval: float = float(os.getenv("DB_POOL_VALIDATION_INTERVAL", "30"))
+
+    # Подготовленные выражения для частых запросов (выключить при работе через PgBouncer в режиме transaction)
+    prepared_statements: bool = os.getenv("DB_PREPARED_STATEMENTS", "1").lower() in ("1", "true", "yes")
+
+    # Клиентский кеш атак: время жизни записи (сек) и ограничение по памяти (МБ)
+    cache_enabled: bool = os.getenv("DB_CACHE", "1").lower() in ("1", "true", "yes")
+    cache_ttl: float = float(os.getenv("DB_CACHE_TTL", "30"))
+    cache_max_mb: int = int(os.getenv("DB_CACHE_MAX_MB", "64"))
+
+    # Локальный снимок атак для мгновенного старта (путь по умолчанию - каталог кеша пользователя)
+    snapshot_enabled: bool = os.getenv("DB_SNAPSHOT", "1").lower() in ("1", "true", "yes")
+    snapshot_path: str = os.getenv("DB_SNAPSHOT_PATH", "")
+
+    # Живые обновления через LISTEN/NOTIFY (нужно прямое соединение: PgBouncer в режиме transaction не передает NOTIFY)
+    live_updates: bool = os.getenv("DB_LIVE_UPDATES", "1").lower() in ("1", "true", "yes")
+
+    # Пауза между повторными запросами счетчиков статистики при потоке изменений, сек
+    stats_refresh_interval: float = float(os.getenv("DB_STATS_REFRESH_INTERVAL", "5"))
+
+    # Период фонового обновления сводок Dashboard, сек (0 - только вручную)
+    rollup_interval: float = float(os.getenv("DB_ROLLUP_INTERVAL", "300"))
+
+    # Пользовательские запросы (построитель запросов, текстовый поиск): statement_timeout, сек
+    # (0 - без ограничения), и сколько их может выполняться одновременно
+    adhoc_timeout: float = float(os.getenv("DB_ADHOC_TIMEOUT", "30"))
+    adhoc_max_queries: int = int(os.getenv("DB_ADHOC_MAX_QUERIES", "2"))
+    # Сколько строк результата показывать сразу (остальные - по "Load more" или выгрузкой в файл)
+    adhoc_preview_rows: int = int(os.getenv("DB_ADHOC_PREVIEW_ROWS", "1000"))
+    # Через сколько секунд простоя закрывается недочитанный результат (курсор держит транзакцию и блокировки)
+    adhoc_stream_idle: float = float(os.getenv("DB_ADHOC_STREAM_IDLE", "60"))
+    # Последовательное чтение таблицы от этого числа строк подсвечивается в плане запроса
+    plan_large_table_rows: int = int(os.getenv("DB_PLAN_LARGE_TABLE_ROWS", "10000"))
+
+    # Помесячное секционирование attacks и targets по created_at (действует при создании таблиц):
+    # сколько месяцев вперед создавать секции и сколько хранить (0 - хранить все)
+    partitioned: bool = os.getenv("DB_PARTITIONED", "0").lower() in ("1", "true", "yes")
+    partition_months_ahead: int = int(os.getenv("DB_PARTITION_MONTHS_AHEAD", "3"))
+    partition_retain_months: int = int(os.getenv("DB_PARTITION_RETAIN_MONTHS", "0"))
+
+    # Запросы через общий цикл asyncio (AsyncDatabaseManager) вместо потока на каждый запрос
+    use_async: bool = os.getenv("DB_ASYNC", "0").lower() in ("1", "true", "yes")
+
+    @property
+    def connect_kwargs(self):
+        """Параметры psycopg2.connect"""
+        return {
+            "host": self.host,
+            "port": self.port,
+            "database": self.database,
+            "user": self.username,
+            "password": self.password
+        }
+
     @property
     def connection_string(self):
         return f"postgresql://{self.username}:{self.password}@{self.host}:{self.port}/{self.database}"
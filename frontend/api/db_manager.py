@@ -1,45 +1,215 @@
 import psycopg2
 import psycopg2.extras
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Iterable, Iterator
 from datetime import datetime
+from itertools import islice
+import io
 import json
+import time
 from .db_config import db_config
+from .connection_pool import ConnectionPool
+from .attack_queries import AttackQueries
+from .prepared_statements import PreparedStatementConnection
+
+
+class DatabaseManager(AttackQueries):
+    # Начиная с этого количества целей вставка идет через COPY вместо многострочного INSERT
+    TARGETS_COPY_THRESHOLD = 1000
+
+    # Размер пакета массового импорта по умолчанию
+    IMPORT_BATCH_SIZE = 1000
+
+    # Размер пакета потокового чтения по умолчанию
+    STREAM_BATCH_SIZE = 500
+
+    # Управляемый набор индексов: (имя, таблица, определение)
+    INDEXES = (
+        # Загрузка целей атак, каскадное удаление и проверка протокола в EXISTS
+        ("idx_targets_attack_id_protocol", "targets", "(attack_id, protocol)"),
+        # Сортировка списка и keyset-пагинация по (created_at, id)
+        ("idx_attacks_created_at_id", "attacks", "(created_at DESC, id DESC)"),
+        # Синхронизация изменений по отметке (updated_at, id)
+        ("idx_attacks_updated_at_id", "attacks", "(updated_at, id)"),
+        # Фильтры по перечислениям с сохранением порядка сортировки
+        ("idx_attacks_frequency_created_at", "attacks", "(frequency, created_at DESC, id DESC)"),
+        ("idx_attacks_danger_created_at", "attacks", "(danger, created_at DESC, id DESC)"),
+        ("idx_attacks_attack_type_created_at", "attacks", "(attack_type, created_at DESC, id DESC)"),
+        # Запросы на вхождение (@>) в JSONB
+        ("idx_attacks_source_ips_gin", "attacks", "USING GIN (source_ips jsonb_path_ops)"),
+        ("idx_attacks_affected_ports_gin", "attacks", "USING GIN (affected_ports jsonb_path_ops)"),
+        ("idx_targets_tags_gin", "targets", "USING GIN (tags jsonb_path_ops)")
+    )
+
+    # Сводки Dashboard: (имя представления, запрос, уникальный индекс для REFRESH ... CONCURRENTLY)
+    ROLLUPS = (
+        ("rollup_attacks_by_type_danger", """
+            SELECT attack_type, danger, count(*) AS attacks, max(created_at) AS last_attack_at
+            FROM attacks GROUP BY attack_type, danger
+        """, "(attack_type, danger)"),
+        ("rollup_attacks_by_protocol", """
+            SELECT coalesce(protocol, 'unknown') AS protocol, count(DISTINCT attack_id) AS attacks,
+                   count(*) AS targets
+            FROM targets GROUP BY 1
+        """, "(protocol)"),
+        ("rollup_attacks_by_day", """
+            SELECT created_at::date AS day, count(*) AS attacks,
+                   count(*) FILTER (WHERE danger = 'critical') AS critical
+            FROM attacks GROUP BY 1
+        """, "(day)")
+    )
+
+    # Ключ advisory-блокировки: сводки обновляет только один процесс одновременно
+    ROLLUP_LOCK_KEY = 52019
+
+    # Сколько id атак помещается в одно уведомление (payload NOTIFY ограничен 8000 байт)
+    NOTIFY_CHUNK_SIZE = 100
+
+    # Функции триггеров уведомлений: таблица -> выражение id атаки в строке
+    NOTIFY_SOURCES = {"attacks": "id", "targets": "attack_id"}
+
+    # Секционированные таблицы: таблица -> ключ секции (created_at атаки)
+    PARTITION_KEYS = {"attacks": "created_at", "targets": "attack_created_at"}
+    # Суффикс отсоединенных секций-архивов (expire_partitions)
+    ARCHIVE_SUFFIX = "_archived"
+
+    # JSON-столбцы, хранящиеся как JSONB: таблица -> [(столбец, NOT NULL)]
+    JSON_COLUMNS = {
+        "attacks": [("source_ips", True), ("affected_ports", True), ("mitigation_strategies", True)],
+        "targets": [("tags", False)]
+    }
 
-
-class DatabaseManager:
     def __init__(self, config=None):
         self.config = config or db_config
+        self.pool = ConnectionPool(
+            dict(self.config.connect_kwargs, connection_factory=PreparedStatementConnection),
+            min_size=self.config.pool_min_size,
+            max_size=self.config.pool_max_size,
+            timeout=self.config.pool_timeout,
+            validation_interval=self.config.pool_validation_interval
+        )
 
     def get_connection(self):
-        """Получение соединения с PostgreSQL"""
-        conn = psycopg2.connect(
-            host=self.config.host,
-            port=self.config.port,
-            database=self.config.database,
-            user=self.config.username,
-            password=self.config.password
-        )
-        return conn
+        """Получение соединения из пула (вернуть через release_connection)"""
+        return self.pool.getconn()
 
-    def _parse_json_field(self, field_value):
-        """Парсинг JSON полей из БД"""
-        if isinstance(field_value, (list, dict)):
-            return field_value
-        elif field_value:
-            try:
-                return json.loads(field_value)
-            except (json.JSONDecodeError, TypeError):
-                return []
+    def release_connection(self, conn, discard: bool = False):
+        """Возврат соединения в пул"""
+        self.pool.putconn(conn, discard=discard)
+
+    def get_pool_stats(self) -> Dict[str, Any]:
+        """Статистика пула соединений"""
+        return self.pool.stats()
+
+    def close(self):
+        """Закрытие всех соединений пула"""
+        self.pool.closeall()
+
+    def _execute_prepared(self, cursor, sql: str, params=()):
+        """Выполнение частого запроса через подготовленное на соединении выражение"""
+        commands, query = self._prepared_commands(cursor.connection, sql, params)
+        try:
+            for command in commands:
+                cursor.execute(command)
+        except psycopg2.Error:
+            self._forget_prepared(cursor.connection, sql)
+            raise
+        try:
+            cursor.execute(query, params)
+        except psycopg2.Error as e:
+            self._prepared_failed(cursor.connection, sql, e)
+            raise
+
+    def _hydrate_attacks(self, cursor, attack_rows) -> List[Dict[str, Any]]:
+        """Загрузка целей для набора атак одним запросом вместо запроса на каждую атаку"""
+        attacks = [self._row_to_attack(row) for row in attack_rows]
+        if not attacks:
+            return attacks
+
+        self._execute_prepared(cursor, *self._targets_query(attacks))
+        return self._attach_targets(attacks, cursor.fetchall())
+
+    @staticmethod
+    def _copy_value(value) -> str:
+        """Экранирование значения для текстового формата COPY"""
+        if value is None:
+            return "\\N"
+        return (str(value).replace("\\", "\\\\").replace("\t", "\\t")
+                .replace("\n", "\\n").replace("\r", "\\r"))
+
+    def _copy_rows(self, cursor, table: str, columns, rows):
+        """Потоковая загрузка строк через COPY FROM STDIN"""
+        buffer = io.StringIO()
+        for row in rows:
+            buffer.write("\t".join(self._copy_value(value) for value in row))
+            buffer.write("\n")
+        buffer.seek(0)
+        cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN", buffer)
+
+    def _insert_targets(self, cursor, attack_id: str, targets: List[Dict[str, Any]]) -> int:
+        """Пакетная вставка целей атаки: один многострочный INSERT или COPY для больших списков"""
+        return self._write_target_rows(cursor, [self._target_row(attack_id, target_data) for target_data in targets])
+
+    def _write_target_rows(self, cursor, rows: List[tuple]) -> int:
+        """Вставка подготовленных строк targets"""
+        if not rows:
+            return 0
+
+        if self.config.partitioned:
+            # COPY не может взять ключ секции из attacks: пакеты INSERT ... SELECT
+            sql, values, template = self._target_insert(rows)
+            psycopg2.extras.execute_values(cursor, sql, values, template=template,
+                                           page_size=self.TARGETS_COPY_THRESHOLD)
+        elif len(rows) >= self.TARGETS_COPY_THRESHOLD:
+            self._copy_rows(cursor, "targets", self.TARGET_COLUMNS, rows)
         else:
-            return []
+            psycopg2.extras.execute_values(cursor, self.INSERT_TARGETS_SQL, rows, page_size=len(rows))
+        return len(rows)
+
+    def _sync_targets(self, cursor, attack_id: str, targets: List[Dict[str, Any]]) -> Dict[str, int]:
+        """Синхронизация целей атаки по разнице с сохраненными пакетными запросами в текущей транзакции"""
+        cursor.execute(self.LOCK_TARGETS_SQL, (attack_id,))
+        updates, deletes, inserts, unchanged = self._plan_target_sync(attack_id, cursor.fetchall(), targets)
+
+        if updates:
+            psycopg2.extras.execute_values(cursor, self.UPDATE_TARGETS_SQL, updates,
+                                           template=self.UPDATE_TARGETS_TEMPLATE, page_size=len(updates))
+
+        if deletes:
+            cursor.execute("DELETE FROM targets WHERE id = ANY(%s)", (deletes,))
+
+        self._write_target_rows(cursor, inserts)
+
+        return self._sync_summary(updates, deletes, inserts, unchanged)
 
     def initialize_database(self) -> Dict[str, Any]:
-        """Создание таблиц в PostgreSQL"""
+        """Создание таблиц в PostgreSQL.
+
+        Индексы новых таблиц создаются в той же транзакции. Недостающие индексы уже
+        существующих таблиц строятся после фиксации через upgrade_indexes(concurrently=True).
+        """
         conn = None
         try:
             conn = self.get_connection()
             cursor = conn.cursor()
 
+            # Секционирование задается при создании таблиц: существующие таблицы другого вида не меняются
+            partitioned = self._partitioned_state(cursor)
+            if partitioned is not None and partitioned != self.config.partitioned:
+                kind = "partitioned" if partitioned else "not partitioned"
+                return {
+                    "success": False,
+                    "error": f"Table attacks already exists and is {kind}: set DB_PARTITIONED accordingly "
+                             f"or recreate the tables with reset_database"
+                }
+
+            # Таблицы, существовавшие до запуска: индексы для них строятся вне транзакции
+            cursor.execute("SELECT name FROM unnest(%s::text[]) AS name WHERE to_regclass(name) IS NOT NULL",
+                           (["attacks", "targets"],))
+            existing_tables = {name for name, in cursor.fetchall()}
+
+            if self.config.partitioned:
+                self._create_partitioned_tables(cursor)
+
             # Таблица атак
             cursor.execute("""
                 CREATE TABLE IF NOT EXISTS attacks (
@@ -48,9 +218,9 @@ class DatabaseManager:
                     frequency VARCHAR(50) NOT NULL,
                     danger VARCHAR(50) NOT NULL,
                     attack_type VARCHAR(50) NOT NULL,
-                    source_ips TEXT NOT NULL,
-                    affected_ports TEXT NOT NULL,
-                    mitigation_strategies TEXT NOT NULL,
+                    source_ips JSONB NOT NULL,
+                    affected_ports JSONB NOT NULL,
+                    mitigation_strategies JSONB NOT NULL,
                     created_at TIMESTAMP NOT NULL,
                     updated_at TIMESTAMP NOT NULL
                 )
@@ -65,19 +235,630 @@ class DatabaseManager:
                     target_domain VARCHAR(255),
                     port INTEGER DEFAULT 80,
                     protocol VARCHAR(50) DEFAULT 'tcp',
-                    tags TEXT,
+                    tags JSONB,
                     FOREIGN KEY (attack_id) REFERENCES attacks (id) ON DELETE CASCADE
                 )
             """)
 
+            # Записи об удаленных атаках для синхронизации изменений
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS attack_tombstones (
+                    attack_id VARCHAR(36) PRIMARY KEY,
+                    deleted_at TIMESTAMP NOT NULL
+                )
+            """)
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_attack_tombstones_deleted_at
+                ON attack_tombstones (deleted_at, attack_id)
+            """)
+
+            # Хеш содержимого последней записи через upsert_attacks (NULL - записано другим способом)
+            cursor.execute("ALTER TABLE attacks ADD COLUMN IF NOT EXISTS content_hash VARCHAR(64)")
+
+            # Таблицы, созданные старой версией, хранят JSON в TEXT
+            migrated = self._migrate_json_columns(cursor)
+
+            # Индексы новых таблиц строим сразу; недостающие индексы существующих таблиц
+            # строит upgrade_indexes после фиксации, не блокируя запись
+            cursor.execute("""
+                SELECT c.relname
+                FROM pg_index i
+                JOIN pg_class c ON c.oid = i.indexrelid
+                JOIN pg_namespace n ON n.oid = c.relnamespace
+                WHERE n.nspname = current_schema() AND i.indisvalid AND c.relname = ANY(%s)
+            """, ([name for name, _, _ in self.INDEXES],))
+            valid_indexes = {name for name, in cursor.fetchall()}
+            deferred_indexes = []
+            for name, table, definition in self.INDEXES:
+                if table not in existing_tables:
+                    cursor.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} {definition}")
+                elif name not in valid_indexes:
+                    deferred_indexes.append(name)
+
+            self._create_change_triggers(cursor)
+            self._create_sync_triggers(cursor)
+            self._create_rollups(cursor)
+
+            partitions = None
+            if self.config.partitioned:
+                today = datetime.now().date()
+                partitions = self._create_partitions(cursor, [
+                    self._month_start(today, shift) for shift in range(self.config.partition_months_ahead + 1)
+                ])
+
             conn.commit()
-            return {"success": True, "message": "Database tables created successfully"}
+            self.release_connection(conn)
+            conn = None
+
+            message = "Database tables created successfully"
+            if migrated:
+                message += f" (migrated to JSONB: {', '.join(migrated)})"
+            if partitions is not None:
+                message += f" (partitioned by month, {len(partitions['created'])} partitions created)"
+
+            indexes = None
+            if deferred_indexes:
+                indexes = self.upgrade_indexes(concurrently=True)
+                if indexes["success"]:
+                    message += f" ({indexes['message']})"
+                else:
+                    message += f" ({indexes['error']}; run upgrade_indexes to retry)"
+            return {"success": True, "data": {"deferred_indexes": deferred_indexes, "indexes": indexes},
+                    "message": message}
 
         except Exception as e:
             return {"success": False, "error": str(e)}
         finally:
             if conn is not None:
-                conn.close()
+                self.release_connection(conn)
+
+    @staticmethod
+    def _partitioned_state(cursor) -> Optional[bool]:
+        """Секционирована ли существующая таблица attacks (None - таблицы нет)"""
+        cursor.execute("""
+            SELECT c.relkind = 'p' FROM pg_class c
+            WHERE c.oid = to_regclass('attacks')
+        """)
+        row = cursor.fetchone()
+        return row[0] if row else None
+
+    def _create_partitioned_tables(self, cursor):
+        """Таблицы attacks и targets, секционированные по месяцам created_at атаки.
+
+        Первичный ключ секционированной таблицы включает ключ секции, поэтому цели
+        хранят created_at атаки (attack_created_at) и ссылаются на (id, created_at).
+        Строки вне созданных секций попадают в секции DEFAULT.
+        """
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS attacks (
+                id VARCHAR(36) NOT NULL,
+                name VARCHAR(255) NOT NULL,
+                frequency VARCHAR(50) NOT NULL,
+                danger VARCHAR(50) NOT NULL,
+                attack_type VARCHAR(50) NOT NULL,
+                source_ips JSONB NOT NULL,
+                affected_ports JSONB NOT NULL,
+                mitigation_strategies JSONB NOT NULL,
+                created_at TIMESTAMP NOT NULL,
+                updated_at TIMESTAMP NOT NULL,
+                content_hash VARCHAR(64),
+                PRIMARY KEY (id, created_at)
+            ) PARTITION BY RANGE (created_at)
+        """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS targets (
+                id SERIAL,
+                attack_id VARCHAR(36) NOT NULL,
+                target_ip VARCHAR(255),
+                target_domain VARCHAR(255),
+                port INTEGER DEFAULT 80,
+                protocol VARCHAR(50) DEFAULT 'tcp',
+                tags JSONB,
+                attack_created_at TIMESTAMP NOT NULL,
+                PRIMARY KEY (id, attack_created_at),
+                FOREIGN KEY (attack_id, attack_created_at) REFERENCES attacks (id, created_at) ON DELETE CASCADE
+            ) PARTITION BY RANGE (attack_created_at)
+        """)
+        for table in self.PARTITION_KEYS:
+            cursor.execute(f"CREATE TABLE IF NOT EXISTS {table}_default PARTITION OF {table} DEFAULT")
+
+    def _create_partitions(self, cursor, months: Iterable) -> Dict[str, List[str]]:
+        """Создание недостающих месячных секций attacks и targets.
+
+        Месяц, строки которого уже лежат в секциях DEFAULT, пропускается: PostgreSQL
+        не создаст секцию, пока эти строки не перенесены.
+        """
+        cursor.execute("""
+            SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = ANY(ARRAY['attacks'::regclass, 'targets'::regclass])
+        """)
+        existing = {name for name, in cursor.fetchall()}
+
+        created = []
+        blocked = []
+        for month in sorted(set(months)):
+            names = {table: self._partition_name(table, month) for table in self.PARTITION_KEYS}
+            if all(name in existing for name in names.values()):
+                continue
+
+            upper = self._month_start(month, 1)
+            cursor.execute("SELECT EXISTS (SELECT 1 FROM attacks_default WHERE created_at >= %s AND created_at < %s)",
+                           (month, upper))
+            if cursor.fetchone()[0]:
+                blocked.append(f"{month:%Y-%m}")
+                continue
+
+            # Секция attacks создается первой: на нее ссылаются цели того же месяца
+            for table, name in names.items():
+                if name not in existing:
+                    cursor.execute(f"""
+                        CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table}
+                        FOR VALUES FROM (%s) TO (%s)
+                    """, (month, upper))
+                    created.append(name)
+        return {"created": created, "blocked": blocked}
+
+    def ensure_partitions(self, months_ahead: Optional[int] = None, since: Optional[datetime] = None) -> Dict[str, Any]:
+        """Создание месячных секций от since (по умолчанию текущий месяц) на months_ahead месяцев вперед.
+
+        Операция идемпотентна: существующие секции не меняются.
+        """
+        if not self.config.partitioned:
+            return {"success": False, "error": "Partitioning is disabled (DB_PARTITIONED)"}
+
+        months_ahead = self.config.partition_months_ahead if months_ahead is None else months_ahead
+        today = datetime.now().date()
+        first = self._month_start(since or today)
+        last = self._month_start(today, months_ahead)
+
+        conn = None
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+
+            months = []
+            month = first
+            while month <= last:
+                months.append(month)
+                month = self._month_start(month, 1)
+            result = self._create_partitions(cursor, months)
+            conn.commit()
+
+            message = f"Partitions up to {last:%Y-%m} ready ({len(result['created'])} created)"
+            if result["blocked"]:
+                message += f", months with rows in the default partition skipped: {', '.join(result['blocked'])}"
+            return {"success": True, "data": result, "message": message}
+
+        except Exception as e:
+            return {"success": False, "error": f"Failed to create partitions: {e}"}
+        finally:
+            if conn is not None:
+                self.release_connection(conn)
+
+    def list_partitions(self) -> List[Dict[str, Any]]:
+        """Секции attacks и targets: имя, таблица, границы и оценка числа строк"""
+        conn = None
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+
+            cursor.execute("""
+                SELECT p.relname AS "table", c.relname AS name,
+                       pg_get_expr(c.relpartbound, c.oid) AS bounds,
+                       greatest(c.reltuples, 0)::bigint AS estimated_rows,
+                       pg_total_relation_size(c.oid) AS size_bytes
+                FROM pg_inherits i
+                JOIN pg_class c ON c.oid = i.inhrelid
+                JOIN pg_class p ON p.oid = i.inhparent
+                WHERE i.inhparent = ANY(ARRAY['attacks'::regclass, 'targets'::regclass])
+                ORDER BY p.relname, c.relname
+            """)
+            return [dict(row) for row in cursor.fetchall()]
+
+        except Exception as e:
+            print(f"Error listing partitions: {e}")
+            return []
+        finally:
+            if conn is not None:
+                self.release_connection(conn)
+
+    def expire_partitions(self, retain_months: Optional[int] = None, drop: bool = False) -> Dict[str, Any]:
+        """Отсоединение (или удаление при drop=True) секций старше retain_months месяцев.
+
+        Удаление секции не вызывает триггеров удаления строк, поэтому id атак
+        записываются в attack_tombstones и рассылаются в CHANGES_CHANNEL явно.
+        Отсоединенные секции остаются отдельными таблицами-архивами с суффиксом
+        ARCHIVE_SUFFIX (attacks_p202501_archived, при повторе - attacks_p202501_archived_2).
+        """
+        if not self.config.partitioned:
+            return {"success": False, "error": "Partitioning is disabled (DB_PARTITIONED)"}
+
+        retain_months = self.config.partition_retain_months if retain_months is None else retain_months
+        if retain_months < 1:
+            return {"success": False, "error": "retain_months must be positive"}
+        cutoff = self._month_start(datetime.now().date(), -retain_months)
+
+        conn = None
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+
+            cursor.execute("""
+                SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+                WHERE i.inhparent = 'attacks'::regclass
+            """)
+            expired = []
+            for name, in cursor.fetchall():
+                try:
+                    month = datetime.strptime(name, "attacks_p%Y%m").date()
+                except ValueError:
+                    continue
+                if month < cutoff:
+                    expired.append(month)
+
+            removed = 0
+            for month in sorted(expired):
+                attacks_partition = self._partition_name("attacks", month)
+                targets_partition = self._partition_name("targets", month)
+
+                cursor.execute(f"""
+                    INSERT INTO attack_tombstones (attack_id, deleted_at)
+                    SELECT id, clock_timestamp()::timestamp FROM {attacks_partition}
+                    ON CONFLICT (attack_id) DO UPDATE SET deleted_at = EXCLUDED.deleted_at
+                    RETURNING attack_id
+                """)
+                attack_ids = [attack_id for attack_id, in cursor.fetchall()]
+                for start in range(0, len(attack_ids), self.NOTIFY_CHUNK_SIZE):
+                    cursor.execute("SELECT pg_notify(%s, %s)", (self.CHANGES_CHANNEL, json.dumps({
+                        "table": "attacks", "op": "DELETE",
+                        "ids": attack_ids[start:start + self.NOTIFY_CHUNK_SIZE]
+                    })))
+                removed += len(attack_ids)
+
+                # Сначала цели: пока они ссылаются на секцию атак (в том числе отсоединенные -
+                # внешний ключ остается на них отдельным ограничением), ее нельзя отсоединить
+                cursor.execute(f"ALTER TABLE targets DETACH PARTITION {targets_partition}")
+                if drop:
+                    cursor.execute(f"DROP TABLE {targets_partition}")
+                    cursor.execute(f"ALTER TABLE attacks DETACH PARTITION {attacks_partition}")
+                    cursor.execute(f"DROP TABLE {attacks_partition}")
+                    continue
+
+                # Архивные цели больше не ссылаются на attacks
+                cursor.execute(f"""
+                    SELECT conname FROM pg_constraint
+                    WHERE conrelid = '{targets_partition}'::regclass AND contype = 'f'
+                """)
+                for constraint, in cursor.fetchall():
+                    cursor.execute(f'ALTER TABLE {targets_partition} DROP CONSTRAINT "{constraint}"')
+                cursor.execute(f"ALTER TABLE attacks DETACH PARTITION {attacks_partition}")
+
+                # Архив переименовывается, чтобы имя секции месяца снова было свободно
+                # (номер добавляется, если архив этого месяца уже есть)
+                for partition in (targets_partition, attacks_partition):
+                    archive = partition + self.ARCHIVE_SUFFIX
+                    number = 1
+                    while True:
+                        cursor.execute("SELECT to_regclass(%s)", (archive,))
+                        if cursor.fetchone()[0] is None:
+                            break
+                        number += 1
+                        archive = f"{partition}{self.ARCHIVE_SUFFIX}_{number}"
+                    cursor.execute(f"ALTER TABLE {partition} RENAME TO {archive}")
+
+            conn.commit()
+
+            months = [f"{month:%Y-%m}" for month in sorted(expired)]
+            action = "dropped" if drop else "detached"
+            return {
+                "success": True,
+                "data": {"months": months, "attacks_removed": removed, "dropped": drop},
+                "message": f"{len(months)} monthly partitions {action} ({removed} attacks)"
+            }
+
+        except Exception as e:
+            return {"success": False, "error": f"Failed to expire partitions: {e}"}
+        finally:
+            if conn is not None:
+                self.release_connection(conn)
+
+    def _create_change_triggers(self, cursor):
+        """Триггеры, отправляющие в CHANGES_CHANNEL id атак, измененных оператором.
+
+        Триггеры уровня оператора с таблицами переходов: массовый импорт дает
+        несколько уведомлений на пакет, а не по одному на строку. Изменение целей
+        сообщается как изменение их атаки.
+        """
+        for table, id_column in self.NOTIFY_SOURCES.items():
+            cursor.execute(f"""
+                CREATE OR REPLACE FUNCTION notify_{table}_changes() RETURNS trigger AS $$
+                DECLARE
+                    ids TEXT[];
+                BEGIN
+                    SELECT array_agg(DISTINCT {id_column}) INTO ids FROM changed_rows;
+                    IF ids IS NULL THEN
+                        RETURN NULL;
+                    END IF;
+                    FOR i IN 1 .. array_length(ids, 1) BY {self.NOTIFY_CHUNK_SIZE} LOOP
+                        PERFORM pg_notify('{self.CHANGES_CHANNEL}', json_build_object(
+                            'table', TG_TABLE_NAME,
+                            'op', TG_OP,
+                            'ids', ids[i:i + {self.NOTIFY_CHUNK_SIZE - 1}]
+                        )::text);
+                    END LOOP;
+                    RETURN NULL;
+                END
+                $$ LANGUAGE plpgsql
+            """)
+
+            for event, transition in (("INSERT", "NEW"), ("UPDATE", "NEW"), ("DELETE", "OLD")):
+                trigger = f"{table}_notify_{event.lower()}"
+                cursor.execute(f"DROP TRIGGER IF EXISTS {trigger} ON {table}")
+                cursor.execute(f"""
+                    CREATE TRIGGER {trigger} AFTER {event} ON {table}
+                    REFERENCING {transition} TABLE AS changed_rows
+                    FOR EACH STATEMENT EXECUTE FUNCTION notify_{table}_changes()
+                """)
+
+    def _create_sync_triggers(self, cursor):
+        """Триггеры для синхронизации по отметке (get_attack_changes).
+
+        updated_at ставится часами сервера: отметка не зависит от часов клиентов
+        и от значений из импортируемых файлов. Изменение, не задавшее новый content_hash
+        (любая запись, кроме upsert_attacks), сбрасывает его, чтобы повтор прежней
+        версии не был пропущен. Удаление атаки оставляет запись в attack_tombstones;
+        записи старше TOMBSTONE_RETENTION_DAYS удаляются.
+        """
+        cursor.execute("""
+            CREATE OR REPLACE FUNCTION stamp_attack_updated_at() RETURNS trigger AS $$
+            BEGIN
+                NEW.updated_at := clock_timestamp()::timestamp;
+                IF TG_OP = 'UPDATE' AND NEW.content_hash IS NOT DISTINCT FROM OLD.content_hash THEN
+                    NEW.content_hash := NULL;
+                END IF;
+                RETURN NEW;
+            END
+            $$ LANGUAGE plpgsql
+        """)
+        cursor.execute("DROP TRIGGER IF EXISTS attacks_stamp_updated_at ON attacks")
+        cursor.execute("""
+            CREATE TRIGGER attacks_stamp_updated_at BEFORE INSERT OR UPDATE ON attacks
+            FOR EACH ROW EXECUTE FUNCTION stamp_attack_updated_at()
+        """)
+
+        cursor.execute(f"""
+            CREATE OR REPLACE FUNCTION record_attack_tombstones() RETURNS trigger AS $$
+            BEGIN
+                INSERT INTO attack_tombstones (attack_id, deleted_at)
+                SELECT id, clock_timestamp()::timestamp FROM deleted_rows
+                ON CONFLICT (attack_id) DO UPDATE SET deleted_at = EXCLUDED.deleted_at;
+
+                DELETE FROM attack_tombstones
+                WHERE deleted_at < clock_timestamp()::timestamp - make_interval(days => {self.TOMBSTONE_RETENTION_DAYS});
+                RETURN NULL;
+            END
+            $$ LANGUAGE plpgsql
+        """)
+        cursor.execute("DROP TRIGGER IF EXISTS attacks_record_tombstones ON attacks")
+        cursor.execute("""
+            CREATE TRIGGER attacks_record_tombstones AFTER DELETE ON attacks
+            REFERENCING OLD TABLE AS deleted_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION record_attack_tombstones()
+        """)
+
+    def _create_rollups(self, cursor):
+        """Материализованные представления сводок и таблица времени их обновления"""
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS rollup_refreshes (
+                view_name VARCHAR(63) PRIMARY KEY,
+                refreshed_at TIMESTAMP NOT NULL,
+                duration_ms REAL NOT NULL
+            )
+        """)
+        for name, query, unique_columns in self.ROLLUPS:
+            cursor.execute("SELECT to_regclass(%s) IS NULL", (name,))
+            if not cursor.fetchone()[0]:
+                continue
+            started = time.perf_counter()
+            cursor.execute("SELECT clock_timestamp()::timestamp")
+            refreshed_at = cursor.fetchone()[0]
+            cursor.execute(f"CREATE MATERIALIZED VIEW {name} AS {query}")
+            cursor.execute(f"CREATE UNIQUE INDEX {name}_key ON {name} {unique_columns}")
+            self._record_rollup_refresh(cursor, name, refreshed_at, started)
+
+    @staticmethod
+    def _record_rollup_refresh(cursor, name: str, refreshed_at, started: float):
+        cursor.execute("""
+            INSERT INTO rollup_refreshes (view_name, refreshed_at, duration_ms) VALUES (%s, %s, %s)
+            ON CONFLICT (view_name) DO UPDATE
+            SET refreshed_at = EXCLUDED.refreshed_at, duration_ms = EXCLUDED.duration_ms
+        """, (name, refreshed_at, (time.perf_counter() - started) * 1000))
+
+    def refresh_rollups(self, concurrently: bool = True) -> Dict[str, Any]:
+        """Обновление сводок Dashboard.
+
+        С concurrently=True чтение сводок во время обновления не блокируется.
+        Если сводки уже обновляет другой процесс, обновление пропускается.
+        """
+        conn = None
+        try:
+            conn = self.get_connection()
+            # Каждое представление обновляется и отмечается в своей транзакции
+            conn.autocommit = True
+            cursor = conn.cursor()
+
+            cursor.execute("SELECT pg_try_advisory_lock(%s)", (self.ROLLUP_LOCK_KEY,))
+            if not cursor.fetchone()[0]:
+                return {"success": True, "data": {"refreshed": [], "skipped": True},
+                        "message": "Rollups are being refreshed by another process"}
+
+            refreshed = []
+            try:
+                mode = " CONCURRENTLY" if concurrently else ""
+                for name, _, _ in self.ROLLUPS:
+                    started = time.perf_counter()
+                    # Время начала: изменения после него в сводку могли не попасть
+                    cursor.execute("SELECT clock_timestamp()::timestamp")
+                    refreshed_at = cursor.fetchone()[0]
+                    cursor.execute(f"REFRESH MATERIALIZED VIEW{mode} {name}")
+                    self._record_rollup_refresh(cursor, name, refreshed_at, started)
+                    refreshed.append(name)
+            finally:
+                cursor.execute("SELECT pg_advisory_unlock(%s)", (self.ROLLUP_LOCK_KEY,))
+
+            return {
+                "success": True,
+                "data": {"refreshed": refreshed, "skipped": False},
+                "message": f"Refreshed {len(refreshed)} rollups"
+            }
+
+        except Exception as e:
+            return {"success": False, "error": f"Rollup refresh failed: {e}"}
+        finally:
+            if conn is not None:
+                self.release_connection(conn)
+
+    def get_rollup_state(self) -> Optional[Dict[str, Any]]:
+        """Устаревание сводок: {"refreshed_at", "age_seconds", "duration_ms", "pending_changes"}"""
+        conn = None
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
+            cursor.execute(self.ROLLUP_STATE_SQL)
+            return dict(cursor.fetchone())
+
+        except Exception as e:
+            print(f"Error fetching rollup state: {e}")
+            return None
+        finally:
+            if conn is not None:
+                self.release_connection(conn)
+
+    def get_dashboard_rollups(self, days: int = 30) -> Dict[str, Any]:
+        """Сводки Dashboard из материализованных представлений и их устаревание.
+
+        {"by_type_danger", "by_protocol", "by_day" (последние days дней), "state"}
+        """
+        conn = None
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
+
+            self._execute_prepared(cursor, self.ROLLUP_TYPE_DANGER_SQL)
+            by_type_danger = [dict(row) for row in cursor.fetchall()]
+            self._execute_prepared(cursor, self.ROLLUP_PROTOCOL_SQL)
+            by_protocol = [dict(row) for row in cursor.fetchall()]
+            self._execute_prepared(cursor, self.ROLLUP_DAY_SQL, [days])
+            by_day = [dict(row) for row in cursor.fetchall()]
+            cursor.execute(self.ROLLUP_STATE_SQL)
+            state = dict(cursor.fetchone())
+
+            return {"by_type_danger": by_type_danger, "by_protocol": by_protocol, "by_day": by_day, "state": state}
+
+        except Exception as e:
+            print(f"Error fetching dashboard rollups: {e}")
+            return {}
+        finally:
+            if conn is not None:
+                self.release_connection(conn)
+
+    def _migrate_json_columns(self, cursor) -> List[str]:
+        """Перевод JSON-столбцов из TEXT в JSONB. Возвращает список перенесенных столбцов"""
+        cursor.execute("""
+            SELECT table_name, column_name FROM information_schema.columns
+            WHERE table_schema = current_schema()
+            AND table_name IN ('attacks', 'targets')
+            AND data_type = 'text'
+        """)
+        text_columns = {(row[0], row[1]) for row in cursor.fetchall()}
+
+        migrated = []
+        for table, columns in self.JSON_COLUMNS.items():
+            clauses = []
+            for column, not_null in columns:
+                if (table, column) not in text_columns:
+                    continue
+                # Пустые строки в старых данных превращаем в пустой список (или NULL)
+                empty = "'[]'" if not_null else "NULL"
+                clauses.append(
+                    f"ALTER COLUMN {column} TYPE JSONB "
+                    f"USING COALESCE(NULLIF(btrim({column}), ''), {empty})::jsonb"
+                )
+                migrated.append(f"{table}.{column}")
+
+            # Все столбцы таблицы переводим за одну перезапись
+            if clauses:
+                cursor.execute(f"ALTER TABLE {table} " + ", ".join(clauses))
+
+        return migrated
+
+    def upgrade_indexes(self, concurrently: bool = True) -> Dict[str, Any]:
+        """Создание недостающих индексов управляемого набора в существующей базе.
+
+        С concurrently=True индексы строятся через CREATE INDEX CONCURRENTLY без блокировки
+        записи. Невалидные индексы, оставшиеся от прерванной сборки, пересоздаются.
+        Операция идемпотентна.
+        """
+        conn = None
+        created = []
+        rebuilt = []
+        try:
+            conn = self.get_connection()
+            # CONCURRENTLY нельзя выполнять внутри транзакции
+            conn.autocommit = True
+            cursor = conn.cursor()
+
+            cursor.execute("""
+                SELECT c.relname, i.indisvalid
+                FROM pg_index i
+                JOIN pg_class c ON c.oid = i.indexrelid
+                JOIN pg_namespace n ON n.oid = c.relnamespace
+                WHERE n.nspname = current_schema() AND c.relname = ANY(%s)
+            """, ([name for name, _, _ in self.INDEXES],))
+            existing = dict(cursor.fetchall())
+
+            # Индекс секционированной таблицы нельзя строить CONCURRENTLY (он строится по секциям)
+            cursor.execute("""
+                SELECT relname FROM pg_class
+                WHERE relkind = 'p' AND oid IN (to_regclass('attacks'), to_regclass('targets'))
+            """)
+            partitioned = {name for name, in cursor.fetchall()}
+
+            for name, table, definition in self.INDEXES:
+                if existing.get(name) is True:
+                    continue
+                mode = " CONCURRENTLY" if concurrently and table not in partitioned else ""
+                if name in existing:
+                    cursor.execute(f"DROP INDEX{mode} IF EXISTS {name}")
+                    rebuilt.append(name)
+                else:
+                    created.append(name)
+                cursor.execute(f"CREATE INDEX{mode} IF NOT EXISTS {name} ON {table} {definition}")
+
+            # Обновляем статистику, чтобы планировщик сразу учел новые индексы
+            if created or rebuilt:
+                cursor.execute("ANALYZE attacks")
+                cursor.execute("ANALYZE targets")
+
+            return {
+                "success": True,
+                "data": {
+                    "created": created,
+                    "rebuilt": rebuilt,
+                    "unchanged": [name for name, valid in existing.items() if valid]
+                },
+                "message": f"Indexes up to date ({len(created)} created, {len(rebuilt)} rebuilt)"
+            }
+
+        except Exception as e:
+            return {
+                "success": False,
+                "error": f"Index upgrade failed: {e}",
+                "data": {"created": created, "rebuilt": rebuilt}
+            }
+        finally:
+            if conn is not None:
+                self.release_connection(conn)
 
     def check_database_status(self) -> Dict[str, Any]:
         """Проверка статуса БД и существования таблиц"""
@@ -101,7 +882,8 @@ class DatabaseManager:
                 "data": {
                     "tablesExist": tables_exist,
                     "database": self.config.database,
-                    "tables": [table[0] for table in tables]
+                    "tables": [table[0] for table in tables],
+                    "partitioned": bool(self._partitioned_state(cursor))
                 }
             }
         except Exception as e:
@@ -112,7 +894,7 @@ class DatabaseManager:
             }
         finally:
             if conn is not None:
-                conn.close()
+                self.release_connection(conn)
 
     def get_all_attacks(self) -> List[Dict[str, Any]]:
         """Получение всех атак с целями"""
@@ -121,43 +903,81 @@ class DatabaseManager:
             conn = self.get_connection()
             cursor = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
 
-            # Получаем все атаки
-            cursor.execute("SELECT * FROM attacks ORDER BY created_at DESC")
-            attacks_data = cursor.fetchall()
+            # Получаем все атаки и их цели двумя запросами
+            self._execute_prepared(cursor, self.SELECT_ALL_ATTACKS_SQL)
+            attacks = self._hydrate_attacks(cursor, cursor.fetchall())
 
-            attacks = []
-            for attack_row in attacks_data:
-                attack = dict(attack_row)
+            return attacks
 
-                # Парсим JSON поля
-                attack["source_ips"] = self._parse_json_field(attack["source_ips"])
-                attack["affected_ports"] = self._parse_json_field(attack["affected_ports"])
-                attack["mitigation_strategies"] = self._parse_json_field(attack["mitigation_strategies"])
+        except Exception as e:
+            print(f"Error fetching attacks: {e}")
+            return []
+        finally:
+            if conn is not None:
+                self.release_connection(conn)
+
+    def iter_attacks(self, batch_size: Optional[int] = None, frequencies: List[str] = None,
+                     danger_levels: List[str] = None, attack_types: List[str] = None,
+                     protocols: List[str] = None, ports: List[int] = None, source_ips: List[str] = None,
+                     tags: List[str] = None, created_from: datetime = None,
+                     created_to: datetime = None) -> Iterator[List[Dict[str, Any]]]:
+        """Потоковое чтение атак с целями пакетами через серверный курсор.
+
+        Генератор занимает соединение пула, пока не будет исчерпан или закрыт.
+        """
+        batch_size = batch_size or self.STREAM_BATCH_SIZE
+        conn = self.get_connection()
+        try:
+            where, params = self._build_filter_clause(frequencies, danger_levels, attack_types, protocols,
+                                                      ports, source_ips, tags, created_from, created_to)
+
+            # Именованный курсор хранит результат на сервере: в памяти только текущий пакет
+            stream = conn.cursor(name="attacks_stream", cursor_factory=psycopg2.extras.DictCursor)
+            stream.itersize = batch_size
+            stream.execute(f"SELECT a.* FROM attacks a{where} ORDER BY a.created_at DESC, a.id DESC", params)
 
-                # Получаем цели для этой атаки
-                cursor.execute("SELECT * FROM targets WHERE attack_id = %s", (attack["id"],))
-                targets_data = cursor.fetchall()
+            cursor = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
+            while True:
+                rows = stream.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield self._hydrate_attacks(cursor, rows)
+
+            stream.close()
+        finally:
+            self.release_connection(conn)
+
+    def get_attacks_page(self, page_size: Optional[int] = None, cursor: Optional[str] = None,
+                         frequencies: List[str] = None, danger_levels: List[str] = None,
+                         attack_types: List[str] = None, protocols: List[str] = None,
+                         ports: List[int] = None, source_ips: List[str] = None,
+                         tags: List[str] = None, created_from: datetime = None,
+                         created_to: datetime = None) -> Dict[str, Any]:
+        """Страница атак с целями (keyset-пагинация по (created_at, id) вместо OFFSET).
+
+        Возвращает атаки страницы и курсоры следующей/предыдущей страницы
+        (None, если страницы нет). cursor=None - первая страница.
+        """
+        page_size = page_size or self.PAGE_SIZE
+        conn = None
+        try:
+            sql, params, direction = self._page_query(page_size, cursor, frequencies, danger_levels, attack_types,
+                                                      protocols, ports, source_ips, tags, created_from, created_to)
 
-                targets = []
-                for target_row in targets_data:
-                    target = dict(target_row)
-                    target["tags"] = self._parse_json_field(target["tags"])
-                    # Удаляем внутренний ID
-                    del target["id"]
-                    del target["attack_id"]
-                    targets.append(target)
+            conn = self.get_connection()
+            db_cursor = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
 
-                attack["targets"] = targets
-                attacks.append(attack)
+            self._execute_prepared(db_cursor, sql, params)
+            rows, has_more = self._page_rows(db_cursor.fetchall(), page_size, direction)
 
-            return attacks
+            return self._page_result(self._hydrate_attacks(db_cursor, rows), direction, has_more, cursor)
 
         except Exception as e:
-            print(f"Error fetching attacks: {e}")
-            return []
+            print(f"Error fetching attacks page: {e}")
+            return {"items": [], "next_cursor": None, "prev_cursor": None}
         finally:
             if conn is not None:
-                conn.close()
+                self.release_connection(conn)
 
     def get_attack(self, attack_id: str) -> Optional[Dict[str, Any]]:
         """Получение конкретной атаки по ID"""
@@ -167,98 +987,123 @@ class DatabaseManager:
             cursor = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
 
             # Получаем атаку
-            cursor.execute("SELECT * FROM attacks WHERE id = %s", (attack_id,))
+            self._execute_prepared(cursor, self.SELECT_ATTACK_SQL, [attack_id])
             attack_row = cursor.fetchone()
 
             if not attack_row:
                 return None
 
-            attack = dict(attack_row)
+            return self._hydrate_attacks(cursor, [attack_row])[0]
+
+        except Exception as e:
+            print(f"Error fetching attack {attack_id}: {e}")
+            return None
+        finally:
+            if conn is not None:
+                self.release_connection(conn)
+
+    def get_attack_stats(self) -> Dict[str, Any]:
+        """Счетчики для панелей статистики и разрезы по перечислениям одним запросом"""
+        conn = None
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
+
+            self._execute_prepared(cursor, self.STATS_SQL)
+            return self._stats_result(cursor.fetchone())
+
+        except Exception as e:
+            print(f"Error fetching attack stats: {e}")
+            return {}
+        finally:
+            if conn is not None:
+                self.release_connection(conn)
+
+    def get_attack_changes(self, since: Optional[str] = None) -> Dict[str, Any]:
+        """Изменения атак после отметки since: {"changed", "deleted_ids", "watermark", "full"}.
+
+        Без отметки (или если она старше срока хранения удалений) возвращаются все
+        атаки и full=True. Отметку из ответа передают в следующий вызов.
+        Ошибки не скрываются: пустой ответ выглядел бы как отсутствие изменений.
+        """
+        conn = None
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
+
+            # Все запросы видят один снимок: удаление между ними не теряется
+            cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ READ ONLY")
+            cursor.execute(self.SYNC_CLOCK_SQL, (self.SYNC_OVERLAP, self.TOMBSTONE_RETENTION_DAYS))
+            safe_until, retention_horizon, table_oid = cursor.fetchone()
+
+            position = self._watermark_position(since)
+            full = self._needs_full_sync(position, retention_horizon, table_oid)
+
+            deleted_ids = []
+            if full:
+                self._execute_prepared(cursor, self.SELECT_ALL_ATTACKS_SQL)
+                attacks = self._hydrate_attacks(cursor, cursor.fetchall())
+            else:
+                self._execute_prepared(cursor, self.SELECT_CHANGED_ATTACKS_SQL, list(position[:2]))
+                attacks = self._hydrate_attacks(cursor, cursor.fetchall())
+                self._execute_prepared(cursor, self.SELECT_TOMBSTONES_SQL, list(position[2:4]))
+                deleted_ids = [row[0] for row in cursor.fetchall()]
 
-            # Парсим JSON поля
-            attack["source_ips"] = self._parse_json_field(attack["source_ips"])
-            attack["affected_ports"] = self._parse_json_field(attack["affected_ports"])
-            attack["mitigation_strategies"] = self._parse_json_field(attack["mitigation_strategies"])
+            return self._changes_result(attacks, deleted_ids, safe_until, table_oid, position, full)
 
-            # Получаем цели
-            cursor.execute("SELECT * FROM targets WHERE attack_id = %s", (attack_id,))
-            targets_data = cursor.fetchall()
+        finally:
+            if conn is not None:
+                self.release_connection(conn)
 
-            targets = []
-            for target_row in targets_data:
-                target = dict(target_row)
-                target["tags"] = self._parse_json_field(target["tags"])
-                del target["id"]
-                del target["attack_id"]
-                targets.append(target)
+    def get_attacks_by_ids(self, attack_ids: List[str]) -> Optional[List[Dict[str, Any]]]:
+        """Получение атак по списку ID: отсутствующих в результате нет, None - ошибка запроса"""
+        if not attack_ids:
+            return []
 
-            attack["targets"] = targets
-            return attack
+        conn = None
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
+
+            self._execute_prepared(cursor, self.SELECT_ATTACKS_BY_IDS_SQL, [list(attack_ids)])
+            return self._hydrate_attacks(cursor, cursor.fetchall())
 
         except Exception as e:
-            print(f"Error fetching attack {attack_id}: {e}")
+            print(f"Error fetching attacks by ids: {e}")
             return None
         finally:
             if conn is not None:
-                conn.close()
+                self.release_connection(conn)
 
     def create_attack(self, attack_data: Dict[str, Any]) -> Dict[str, Any]:
         """Создание новой атаки"""
         conn = None
         try:
             conn = self.get_connection()
-            cursor = conn.cursor()
+            cursor = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
 
             # Подготавливаем данные для вставки
-            attack_id = attack_data.get("id")
-            if not attack_id:
-                # Импортируем здесь чтобы избежать циклических импортов
-                import sys
-                import os
-                sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-                from utils.helpers import generate_id
-                attack_id = generate_id()
+            attack_id = attack_data.get("id") or self._generate_id()
 
             current_time = datetime.now().isoformat()
 
             # Вставляем атаку
-            cursor.execute("""
-                INSERT INTO attacks 
-                (id, name, frequency, danger, attack_type, source_ips, affected_ports, mitigation_strategies, created_at, updated_at)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            """, (
-                attack_id,
-                attack_data["name"],
-                attack_data["frequency"],
-                attack_data["danger"],
-                attack_data["attack_type"],
-                psycopg2.extras.Json(attack_data["source_ips"]),
-                psycopg2.extras.Json(attack_data["affected_ports"]),
-                psycopg2.extras.Json(attack_data["mitigation_strategies"]),
-                current_time,
-                current_time
-            ))
-
-            # Вставляем цели
-            for target_data in attack_data.get("targets", []):
-                cursor.execute("""
-                    INSERT INTO targets 
-                    (attack_id, target_ip, target_domain, port, protocol, tags)
-                    VALUES (%s, %s, %s, %s, %s, %s)
-                """, (
-                    attack_id,
-                    target_data.get("target_ip", ""),
-                    target_data.get("target_domain", ""),
-                    target_data.get("port", 80),
-                    target_data.get("protocol", "tcp"),
-                    psycopg2.extras.Json(target_data.get("tags", []))
-                ))
+            cursor.execute(
+                self.INSERT_ATTACK_SQL,
+                (attack_id,) + self._attack_values(attack_data) + (current_time, current_time)
+            )
+            attack = self._row_to_attack(cursor.fetchone())
+
+            # Вставляем цели одним пакетом
+            targets = attack_data.get("targets", [])
+            self._insert_targets(cursor, attack_id, targets)
 
             conn.commit()
 
+            attack["targets"] = self._written_targets(targets)
             return {
                 "success": True,
-                "data": self.get_attack(attack_id),
+                "data": attack,
                 "message": "Attack created successfully"
             }
 
@@ -269,129 +1114,516 @@ class DatabaseManager:
             }
         finally:
             if conn is not None:
-                conn.close()
+                self.release_connection(conn)
+
+    def _validate_import_record(self, record: Dict[str, Any]) -> Optional[str]:
+        """Проверка записи импорта. Возвращает текст ошибки или None"""
+        if not isinstance(record, dict):
+            return "Record must be a dict"
+
+        for field, max_length in (("name", 255), ("frequency", 50), ("danger", 50), ("attack_type", 50)):
+            value = record.get(field)
+            if not isinstance(value, str) or not value.strip():
+                return f"Field '{field}' is required"
+            if len(value) > max_length:
+                return f"Field '{field}' is longer than {max_length} characters"
+
+        if record.get("id") is not None and (not isinstance(record["id"], str) or len(record["id"]) > 36):
+            return "Field 'id' must be a string of at most 36 characters"
+
+        for field in ("source_ips", "affected_ports", "mitigation_strategies", "targets"):
+            if not isinstance(record.get(field, []), list):
+                return f"Field '{field}' must be a list"
+
+        for number, target_data in enumerate(record.get("targets", []), start=1):
+            if not isinstance(target_data, dict):
+                return f"Target #{number} must be a dict"
+            try:
+                port = int(target_data.get("port", 80))
+            except (TypeError, ValueError):
+                return f"Target #{number} port must be an integer"
+            if port < 0 or port > 65535:
+                return f"Target #{number} port must be between 0 and 65535"
+            for field, max_length in (("target_ip", 255), ("target_domain", 255), ("protocol", 50)):
+                value = target_data.get(field)
+                if value is not None and len(str(value)) > max_length:
+                    return f"Target #{number} field '{field}' is longer than {max_length} characters"
+            if not isinstance(target_data.get("tags", []), list):
+                return f"Target #{number} tags must be a list"
+
+        return None
+
+    @staticmethod
+    def _import_attack_row(attack_id: str, record: Dict[str, Any]) -> tuple:
+        """Строка attacks (столбцы ATTACK_COLUMNS) для COPY из записи импорта"""
+        current_time = datetime.now().isoformat()
+        return (
+            attack_id,
+            record["name"],
+            record["frequency"],
+            record["danger"],
+            record["attack_type"],
+            json.dumps(record.get("source_ips", [])),
+            json.dumps(record.get("affected_ports", [])),
+            json.dumps(record.get("mitigation_strategies", [])),
+            record.get("created_at") or current_time,
+            record.get("updated_at") or current_time
+        )
+
+    def bulk_import_attacks(self, attacks: Iterable[Dict[str, Any]],
+                            batch_size: Optional[int] = None) -> Dict[str, Any]:
+        """Массовый импорт атак с целями.
+
+        Записи загружаются пакетами через COPY во временные таблицы и переносятся
+        в attacks/targets одним запросом на пакет, все пакеты - в одной транзакции.
+        Ошибочные записи и записи с уже существующим ID попадают в список ошибок,
+        не прерывая импорт остальных.
+        """
+        batch_size = batch_size or self.IMPORT_BATCH_SIZE
+        if batch_size < 1:
+            return {"success": False, "error": "batch_size must be positive"}
+
+        started = time.perf_counter()
+        errors = []
+        total = 0
+        imported = 0
+        targets_imported = 0
+        seen_ids = set()
+        attack_columns = ", ".join(self.ATTACK_COLUMNS)
+        target_columns = ", ".join(self.TARGET_COLUMNS)
+
+        conn = None
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+
+            # Промежуточные таблицы повторяют типы столбцов основных таблиц
+            cursor.execute(f"""
+                CREATE TEMP TABLE attacks_import ON COMMIT DROP AS
+                SELECT {attack_columns}, 0 AS record_index FROM attacks WITH NO DATA
+            """)
+            cursor.execute(f"""
+                CREATE TEMP TABLE targets_import ON COMMIT DROP AS
+                SELECT {target_columns} FROM targets WITH NO DATA
+            """)
+
+            # При секционировании id уникален только вместе с created_at: существующий id
+            # отсекается явной проверкой, а created_at целей берется у их атак
+            if self.config.partitioned:
+                new_attacks = "WHERE NOT EXISTS (SELECT 1 FROM attacks a WHERE a.id = i.id) ON CONFLICT DO NOTHING"
+                insert_targets = f"""
+                    INSERT INTO targets ({target_columns}, attack_created_at)
+                    SELECT {', '.join(f't.{column}' for column in self.TARGET_COLUMNS)}, i.created_at
+                    FROM targets_import t JOIN attacks_import i ON i.id = t.attack_id
+                    WHERE t.attack_id IN (SELECT id FROM inserted)
+                """
+            else:
+                new_attacks = "ON CONFLICT (id) DO NOTHING"
+                insert_targets = f"""
+                    INSERT INTO targets ({target_columns})
+                    SELECT {target_columns} FROM targets_import
+                    WHERE attack_id IN (SELECT id FROM inserted)
+                """
+
+            records = enumerate(attacks)
+            while True:
+                batch = list(islice(records, batch_size))
+                if not batch:
+                    break
+                total += len(batch)
+
+                attack_rows = []
+                target_rows = []
+                batch_ids = {}
+                for index, record in batch:
+                    error = self._validate_import_record(record)
+                    attack_id = record.get("id") if isinstance(record, dict) else None
+                    if error is None:
+                        attack_id = attack_id or self._generate_id()
+                        if attack_id in seen_ids:
+                            error = f"Duplicate attack id {attack_id} in import"
+                    if error is not None:
+                        errors.append({"index": index, "id": attack_id, "error": error})
+                        continue
+
+                    seen_ids.add(attack_id)
+                    batch_ids[attack_id] = index
+                    attack_rows.append(self._import_attack_row(attack_id, record) + (index,))
+                    target_rows.extend(self._target_row(attack_id, target_data)
+                                       for target_data in record.get("targets", []))
+
+                if not attack_rows:
+                    continue
+
+                # Ошибка в пакете откатывает только этот пакет
+                cursor.execute("SAVEPOINT import_batch")
+                try:
+                    self._copy_rows(cursor, "attacks_import", self.ATTACK_COLUMNS + ("record_index",),
+                                    attack_rows)
+                    self._copy_rows(cursor, "targets_import", self.TARGET_COLUMNS, target_rows)
+
+                    if self.config.partitioned:
+                        # Секции для месяцев пакета, чтобы строки не оседали в DEFAULT
+                        cursor.execute("SELECT DISTINCT date_trunc('month', created_at)::date FROM attacks_import")
+                        self._create_partitions(cursor, [month for month, in cursor.fetchall()])
+
+                    cursor.execute(f"""
+                        WITH inserted AS (
+                            INSERT INTO attacks ({attack_columns})
+                            SELECT {attack_columns} FROM attacks_import i
+                            {new_attacks}
+                            RETURNING id
+                        ), inserted_targets AS (
+                            {insert_targets}
+                            RETURNING 1
+                        )
+                        SELECT
+                            (SELECT count(*) FROM inserted),
+                            (SELECT count(*) FROM inserted_targets),
+                            ARRAY(SELECT id FROM attacks_import WHERE id NOT IN (SELECT id FROM inserted))
+                    """)
+                    batch_imported, batch_targets, conflicts = cursor.fetchone()
+
+                    cursor.execute("TRUNCATE attacks_import, targets_import")
+                    cursor.execute("RELEASE SAVEPOINT import_batch")
+                except Exception as e:
+                    cursor.execute("ROLLBACK TO SAVEPOINT import_batch")
+                    errors.extend({"index": index, "id": attack_id, "error": f"Batch failed: {e}"}
+                                  for attack_id, index in batch_ids.items())
+                    continue
+
+                imported += batch_imported
+                targets_imported += batch_targets
+                errors.extend({"index": batch_ids[attack_id], "id": attack_id,
+                               "error": f"Attack {attack_id} already exists"}
+                              for attack_id in conflicts)
+
+            conn.commit()
+
+            elapsed = time.perf_counter() - started
+            errors.sort(key=lambda error: error["index"])
+            return {
+                "success": True,
+                "data": {
+                    "total": total,
+                    "imported": imported,
+                    "failed": len(errors),
+                    "targets_imported": targets_imported,
+                    "errors": errors,
+                    "elapsed_seconds": elapsed,
+                    "rows_per_second": imported / elapsed if elapsed > 0 else 0.0
+                },
+                "message": f"Imported {imported} of {total} attacks"
+            }
+
+        except Exception as e:
+            return {
+                "success": False,
+                "error": f"Bulk import failed: {e}"
+            }
+        finally:
+            if conn is not None:
+                self.release_connection(conn)
+
+    def upsert_attacks(self, attacks: Iterable[Dict[str, Any]], batch_size: Optional[int] = None) -> Dict[str, Any]:
+        """Идемпотентная запись атак с целями по id: новые вставляются, измененные обновляются.
+
+        Пакет записывается одним запросом INSERT ... ON CONFLICT (id) DO UPDATE из временных
+        таблиц (как в bulk_import_attacks). Запись, хеш содержимого которой совпадает
+        с сохраненным, не меняет ни атаку, ни ее цели. Цели обновленной атаки заменяются
+        целиком. Если id повторяется в пакете, записывается последняя версия.
+        """
+        batch_size = batch_size or self.IMPORT_BATCH_SIZE
+        if batch_size < 1:
+            return {"success": False, "error": "batch_size must be positive"}
+
+        started = time.perf_counter()
+        errors = []
+        total = 0
+        inserted_ids = []
+        updated_ids = []
+        unchanged = 0
+        superseded = 0
+        targets_written = 0
+        attack_columns = ", ".join(self.ATTACK_COLUMNS)
+        target_columns = ", ".join(self.TARGET_COLUMNS)
+        upsert_targets = ", ".join(f"t.{column}" for column in self.TARGET_COLUMNS)
+
+        # При секционировании конфликт определяется по (id, created_at): created_at
+        # существующих атак переносится в пакет заранее, цели получают его как ключ секции
+        if self.config.partitioned:
+            conflict = "(id, created_at)"
+            target_partition_column = ", attack_created_at"
+            target_partition_value = ", u.created_at"
+            same_partition = " AND t.attack_created_at = u.created_at"
+        else:
+            conflict = "(id)"
+            target_partition_column = target_partition_value = same_partition = ""
+
+        updates = ", ".join(f"{column} = EXCLUDED.{column}" for column in self.ATTACK_COLUMNS
+                            if column not in ("id", "created_at"))
+        upsert_sql = f"""
+            WITH existing AS (
+                SELECT a.id FROM attacks a JOIN attacks_upsert s ON s.id = a.id
+            ), upserted AS (
+                INSERT INTO attacks ({attack_columns}, content_hash)
+                SELECT {attack_columns}, content_hash FROM attacks_upsert
+                ON CONFLICT {conflict} DO UPDATE SET {updates}, content_hash = EXCLUDED.content_hash
+                WHERE attacks.content_hash IS DISTINCT FROM EXCLUDED.content_hash
+                RETURNING id, created_at
+            ), removed_targets AS (
+                -- Все части запроса видят данные до него: удаляются только прежние цели
+                DELETE FROM targets t USING upserted u
+                WHERE t.attack_id = u.id{same_partition}
+            ), written_targets AS (
+                INSERT INTO targets ({target_columns}{target_partition_column})
+                SELECT {upsert_targets}{target_partition_value}
+                FROM targets_upsert t JOIN upserted u ON u.id = t.attack_id
+                ORDER BY t.ord
+                RETURNING 1
+            )
+            SELECT
+                ARRAY(SELECT id FROM upserted WHERE id NOT IN (SELECT id FROM existing)),
+                ARRAY(SELECT id FROM upserted WHERE id IN (SELECT id FROM existing)),
+                (SELECT count(*) FROM written_targets)
+        """
+
+        conn = None
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+
+            cursor.execute(f"""
+                CREATE TEMP TABLE attacks_upsert ON COMMIT DROP AS
+                SELECT {attack_columns}, content_hash FROM attacks WITH NO DATA
+            """)
+            cursor.execute(f"""
+                CREATE TEMP TABLE targets_upsert ON COMMIT DROP AS
+                SELECT {target_columns}, 0 AS ord FROM targets WITH NO DATA
+            """)
+
+            records = enumerate(attacks)
+            while True:
+                batch = list(islice(records, batch_size))
+                if not batch:
+                    break
+                total += len(batch)
+
+                latest = {}
+                for index, record in batch:
+                    error = self._validate_import_record(record)
+                    attack_id = record.get("id") if isinstance(record, dict) else None
+                    if error is None and not attack_id:
+                        error = "Field 'id' is required for upsert"
+                    if error is not None:
+                        errors.append({"index": index, "id": attack_id, "error": error})
+                        continue
+                    if attack_id in latest:
+                        superseded += 1
+                    latest[attack_id] = (index, record)
+
+                if not latest:
+                    continue
+
+                attack_rows = []
+                target_rows = []
+                for attack_id, (index, record) in latest.items():
+                    attack_rows.append(self._import_attack_row(attack_id, record) + (self._content_hash(record),))
+                    for target_data in record.get("targets", []):
+                        target_rows.append(self._target_row(attack_id, target_data) + (len(target_rows),))
+
+                # Ошибка в пакете откатывает только этот пакет
+                cursor.execute("SAVEPOINT upsert_batch")
+                try:
+                    self._copy_rows(cursor, "attacks_upsert", self.ATTACK_COLUMNS + ("content_hash",), attack_rows)
+                    self._copy_rows(cursor, "targets_upsert", self.TARGET_COLUMNS + ("ord",), target_rows)
+
+                    if self.config.partitioned:
+                        cursor.execute("""
+                            UPDATE attacks_upsert s SET created_at = a.created_at
+                            FROM attacks a WHERE a.id = s.id AND a.created_at <> s.created_at
+                        """)
+                        cursor.execute("SELECT DISTINCT date_trunc('month', created_at)::date FROM attacks_upsert")
+                        self._create_partitions(cursor, [month for month, in cursor.fetchall()])
+
+                    cursor.execute(upsert_sql)
+                    batch_inserted, batch_updated, batch_targets = cursor.fetchone()
+
+                    cursor.execute("TRUNCATE attacks_upsert, targets_upsert")
+                    cursor.execute("RELEASE SAVEPOINT upsert_batch")
+                except Exception as e:
+                    cursor.execute("ROLLBACK TO SAVEPOINT upsert_batch")
+                    errors.extend({"index": index, "id": attack_id, "error": f"Batch failed: {e}"}
+                                  for attack_id, (index, _) in latest.items())
+                    continue
+
+                inserted_ids += batch_inserted
+                updated_ids += batch_updated
+                unchanged += len(latest) - len(batch_inserted) - len(batch_updated)
+                targets_written += batch_targets
+
+            conn.commit()
+
+            elapsed = time.perf_counter() - started
+            errors.sort(key=lambda error: error["index"])
+            return {
+                "success": True,
+                "data": {
+                    "total": total,
+                    "inserted": len(inserted_ids),
+                    "updated": len(updated_ids),
+                    "unchanged": unchanged,
+                    "superseded": superseded,
+                    "failed": len(errors),
+                    "targets_written": targets_written,
+                    "inserted_ids": inserted_ids,
+                    "updated_ids": updated_ids,
+                    "errors": errors,
+                    "elapsed_seconds": elapsed
+                },
+                "message": f"Upserted {total} attacks: {len(inserted_ids)} inserted, "
+                           f"{len(updated_ids)} updated, {unchanged} unchanged"
+            }
+
+        except Exception as e:
+            return {
+                "success": False,
+                "error": f"Upsert failed: {e}"
+            }
+        finally:
+            if conn is not None:
+                self.release_connection(conn)
 
     def update_attack(self, attack_id: str, attack_data: Dict[str, Any]) -> Dict[str, Any]:
         """Обновление атаки"""
         conn = None
         try:
             conn = self.get_connection()
-            cursor = conn.cursor()
+            cursor = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
 
-            # Проверяем существование атаки
-            cursor.execute("SELECT id FROM attacks WHERE id = %s", (attack_id,))
-            if not cursor.fetchone():
+            current_time = datetime.now().isoformat()
+
+            # Обновляем атаку
+            cursor.execute(self.UPDATE_ATTACK_SQL, self._attack_values(attack_data) + (current_time, attack_id))
+            attack_row = cursor.fetchone()
+            if attack_row is None:
                 return {
                     "success": False,
                     "error": f"Attack {attack_id} not found"
                 }
 
+            # Цели не менялись - читаем их на том же соединении
+            attack = self._hydrate_attacks(cursor, [attack_row])[0]
+            conn.commit()
+
+            return {
+                "success": True,
+                "data": attack,
+                "message": "Attack updated successfully"
+            }
+
+        except Exception as e:
+            return {
+                "success": False,
+                "error": f"Failed to update attack {attack_id}: {e}"
+            }
+        finally:
+            if conn is not None:
+                self.release_connection(conn)
+
+    def update_attack_with_targets(self, attack_id: str, data: Dict[str, Any],
+                                   sync_targets: bool = True) -> Dict[str, Any]:
+        """Обновление атаки с целями.
+
+        С sync_targets=True цели сравниваются с сохраненными и записываются только
+        изменения; с sync_targets=False список целей перезаписывается целиком.
+        """
+        conn = None
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
+
             current_time = datetime.now().isoformat()
 
             # Обновляем атаку
-            cursor.execute("""
-                UPDATE attacks 
-                SET name = %s, frequency = %s, danger = %s, attack_type = %s, 
-                    source_ips = %s, affected_ports = %s, mitigation_strategies = %s, updated_at = %s
-                WHERE id = %s
-            """, (
-                attack_data["name"],
-                attack_data["frequency"],
-                attack_data["danger"],
-                attack_data["attack_type"],
-                psycopg2.extras.Json(attack_data["source_ips"]),
-                psycopg2.extras.Json(attack_data["affected_ports"]),
-                psycopg2.extras.Json(attack_data["mitigation_strategies"]),
-                current_time,
-                attack_id
-            ))
+            cursor.execute(self.UPDATE_ATTACK_SQL, self._attack_values(data) + (current_time, attack_id))
+            attack_row = cursor.fetchone()
+            if attack_row is None:
+                return {
+                    "success": False,
+                    "error": f"Attack {attack_id} not found"
+                }
+            attack = self._row_to_attack(attack_row)
+
+            targets = data.get("targets", [])
+            if sync_targets:
+                sync = self._sync_targets(cursor, attack_id, targets)
+            else:
+                # Удаляем старые цели и добавляем новые одним пакетом
+                cursor.execute("DELETE FROM targets WHERE attack_id = %s", (attack_id,))
+                deleted = cursor.rowcount
+                inserted = self._insert_targets(cursor, attack_id, targets)
+                sync = {
+                    "inserted": inserted,
+                    "updated": 0,
+                    "deleted": deleted,
+                    "unchanged": 0,
+                    "rows_touched": inserted + deleted
+                }
 
             conn.commit()
 
+            attack["targets"] = self._written_targets(targets)
             return {
                 "success": True,
-                "data": self.get_attack(attack_id),
-                "message": "Attack updated successfully"
+                "data": attack,
+                "targets_sync": sync,
+                "message": f"Attack with targets updated successfully ({sync['rows_touched']} target rows touched)"
             }
 
         except Exception as e:
             return {
                 "success": False,
-                "error": f"Failed to update attack {attack_id}: {e}"
+                "error": f"Failed to update attack {attack_id} with targets: {e}"
             }
         finally:
             if conn is not None:
-                conn.close()
+                self.release_connection(conn)
 
-    def update_attack_with_targets(self, attack_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
-        """Обновление атаки с целями"""
+    def sync_attack_targets(self, attack_id: str, targets: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Обновление только целей атаки по разнице с сохраненными"""
         conn = None
         try:
             conn = self.get_connection()
             cursor = conn.cursor()
 
-            # Проверяем существование атаки
-            cursor.execute("SELECT id FROM attacks WHERE id = %s", (attack_id,))
-            if not cursor.fetchone():
+            cursor.execute(
+                "UPDATE attacks SET updated_at = %s WHERE id = %s",
+                (datetime.now().isoformat(), attack_id)
+            )
+            if cursor.rowcount == 0:
                 return {
                     "success": False,
                     "error": f"Attack {attack_id} not found"
                 }
 
-            current_time = datetime.now().isoformat()
-
-            # Обновляем атаку
-            cursor.execute("""
-                UPDATE attacks 
-                SET name = %s, frequency = %s, danger = %s, attack_type = %s, 
-                    source_ips = %s, affected_ports = %s, mitigation_strategies = %s, updated_at = %s
-                WHERE id = %s
-            """, (
-                data["name"],
-                data["frequency"],
-                data["danger"],
-                data["attack_type"],
-                psycopg2.extras.Json(data["source_ips"]),
-                psycopg2.extras.Json(data["affected_ports"]),
-                psycopg2.extras.Json(data["mitigation_strategies"]),
-                current_time,
-                attack_id
-            ))
-
-            # Удаляем старые цели
-            cursor.execute("DELETE FROM targets WHERE attack_id = %s", (attack_id,))
-
-            # Добавляем новые цели
-            for target_data in data.get("targets", []):
-                cursor.execute("""
-                    INSERT INTO targets 
-                    (attack_id, target_ip, target_domain, port, protocol, tags)
-                    VALUES (%s, %s, %s, %s, %s, %s)
-                """, (
-                    attack_id,
-                    target_data.get("target_ip", ""),
-                    target_data.get("target_domain", ""),
-                    target_data.get("port", 80),
-                    target_data.get("protocol", "tcp"),
-                    psycopg2.extras.Json(target_data.get("tags", []))
-                ))
-
+            sync = self._sync_targets(cursor, attack_id, targets)
             conn.commit()
 
             return {
                 "success": True,
-                "data": self.get_attack(attack_id),
-                "message": "Attack with targets updated successfully"
+                "data": sync,
+                "message": f"Targets synchronized ({sync['rows_touched']} rows touched)"
             }
 
         except Exception as e:
             return {
                 "success": False,
-                "error": f"Failed to update attack {attack_id} with targets: {e}"
+                "error": f"Failed to sync targets of attack {attack_id}: {e}"
             }
         finally:
             if conn is not None:
-                conn.close()
+                self.release_connection(conn)
 
     def delete_attack(self, attack_id: str) -> Dict[str, Any]:
         """Удаление атаки"""
@@ -400,16 +1632,13 @@ class DatabaseManager:
             conn = self.get_connection()
             cursor = conn.cursor()
 
-            # Проверяем существование атаки
-            cursor.execute("SELECT id FROM attacks WHERE id = %s", (attack_id,))
-            if not cursor.fetchone():
+            # Удаляем атаку (цели удалятся каскадно)
+            cursor.execute("DELETE FROM attacks WHERE id = %s RETURNING id", (attack_id,))
+            if cursor.rowcount == 0:
                 return {
                     "success": False,
                     "error": f"Attack {attack_id} not found"
                 }
-
-            # Удаляем атаку (цели удалятся каскадно)
-            cursor.execute("DELETE FROM attacks WHERE id = %s", (attack_id,))
             conn.commit()
 
             return {
@@ -424,60 +1653,85 @@ class DatabaseManager:
             }
         finally:
             if conn is not None:
-                conn.close()
+                self.release_connection(conn)
+
+    def delete_attacks(self, attack_ids: Iterable[str]) -> Dict[str, Any]:
+        """Удаление набора атак в одной транзакции: один DELETE на таблицу.
+
+        Отсутствующие id не считаются ошибкой и возвращаются в data["missing"].
+        """
+        attack_ids = list(dict.fromkeys(attack_ids))
+        conn = None
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+
+            # Цели удаляются одним запросом, а не каскадом по каждой атаке
+            cursor.execute(self.DELETE_ATTACKS_TARGETS_SQL, (attack_ids,))
+            cursor.execute(self.DELETE_ATTACKS_SQL, (attack_ids,))
+            deleted = [attack_id for attack_id, in cursor.fetchall()]
+            conn.commit()
+
+            return self._bulk_result("deleted", attack_ids, deleted, {"deleted": deleted})
+
+        except Exception as e:
+            return {
+                "success": False,
+                "error": f"Failed to delete attacks: {e}"
+            }
+        finally:
+            if conn is not None:
+                self.release_connection(conn)
+
+    def update_attacks(self, attack_ids: Iterable[str], fields: Dict[str, Any]) -> Dict[str, Any]:
+        """Изменение полей набора атак одним UPDATE (поля - BULK_UPDATE_FIELDS, цели не меняются).
+
+        Возвращает новые версии атак в data["updated"] и отсутствующие id в data["missing"].
+        """
+        attack_ids = list(dict.fromkeys(attack_ids))
+        conn = None
+        try:
+            sql, params = self._bulk_update_query(attack_ids, fields)
+
+            conn = self.get_connection()
+            cursor = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
+
+            cursor.execute(sql, params)
+            attacks = self._hydrate_attacks(cursor, cursor.fetchall())
+            conn.commit()
+
+            return self._bulk_result("updated", attack_ids, [attack["id"] for attack in attacks],
+                                     {"updated": attacks})
+
+        except Exception as e:
+            return {
+                "success": False,
+                "error": f"Failed to update attacks: {e}"
+            }
+        finally:
+            if conn is not None:
+                self.release_connection(conn)
 
     def filter_attacks(self, frequencies: List[str] = None, danger_levels: List[str] = None,
-                       attack_types: List[str] = None, protocols: List[str] = None) -> List[Dict[str, Any]]:
-        """Фильтрация атак по параметрам"""
+                       attack_types: List[str] = None, protocols: List[str] = None, ports: List[int] = None,
+                       source_ips: List[str] = None, tags: List[str] = None, created_from: datetime = None,
+                       created_to: datetime = None) -> List[Dict[str, Any]]:
+        """Фильтрация атак по параметрам (два запроса на одном соединении)"""
         conn = None
         try:
             conn = self.get_connection()
             cursor = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
 
-            # Базовый запрос
-            query = """
-                SELECT DISTINCT a.* FROM attacks a
-                WHERE 1=1
-            """
-            params = []
-
-            # Добавляем условия фильтрации
-            if frequencies:
-                placeholders = ",".join(["%s"] * len(frequencies))
-                query += f" AND a.frequency IN ({placeholders})"
-                params.extend(frequencies)
-
-            if danger_levels:
-                placeholders = ",".join(["%s"] * len(danger_levels))
-                query += f" AND a.danger IN ({placeholders})"
-                params.extend(danger_levels)
-
-            if attack_types:
-                placeholders = ",".join(["%s"] * len(attack_types))
-                query += f" AND a.attack_type IN ({placeholders})"
-                params.extend(attack_types)
-
-            # Фильтрация по протоколу требует JOIN с targets
-            if protocols:
-                query += """
-                    AND EXISTS (
-                        SELECT 1 FROM targets t 
-                        WHERE t.attack_id = a.id AND t.protocol IN ({})
-                    )
-                """.format(",".join(["%s"] * len(protocols)))
-                params.extend(protocols)
-
-            query += " ORDER BY a.created_at DESC"
+            where, params = self._build_filter_clause(frequencies, danger_levels, attack_types, protocols,
+                                                      ports, source_ips, tags, created_from, created_to)
 
-            cursor.execute(query, params)
-            attacks_data = cursor.fetchall()
+            # DISTINCT не нужен: EXISTS не размножает строки атак
+            query = f"{self.SELECT_ATTACKS}{where} ORDER BY a.created_at DESC, a.id DESC"
+
+            self._execute_prepared(cursor, query, params)
 
-            # Получаем полные данные для отфильтрованных атак
-            attacks = []
-            for attack_row in attacks_data:
-                attack = self.get_attack(attack_row["id"])
-                if attack:
-                    attacks.append(attack)
+            # Загружаем цели отфильтрованных атак одним запросом
+            attacks = self._hydrate_attacks(cursor, cursor.fetchall())
 
             return attacks
 
@@ -486,7 +1740,7 @@ class DatabaseManager:
             return []
         finally:
             if conn is not None:
-                conn.close()
+                self.release_connection(conn)
 
     def reset_database(self) -> Dict[str, Any]:
         """Сброс базы данных (удаление всех данных)"""
@@ -498,8 +1752,12 @@ class DatabaseManager:
             # Удаляем таблицы (в правильном порядке из-за foreign keys)
             cursor.execute("DROP TABLE IF EXISTS targets CASCADE")
             cursor.execute("DROP TABLE IF EXISTS attacks CASCADE")
+            cursor.execute("DROP TABLE IF EXISTS attack_tombstones")
+            cursor.execute("DROP TABLE IF EXISTS rollup_refreshes")
 
             conn.commit()
+            self.release_connection(conn)
+            conn = None
 
             # Создаем заново
             return self.initialize_database()
@@ -511,4 +1769,4 @@ class DatabaseManager:
             }
         finally:
             if conn is not None:
-                conn.close()
\ No newline at end of file
+                self.release_connection(conn)
\ No newline at end of file
@@ -0,0 +1,92 @@
+import re
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+import psycopg2.extensions
+
+
+class PreparedStatementConnection(psycopg2.extensions.connection):
+    """Соединение, запоминающее подготовленные на нем выражения (PREPARE живет до конца сессии).
+
+    Кеш ограничен cache_size выражениями: самое давно не использованное вытесняется
+    и должно быть удалено на сервере через DEALLOCATE.
+    """
+
+    cache_size = 100
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Текст запроса -> имя подготовленного выражения
+        self.prepared = OrderedDict()
+        # Устаревшие выражения, которые нужно удалить на сервере при следующем обращении
+        self.stale = []
+        self._next_statement = 0
+
+    def prepared_name(self, sql: str) -> Optional[str]:
+        """Имя уже подготовленного выражения или None"""
+        name = self.prepared.get(sql)
+        if name is not None:
+            self.prepared.move_to_end(sql)
+        return name
+
+    def add_prepared(self, sql: str) -> Tuple[str, Optional[str]]:
+        """Регистрация нового выражения: (имя, имя вытесненного выражения или None)"""
+        self._next_statement += 1
+        name = f"dm_stmt_{self._next_statement}"
+        self.prepared[sql] = name
+
+        evicted = None
+        if len(self.prepared) > self.cache_size:
+            _, evicted = self.prepared.popitem(last=False)
+        return name, evicted
+
+    def forget_prepared(self, sql: str):
+        """Удаление выражения из кеша: при следующем вызове оно будет подготовлено заново"""
+        self.prepared.pop(sql, None)
+
+    def discard_prepared(self, sql: str):
+        """Удаление устаревшего выражения из кеша с DEALLOCATE при следующем обращении.
+
+        Выражения не откатываются вместе с транзакцией, а в прерванной ошибкой
+        транзакции DEALLOCATE не выполнить - поэтому удаление откладывается.
+        """
+        name = self.prepared.pop(sql, None)
+        if name is not None:
+            self.stale.append(name)
+
+    def take_stale(self) -> List[str]:
+        """Имена выражений для DEALLOCATE (очередь очищается)"""
+        stale, self.stale = self.stale, []
+        return stale
+
+
+def prepare_statement(name: str, sql: str) -> str:
+    """PREPARE для запроса с параметрами psycopg2 (%s -> $1, $2, ...).
+
+    Разбор повторяет подстановку параметров psycopg2, чтобы запрос значил то же,
+    что и без подготовки: psycopg2 не различает строковые литералы и комментарии,
+    поэтому %s - параметр везде, а знак процента записывается как %%. Именованные
+    параметры %(name)s и прочие % не поддерживаются (ValueError).
+    """
+    number = 0
+
+    def placeholder(match):
+        nonlocal number
+        kind = match.group(1)
+        if kind == "%":
+            return "%"
+        if kind == "s":
+            number += 1
+            return f"${number}"
+        raise ValueError(f"Unsupported placeholder %{kind} in prepared statement: {sql!r}")
+
+    # Текст PREPARE выполняется без параметров - psycopg2 его не форматирует
+    text = re.sub(r"%(.?)", placeholder, sql, flags=re.DOTALL)
+    return f"PREPARE {name} AS {text}"
+
+
+def execute_statement(name: str, param_count: int) -> str:
+    """EXECUTE подготовленного выражения с параметрами psycopg2"""
+    if not param_count:
+        return f"EXECUTE {name}"
+    return f"EXECUTE {name} ({', '.join(['%s'] * param_count)})"
@@ -0,0 +1,156 @@
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence
+
+from .adhoc_query import AdhocQuery
+from .db_config import db_config
+
+# Расхождение оценки планировщика и фактического числа строк, начиная с которого узел подсвечивается
+MISMATCH_FACTOR = 10
+
+# Размер таблиц из плана по статистике (reltuples < 0 - таблица еще не анализировалась)
+TABLE_ROWS_SQL = """
+    SELECT name, c.reltuples
+    FROM unnest(%s::text[]) AS name
+    JOIN pg_class c ON c.oid = to_regclass(quote_ident(name))
+"""
+
+
+@dataclass
+class PlanNode:
+    node_type: str
+    depth: int
+    relation: Optional[str] = None
+    index: Optional[str] = None
+    # Оценка планировщика и факт - строк за один проход узла
+    plan_rows: float = 0
+    actual_rows: Optional[float] = None
+    loops: int = 1
+    # Время всех проходов узла (с дочерними) и собственное, мс
+    total_time: Optional[float] = None
+    self_time: Optional[float] = None
+    shared_hit: Optional[int] = None
+    shared_read: Optional[int] = None
+    # Строк в таблице по статистике (для сканирований)
+    table_rows: Optional[float] = None
+    details: Dict[str, Any] = field(default_factory=dict)
+    warnings: List[str] = field(default_factory=list)
+
+    @property
+    def title(self) -> str:
+        title = self.node_type
+        if self.index:
+            title += f" using {self.index}"
+        if self.relation:
+            title += f" on {self.relation}"
+        return title
+
+
+@dataclass
+class QueryPlan:
+    sql: str
+    analyzed: bool
+    # Узлы в порядке обхода дерева (родитель перед дочерними, глубина в PlanNode.depth)
+    nodes: List[PlanNode]
+    planning_time: Optional[float] = None
+    execution_time: Optional[float] = None
+
+    @property
+    def warnings(self) -> List[str]:
+        return [f"{node.title}: {warning}" for node in self.nodes for warning in node.warnings]
+
+
+def parse_plan(sql: str, explained: Sequence[Dict[str, Any]], analyzed: bool,
+               table_rows: Optional[Dict[str, float]] = None,
+               large_table_rows: Optional[int] = None) -> QueryPlan:
+    """Разбор результата EXPLAIN (FORMAT JSON) в список узлов с предупреждениями"""
+    table_rows = table_rows or {}
+    large_table_rows = db_config.plan_large_table_rows if large_table_rows is None else large_table_rows
+    root = explained[0]
+    nodes = []
+
+    def walk(plan, depth):
+        node = PlanNode(
+            node_type=plan["Node Type"],
+            depth=depth,
+            relation=plan.get("Relation Name"),
+            index=plan.get("Index Name"),
+            plan_rows=plan.get("Plan Rows", 0),
+            details={key: plan[key] for key in ("Filter", "Index Cond", "Hash Cond", "Join Filter",
+                                                "Rows Removed by Filter", "Sort Key") if key in plan}
+        )
+        nodes.append(node)
+
+        if analyzed and "Actual Rows" in plan:
+            node.loops = plan.get("Actual Loops", 1)
+            node.actual_rows = plan["Actual Rows"]
+            node.total_time = plan["Actual Total Time"] * node.loops
+            node.shared_hit = plan.get("Shared Hit Blocks")
+            node.shared_read = plan.get("Shared Read Blocks")
+
+        children = [walk(child, depth + 1) for child in plan.get("Plans", [])]
+        if node.total_time is not None:
+            children_time = sum(child.total_time or 0 for child in children)
+            node.self_time = max(node.total_time - children_time, 0.0)
+
+        if node.relation is not None:
+            node.table_rows = table_rows.get(node.relation)
+        check_node(node, large_table_rows)
+        return node
+
+    walk(root["Plan"], 0)
+    return QueryPlan(sql=sql, analyzed=analyzed, nodes=nodes,
+                     planning_time=root.get("Planning Time"),
+                     execution_time=root.get("Execution Time"))
+
+
+def check_node(node: PlanNode, large_table_rows: int):
+    """Предупреждения узла: последовательное чтение большой таблицы и ошибка оценки строк"""
+    if node.node_type in ("Seq Scan", "Parallel Seq Scan"):
+        scanned = node.table_rows if node.table_rows is not None and node.table_rows >= 0 else None
+        if node.actual_rows is not None:
+            # Фактически прочитано: вернувшиеся строки и отброшенные фильтром
+            actual_scanned = (node.actual_rows + node.details.get("Rows Removed by Filter", 0)) * node.loops
+            scanned = max(scanned or 0, actual_scanned)
+        if scanned is not None and scanned >= large_table_rows:
+            node.warnings.append(f"sequential scan of ~{scanned:,.0f} rows")
+
+    if node.actual_rows is not None:
+        estimated = max(node.plan_rows, 1)
+        actual = max(node.actual_rows, 1)
+        if max(estimated, actual) / min(estimated, actual) >= MISMATCH_FACTOR:
+            node.warnings.append(f"rows estimated {node.plan_rows:,.0f}, actual {node.actual_rows:,.0f}")
+
+
+class ExplainQuery(AdhocQuery):
+    """План пользовательского запроса: EXPLAIN (FORMAT JSON), с analyze - EXPLAIN (ANALYZE, BUFFERS).
+
+    С analyze запрос действительно выполняется, но транзакция AdhocQuery всегда
+    откатывается, поэтому INSERT/UPDATE/DELETE не меняют данные. Действуют те же
+    statement_timeout, отмена и лимит одновременных запросов. run() возвращает QueryPlan.
+    """
+
+    def __init__(self, db, sql: str, params: Optional[Sequence[Any]] = None,
+                 analyze: bool = False, timeout: Optional[float] = None):
+        options = "ANALYZE, BUFFERS, FORMAT JSON" if analyze else "FORMAT JSON"
+        super().__init__(db, f"EXPLAIN ({options}) {sql}", params, timeout)
+        self.query_sql = sql
+        self.analyze = analyze
+
+    def _execute(self, cursor) -> QueryPlan:
+        cursor.execute(self.sql, self.params)
+        explained = cursor.fetchone()[0]
+
+        relations = set()
+        stack = [explained[0]["Plan"]]
+        while stack:
+            plan = stack.pop()
+            if "Relation Name" in plan:
+                relations.add(plan["Relation Name"])
+            stack.extend(plan.get("Plans", []))
+
+        table_rows = {}
+        if relations:
+            cursor.execute(TABLE_ROWS_SQL, (sorted(relations),))
+            table_rows = {name: rows for name, rows in cursor.fetchall()}
+
+        return parse_plan(self.query_sql, explained, self.analyze, table_rows)
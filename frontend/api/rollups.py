@@ -0,0 +1,58 @@
+import threading
+from typing import Any, Callable, Dict, Optional
+
+
+class RollupScheduler:
+    """Фоновое обновление сводок Dashboard (DatabaseManager.refresh_rollups).
+
+    Раз в interval секунд проверяет, есть ли изменения атак после последнего
+    обновления, и только тогда обновляет сводки. on_refreshed(результат)
+    вызывается в потоке планировщика после каждого обновления.
+    """
+
+    def __init__(self, db, interval: float = 300.0,
+                 on_refreshed: Optional[Callable[[Dict[str, Any]], None]] = None):
+        self.db = db
+        self.interval = interval
+        self.on_refreshed = on_refreshed
+
+        self._stopped = threading.Event()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Запуск планировщика"""
+        if self._thread is not None:
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="rollup-scheduler", daemon=True)
+        self._thread.start()
+
+    def refresh_now(self):
+        """Внеочередное обновление (без ожидания интервала)"""
+        self._wakeup.set()
+
+    def stop(self, timeout: float = 5.0):
+        """Остановка планировщика (начатое обновление завершается)"""
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        while not self._stopped.is_set():
+            forced = self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            if self._stopped.is_set():
+                break
+
+            state = self.db.get_rollup_state()
+            if not forced and state is not None and not state["pending_changes"]:
+                continue
+
+            result = self.db.refresh_rollups()
+            if not result.get("success"):
+                print(f"Error refreshing rollups: {result.get('error')}")
+            elif self.on_refreshed is not None:
+                self.on_refreshed(result)
@@ -0,0 +1,184 @@
+import json
+import os
+import sqlite3
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Tuple
+
+from .db_config import db_config
+
+
+def default_snapshot_path() -> str:
+    """Файл снимка в каталоге кеша пользователя"""
+    if sys.platform == "win32":
+        base = os.getenv("LOCALAPPDATA") or os.path.expanduser("~\\AppData\\Local")
+    elif sys.platform == "darwin":
+        base = os.path.expanduser("~/Library/Caches")
+    else:
+        base = os.getenv("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(base, "ddos-attack-manager", "attacks.sqlite3")
+
+
+class AttackSnapshot:
+    """Локальный снимок набора атак в SQLite для мгновенного старта.
+
+    Хранит атаки вместе с отметкой синхронизации (см. get_attack_changes), так что
+    после старта из снимка с сервера загружаются только изменения. Снимок привязан
+    к базе, из которой загружен, и к версии схемы: чужой или устаревший файл
+    игнорируется. Запись идет в фоновом потоке по порядку вызовов.
+    """
+
+    SCHEMA_VERSION = 1
+
+    # Поля атаки с датами (в JSON хранятся строками ISO)
+    DATE_FIELDS = ("created_at", "updated_at")
+
+    # Поля счетчиков get_attack_stats с датами
+    STATS_DATE_FIELDS = ("last_attack_at",)
+
+    def __init__(self, path: Optional[str] = None, config=None):
+        self.config = config or db_config
+        self.path = path or self.config.snapshot_path or default_snapshot_path()
+        # База-источник: снимок другой базы не используется
+        self.source = f"{self.config.host}:{self.config.port}/{self.config.database}"
+
+        self._lock = threading.Lock()
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="attack-snapshot")
+
+    def _connect(self) -> sqlite3.Connection:
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        conn = sqlite3.connect(self.path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS attacks (
+                id TEXT PRIMARY KEY,
+                created_at TEXT NOT NULL,
+                data TEXT NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_attacks_created_at ON attacks (created_at DESC, id DESC)")
+        return conn
+
+    @staticmethod
+    def _dump(attack: Dict[str, Any]) -> Tuple[str, str, str]:
+        created_at = attack.get("created_at")
+        created_at = created_at.isoformat() if isinstance(created_at, datetime) else str(created_at or "")
+        return attack["id"], created_at, AttackSnapshot._json(attack)
+
+    @staticmethod
+    def _json(value: Any) -> str:
+        return json.dumps(value, default=lambda item: item.isoformat() if isinstance(item, datetime) else str(item))
+
+    def _restore_dates(self, attack: Dict[str, Any], fields: Tuple[str, ...] = DATE_FIELDS) -> Dict[str, Any]:
+        for field in fields:
+            value = attack.get(field)
+            if isinstance(value, str):
+                try:
+                    attack[field] = datetime.fromisoformat(value)
+                except ValueError:
+                    pass
+        return attack
+
+    def load(self) -> Optional[Tuple[List[Dict[str, Any]], str]]:
+        """(атаки в порядке списка, отметка синхронизации) или None, если снимка нет"""
+        if not os.path.exists(self.path):
+            return None
+        try:
+            with self._lock:
+                conn = self._connect()
+                try:
+                    meta = dict(conn.execute("SELECT key, value FROM meta"))
+                    if meta.get("schema_version") != str(self.SCHEMA_VERSION) or meta.get("source") != self.source \
+                            or not meta.get("watermark"):
+                        return None
+                    rows = conn.execute("SELECT data FROM attacks ORDER BY created_at DESC, id DESC").fetchall()
+                finally:
+                    conn.close()
+            # Один разбор общего массива заметно быстрее отдельного json.loads на каждую строку
+            attacks = json.loads("[" + ",".join(data for data, in rows) + "]")
+            return [self._restore_dates(attack) for attack in attacks], meta["watermark"]
+        except (sqlite3.Error, ValueError) as e:
+            print(f"Error loading attack snapshot: {e}")
+            return None
+
+    def _write(self, attacks: List[Dict[str, Any]], deleted_ids: List[str], watermark: str, full: bool):
+        with self._lock:
+            conn = self._connect()
+            try:
+                with conn:
+                    if full:
+                        conn.execute("DELETE FROM attacks")
+                    conn.executemany("INSERT OR REPLACE INTO attacks (id, created_at, data) VALUES (?, ?, ?)",
+                                     [self._dump(attack) for attack in attacks])
+                    conn.executemany("DELETE FROM attacks WHERE id = ?", [(attack_id,) for attack_id in deleted_ids])
+                    conn.executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", [
+                        ("schema_version", str(self.SCHEMA_VERSION)),
+                        ("source", self.source),
+                        ("watermark", watermark),
+                        ("saved_at", datetime.now().isoformat())
+                    ])
+            finally:
+                conn.close()
+
+    def load_stats(self) -> Optional[Dict[str, Any]]:
+        """Последние счетчики get_attack_stats из снимка (с временем сохранения snapshot_saved_at) или None"""
+        if not os.path.exists(self.path):
+            return None
+        try:
+            with self._lock:
+                conn = self._connect()
+                try:
+                    meta = dict(conn.execute("SELECT key, value FROM meta"))
+                finally:
+                    conn.close()
+            if meta.get("schema_version") != str(self.SCHEMA_VERSION) or meta.get("source") != self.source \
+                    or not meta.get("attack_stats"):
+                return None
+            stats = self._restore_dates(json.loads(meta["attack_stats"]), self.STATS_DATE_FIELDS)
+            # Время сохранения отличает счетчики из снимка от ответа сервера
+            stats["snapshot_saved_at"] = datetime.fromisoformat(meta["attack_stats_saved_at"])
+            return stats
+        except (sqlite3.Error, ValueError) as e:
+            print(f"Error loading attack stats snapshot: {e}")
+            return None
+
+    def _write_stats(self, stats: Dict[str, Any]):
+        with self._lock:
+            conn = self._connect()
+            try:
+                with conn:
+                    conn.executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", [
+                        ("schema_version", str(self.SCHEMA_VERSION)),
+                        ("source", self.source),
+                        ("attack_stats", self._json(stats)),
+                        ("attack_stats_saved_at", datetime.now().isoformat())
+                    ])
+            finally:
+                conn.close()
+
+    def save_stats(self, stats: Dict[str, Any]):
+        """Фоновая запись счетчиков get_attack_stats (показываются при следующем старте до ответа сервера)"""
+        def write():
+            try:
+                self._write_stats(stats)
+            except (sqlite3.Error, OSError) as e:
+                print(f"Error saving attack stats snapshot: {e}")
+
+        self._writer.submit(write)
+
+    def save(self, delta: Dict[str, Any]):
+        """Фоновая запись ответа get_attack_changes (полного набора или изменений)"""
+        def write():
+            try:
+                self._write(delta["changed"], delta["deleted_ids"], delta["watermark"], delta["full"])
+            except (sqlite3.Error, OSError) as e:
+                print(f"Error saving attack snapshot: {e}")
+
+        self._writer.submit(write)
+
+    def close(self):
+        """Ожидание незавершенных записей"""
+        self._writer.shutdown(wait=True)
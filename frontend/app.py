@@ -5,7 +5,8 @@ from ui.forms import AttackForm
 from ui.table import AttackTable
 from ui.dashboard import Dashboard
 from api.client import DDOSDatabaseClient
-import threading
+from api.db_config import db_config
+from api.snapshot import AttackSnapshot
 from tkinter import messagebox
 
 
@@ -21,6 +22,17 @@ class DDoSAttackApp:
 
         # Загрузка данных с сервера
         self.attacks = []
+        # Счетчики статистики с сервера (get_attack_stats)
+        self.attack_stats = None
+        # Запрос счетчиков выполняется один; изменения во время запроса и паузы после него
+        # объединяются в один повторный запрос
+        self.stats_loading = False
+        self.stats_stale = False
+        self.stats_job = None
+        # Отметка последней синхронизации: дальше загружаются только изменения
+        self.attacks_watermark = None
+        # Снимок последнего загруженного набора на диске
+        self.snapshot = AttackSnapshot() if db_config.snapshot_enabled else None
 
         # Цветовая схема
         self.colors = {
@@ -43,10 +55,23 @@ class DDoSAttackApp:
         self.protocols = ["tcp", "udp", "dns", "http", "https", "icmp"]
 
         self.current_edit_id = None
+        # Открытая таблица атак (для живых обновлений)
+        self.attack_table = None
+        # Открытая главная страница (для обновления сводок)
+        self.dashboard = None
         self.setup_ui()
 
-        # Загружаем данные при запуске
+        # Сразу показываем данные из снимка, затем сверяемся с сервером
+        self.load_snapshot()
         self.refresh_attacks()
+        self.refresh_stats()
+        # Дальше изменения приходят из БД сами (LISTEN/NOTIFY)
+        self.api_client.start_change_listener(self.window, self.on_attacks_changed, self.refresh_attacks)
+        # Сводки Dashboard обновляются на сервере в фоне
+        self.api_client.start_rollup_scheduler(self.window, self.on_rollups_refreshed)
+        # Секции следующих месяцев создаются заранее, чтобы новые атаки не попадали в DEFAULT
+        if db_config.partitioned:
+            self.api_client.submit(self.window, "ensure_partitions", self.on_partitions_ensured)
 
     def setup_ui(self):
         """Создание интерфейса с тремя вкладками"""
@@ -81,12 +106,14 @@ class DDoSAttackApp:
         """Очистить контентную область"""
         for widget in self.content_frame.winfo_children():
             widget.destroy()
+        self.attack_table = None
+        self.dashboard = None
 
     def show_dashboard(self):
         """Показать главную страницу"""
         self.clear_content()
         self.header.set_title("Main Dashboard")
-        Dashboard(self.content_frame, self)
+        self.dashboard = Dashboard(self.content_frame, self)
 
     def show_attack_form(self):
         """Показать форму добавления атаки"""
@@ -98,7 +125,7 @@ class DDoSAttackApp:
         """Показать таблицу с атаками"""
         self.clear_content()
         self.header.set_title("View Attacks Table")
-        AttackTable(self.content_frame, self)
+        self.attack_table = AttackTable(self.content_frame, self)
 
     # НОВЫЕ МЕТОДЫ ДЛЯ ДОПОЛНИТЕЛЬНОЙ ФУНКЦИОНАЛЬНОСТИ
     def show_alter_table_manager(self):
@@ -162,29 +189,137 @@ class DDoSAttackApp:
             self.show_error(f"Failed to load JOIN Wizard: {e}")
 
     def refresh_attacks(self):
-        """Обновление списка атак с сервера"""
-        def refresh_thread():
-            try:
-                attacks = self.api_client.get_all_attacks()
-                self.window.after(0, lambda: self.on_attacks_loaded(attacks))
-            except Exception as e:
-                self.window.after(0, lambda: self.show_error(f"Failed to refresh attacks: {e}"))
+        """Обновление списка атак с сервера (первый раз - все атаки, дальше - изменения)"""
+        self.api_client.submit(
+            self.window,
+            "get_attack_changes",
+            self.on_attack_changes_loaded,
+            lambda e: self.show_error(f"Failed to refresh attacks: {e}"),
+            since=self.attacks_watermark
+        )
+
+    def load_snapshot(self):
+        """Показ атак из локального снимка до ответа сервера"""
+        if self.snapshot is None:
+            return
+        loaded = self.snapshot.load()
+        if loaded is not None:
+            self.attacks, self.attacks_watermark = loaded
+        # Счетчики последнего запуска: заменяются ответом get_attack_stats
+        stats = self.snapshot.load_stats()
+        if stats is not None:
+            self.attack_stats = stats
+            self.update_stats()
 
-        thread = threading.Thread(target=refresh_thread)
-        thread.daemon = True
-        thread.start()
+    def on_attack_changes_loaded(self, delta):
+        """Применение загруженных изменений атак"""
+        if delta["full"]:
+            self.on_attacks_loaded(delta["changed"])
+        else:
+            self.on_attacks_changed(delta["changed"], delta["deleted_ids"])
+        self.attacks_watermark = delta["watermark"]
+        if self.snapshot is not None:
+            self.snapshot.save(delta)
 
     def on_attacks_loaded(self, attacks):
         """Обработка загруженных атак"""
         self.attacks = attacks
+        self.refresh_stats()
+
+    def refresh_stats(self):
+        """Загрузка счетчиков статистики с сервера (не зависит от загруженных атак).
+
+        Счетчики считаются полным проходом по attacks, поэтому при потоке изменений
+        запрос не повторяется чаще раза в stats_refresh_interval секунд.
+        """
+        if self.stats_loading or self.stats_job is not None:
+            self.stats_stale = True
+            return
+
+        self.stats_loading = True
+        self.stats_stale = False
+        self.api_client.submit(
+            self.window,
+            "get_attack_stats",
+            self.on_stats_loaded,
+            self.on_stats_failed
+        )
+
+    def on_stats_request_done(self):
+        """Завершение запроса счетчиков: повтор после паузы, если были изменения"""
+        self.stats_loading = False
+        if self.stats_stale:
+            self.stats_job = self.window.after(int(db_config.stats_refresh_interval * 1000), self.refresh_stale_stats)
+
+    def refresh_stale_stats(self):
+        """Повторный запрос счетчиков после паузы"""
+        self.stats_job = None
+        self.refresh_stats()
+
+    def on_stats_failed(self, e):
+        """Ошибка загрузки статистики"""
+        print(f"Failed to load attack stats: {e}")
+        self.on_stats_request_done()
+
+    def on_stats_loaded(self, stats):
+        """Обработка загруженной статистики"""
+        self.on_stats_request_done()
+        if stats:
+            self.attack_stats = stats
+            if self.snapshot is not None:
+                self.snapshot.save_stats(stats)
         self.update_stats()
 
+    def on_attacks_changed(self, changed, deleted_ids):
+        """Применение изменений атак, сделанных в БД (в том числе другими клиентами)"""
+        if not changed and not deleted_ids:
+            return
+
+        stale = set(deleted_ids) | {attack["id"] for attack in changed}
+        attacks = [attack for attack in self.attacks if attack.get("id") not in stale]
+        if changed:
+            attacks.extend(changed)
+            try:
+                # Список почти упорядочен: сортировка почти линейная
+                attacks.sort(key=AttackTable.sort_key, reverse=True)
+            except TypeError:
+                pass
+        self.attacks = attacks
+        self.refresh_stats()
+
+        if self.attack_table is not None:
+            self.attack_table.apply_changes(changed, deleted_ids)
+
+    def on_rollups_refreshed(self, result):
+        """Сводки на сервере обновлены в фоне"""
+        if self.dashboard is not None:
+            self.dashboard.load_rollups()
+
+    def on_partitions_ensured(self, result):
+        """Секции attacks и targets созданы заранее"""
+        if not result.get("success"):
+            print(f"Error creating partitions: {result.get('error')}")
+        elif result["data"]["blocked"]:
+            print(result["message"])
+
+    def live_updates_active(self) -> bool:
+        """Приходят ли изменения из БД без перезагрузки"""
+        return self.api_client.listener is not None
+
+    def refresh_after_write(self):
+        """Обновление данных после собственной операции записи"""
+        # При живых обновлениях изменение придет через NOTIFY
+        if not self.live_updates_active():
+            self.refresh_attacks()
+
     def update_stats(self):
         """Обновление статистики"""
         if hasattr(self, 'sidebar'):
             self.sidebar.update_stats()
         if hasattr(self, 'header'):
             self.header.update_stats()
+        if self.attack_table is not None:
+            self.attack_table.update_stats()
 
     def show_error(self, message):
         """Показ ошибки"""
@@ -196,4 +331,9 @@ class DDoSAttackApp:
 
     def run(self):
         """Запуск приложения"""
-        self.window.mainloop()
\ No newline at end of file
+        try:
+            self.window.mainloop()
+        finally:
+            self.api_client.close()
+            if self.snapshot is not None:
+                self.snapshot.close()
\ No newline at end of file
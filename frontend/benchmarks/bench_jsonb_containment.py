@@ -0,0 +1,109 @@
+"""Бенчмарк запросов на вхождение: JSON в TEXT против JSONB с GIN индексами.
+
+Создает в отдельной схеме две копии данных (по умолчанию миллион атак):
+со старыми TEXT-столбцами и с JSONB-столбцами и GIN индексами, после чего
+сравнивает запросы "атаки, затрагивающие порт 53" и "цели с тегом X".
+Подключение берется из переменных окружения DB_* (см. api/db_config.py).
+
+    python benchmarks/bench_jsonb_containment.py --rows 1000000
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.db_manager import DatabaseManager
+
+SCHEMA = "bench_jsonb"
+
+# Порт 53 встречается примерно у 1% атак, тег 'dns-amplification' - примерно у 0.5% целей
+SETUP = """
+    DROP SCHEMA IF EXISTS {schema} CASCADE;
+    CREATE SCHEMA {schema};
+
+    CREATE TABLE {schema}.attacks_text AS
+    SELECT g::text AS id,
+           CASE WHEN g % 100 = 0 THEN '[53, 443]' ELSE '[80, ' || (1024 + g % 5000) || ']' END AS affected_ports
+    FROM generate_series(1, {rows}) AS g;
+
+    CREATE TABLE {schema}.targets_text AS
+    SELECT g::text AS attack_id,
+           CASE WHEN g % 200 = 0 THEN '["dns-amplification", "edge"]' ELSE '["web", "t' || (g % 1000) || '"]' END AS tags
+    FROM generate_series(1, {rows}) AS g;
+
+    CREATE TABLE {schema}.attacks_jsonb AS
+    SELECT id, affected_ports::jsonb AS affected_ports FROM {schema}.attacks_text;
+
+    CREATE TABLE {schema}.targets_jsonb AS
+    SELECT attack_id, tags::jsonb AS tags FROM {schema}.targets_text;
+
+    CREATE INDEX ON {schema}.attacks_jsonb USING GIN (affected_ports jsonb_path_ops);
+    CREATE INDEX ON {schema}.targets_jsonb USING GIN (tags jsonb_path_ops);
+
+    ANALYZE {schema}.attacks_text;
+    ANALYZE {schema}.targets_text;
+    ANALYZE {schema}.attacks_jsonb;
+    ANALYZE {schema}.targets_jsonb;
+"""
+
+QUERIES = [
+    (
+        "attacks affecting port 53",
+        # До миграции фильтр возможен только с разбором JSON каждой строки
+        "SELECT count(*) FROM {schema}.attacks_text WHERE affected_ports::jsonb @> '[53]'",
+        "SELECT count(*) FROM {schema}.attacks_jsonb WHERE affected_ports @> '[53]'"
+    ),
+    (
+        "targets tagged dns-amplification",
+        "SELECT count(*) FROM {schema}.targets_text WHERE tags::jsonb @> '[\"dns-amplification\"]'",
+        "SELECT count(*) FROM {schema}.targets_jsonb WHERE tags @> '[\"dns-amplification\"]'"
+    )
+]
+
+
+def timed(cursor, sql, repeat):
+    timings = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        cursor.execute(sql)
+        result = cursor.fetchone()[0]
+        timings.append(time.perf_counter() - started)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--keep", action="store_true", help="не удалять схему с тестовыми данными")
+    args = parser.parse_args()
+
+    db = DatabaseManager()
+    conn = db.get_connection()
+    try:
+        conn.autocommit = True
+        cursor = conn.cursor()
+
+        print(f"Generating {args.rows} rows in schema {SCHEMA}...")
+        started = time.perf_counter()
+        cursor.execute(SETUP.format(schema=SCHEMA, rows=args.rows))
+        print(f"Done in {time.perf_counter() - started:.1f}s\n")
+
+        print(f"{'query':<36} {'TEXT, ms':>10} {'JSONB+GIN, ms':>14} {'speedup':>8} {'rows':>8}")
+        for title, before_sql, after_sql in QUERIES:
+            before, count = timed(cursor, before_sql.format(schema=SCHEMA), args.repeat)
+            after, _ = timed(cursor, after_sql.format(schema=SCHEMA), args.repeat)
+            print(f"{title:<36} {before * 1000:>10.1f} {after * 1000:>14.1f} {before / after:>7.1f}x {count:>8}")
+
+        if not args.keep:
+            cursor.execute(f"DROP SCHEMA {SCHEMA} CASCADE")
+    finally:
+        db.release_connection(conn)
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Бенчмарк подготовленных выражений для частых запросов DatabaseManager.
+
+Для каждого запроса (атака по id, цели атак, страница списка, страница фильтра)
+сравнивает обычное выполнение с EXECUTE подготовленного выражения: среднее время
+вызова на клиенте и время планирования на сервере (Planning Time из EXPLAIN ANALYZE).
+Подключение берется из переменных окружения DB_* (см. api/db_config.py).
+
+    python benchmarks/bench_prepared_statements.py --repeat 500
+"""
+import argparse
+import dataclasses
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import psycopg2.extras
+
+from api.db_config import db_config
+from api.db_manager import DatabaseManager
+
+
+def hot_queries(db, cursor):
+    """(название, sql, params) частых запросов на текущих данных"""
+    cursor.execute("SELECT id FROM attacks ORDER BY created_at DESC, id DESC LIMIT %s", (db.PAGE_SIZE,))
+    page_ids = [row[0] for row in cursor.fetchall()]
+    if not page_ids:
+        raise SystemExit("The attacks table is empty - import some data first")
+
+    listing, listing_params, _ = db._page_query(db.PAGE_SIZE, None)
+    filtered, filtered_params, _ = db._page_query(db.PAGE_SIZE, None, danger_levels=["high", "critical"],
+                                                  protocols=["tcp", "udp"])
+    return [
+        ("attack by id", db.SELECT_ATTACK_SQL, [page_ids[0]]),
+        ("targets by attacks", db.SELECT_TARGETS_SQL, [page_ids]),
+        ("listing page", listing, listing_params),
+        ("filter page", filtered, filtered_params)
+    ]
+
+
+def call_time(db, cursor, sql, params, repeat):
+    """Среднее время вызова, мс"""
+    db._execute_prepared(cursor, sql, params)
+    cursor.fetchall()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        db._execute_prepared(cursor, sql, params)
+        cursor.fetchall()
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+def planning_time(db, cursor, sql, params):
+    """Planning Time сервера, мс"""
+    commands, query = db._prepared_commands(cursor.connection, sql, params)
+    for command in commands:
+        cursor.execute(command)
+    # Несколько прогонов, чтобы подготовленное выражение перешло на общий план
+    for _ in range(6):
+        cursor.execute(f"EXPLAIN (ANALYZE, FORMAT JSON) {query}", params)
+    return cursor.fetchone()[0][0]["Planning Time"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=500)
+    args = parser.parse_args()
+
+    plain = DatabaseManager(dataclasses.replace(db_config, prepared_statements=False))
+    prepared = DatabaseManager(dataclasses.replace(db_config, prepared_statements=True))
+
+    plain_conn = plain.get_connection()
+    prepared_conn = prepared.get_connection()
+    try:
+        plain_cursor = plain_conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
+        prepared_cursor = prepared_conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
+
+        print(f"{'query':<20} {'plain, ms':>10} {'prepared, ms':>13} {'saved, ms':>10} "
+              f"{'plan plain':>11} {'plan prepared':>14}")
+        for title, sql, params in hot_queries(plain, plain_cursor):
+            plain_ms = call_time(plain, plain_cursor, sql, params, args.repeat)
+            prepared_ms = call_time(prepared, prepared_cursor, sql, params, args.repeat)
+            plain_plan = planning_time(plain, plain_cursor, sql, params)
+            prepared_plan = planning_time(prepared, prepared_cursor, sql, params)
+            print(f"{title:<20} {plain_ms:>10.3f} {prepared_ms:>13.3f} {plain_ms - prepared_ms:>10.3f} "
+                  f"{plain_plan:>11.3f} {prepared_plan:>14.3f}")
+
+        plain_conn.rollback()
+        prepared_conn.rollback()
+    finally:
+        plain.release_connection(plain_conn)
+        prepared.release_connection(prepared_conn)
+        plain.close()
+        prepared.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Бенчмарк времени до первых строк при запуске приложения.
+
+Сравнивает старт без снимка (подключение к PostgreSQL и полная загрузка атак)
+со стартом из локального снимка SQLite (чтение файла) и отдельно показывает
+фоновую сверку с сервером после старта из снимка (изменения после отметки).
+Каждый прогон создает новое подключение, как при запуске приложения.
+Подключение берется из переменных окружения DB_* (см. api/db_config.py).
+
+    python benchmarks/bench_snapshot_startup.py --repeat 5
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.db_manager import DatabaseManager
+from api.snapshot import AttackSnapshot
+
+
+def cold_load():
+    """Старт без снимка: (мс до первых строк, ответ get_attack_changes)"""
+    started = time.perf_counter()
+    db = DatabaseManager()
+    try:
+        delta = db.get_attack_changes()
+    finally:
+        db.close()
+    return (time.perf_counter() - started) * 1000, delta
+
+
+def snapshot_load(snapshot):
+    """Старт из снимка: (мс до первых строк, отметка)"""
+    started = time.perf_counter()
+    attacks, watermark = snapshot.load()
+    elapsed = (time.perf_counter() - started) * 1000
+    if not attacks:
+        raise SystemExit("The snapshot is empty - import some data first")
+    return elapsed, watermark
+
+
+def reconcile(watermark):
+    """Фоновая сверка после старта из снимка, мс"""
+    started = time.perf_counter()
+    db = DatabaseManager()
+    try:
+        db.get_attack_changes(watermark)
+    finally:
+        db.close()
+    return (time.perf_counter() - started) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        snapshot = AttackSnapshot(path=os.path.join(directory, "attacks.sqlite3"))
+
+        cold = []
+        for _ in range(args.repeat):
+            elapsed, delta = cold_load()
+            cold.append(elapsed)
+        snapshot.save(delta)
+        snapshot.close()
+        count = len(delta["changed"])
+
+        warm = []
+        synced = []
+        for _ in range(args.repeat):
+            elapsed, watermark = snapshot_load(snapshot)
+            warm.append(elapsed)
+            synced.append(reconcile(watermark))
+
+    print(f"attacks: {count}")
+    print(f"{'startup':<32} {'median, ms':>11} {'min, ms':>9}")
+    for title, times in (("postgres, full load", cold), ("snapshot, first rows", warm),
+                         ("snapshot, background reconcile", synced)):
+        print(f"{title:<32} {statistics.median(times):>11.1f} {min(times):>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Бенчмарк сохранения атаки в зависимости от количества целей.
+
+Сравнивает построчную вставку целей (по одному INSERT на цель) с пакетной
+вставкой DatabaseManager (многострочный INSERT, COPY для больших списков).
+Подключение берется из переменных окружения DB_* (см. api/db_config.py).
+
+    python benchmarks/bench_target_writes.py --repeat 3
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.db_manager import DatabaseManager
+from utils.helpers import generate_id
+
+TARGET_COUNTS = [1, 10, 100, 1000, 10000]
+
+
+def make_attack(target_count):
+    return {
+        "id": generate_id(),
+        "name": f"bench-{target_count}",
+        "frequency": "high",
+        "danger": "high",
+        "attack_type": "volumetric",
+        "source_ips": ["10.0.0.1"],
+        "affected_ports": [80],
+        "mitigation_strategies": ["benchmark"],
+        "targets": [
+            {
+                "target_ip": f"192.168.{i // 256 % 256}.{i % 256}",
+                "target_domain": f"host{i}.example.com",
+                "port": 80,
+                "protocol": "tcp",
+                "tags": ["bench", f"t{i}"]
+            } for i in range(target_count)
+        ]
+    }
+
+
+def _insert_attack_row(cursor, attack):
+    cursor.execute("""
+        INSERT INTO attacks
+        (id, name, frequency, danger, attack_type, source_ips, affected_ports, mitigation_strategies, created_at, updated_at)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, now(), now())
+    """, (attack["id"], attack["name"], attack["frequency"], attack["danger"], attack["attack_type"],
+          "[]", "[]", "[]"))
+
+
+def save_row_by_row(db, attack):
+    """Старый способ: один INSERT на каждую цель"""
+    conn = db.get_connection()
+    try:
+        cursor = conn.cursor()
+        _insert_attack_row(cursor, attack)
+        for target_data in attack["targets"]:
+            cursor.execute(
+                "INSERT INTO targets (attack_id, target_ip, target_domain, port, protocol, tags) "
+                "VALUES (%s, %s, %s, %s, %s, %s)",
+                db._target_row(attack["id"], target_data)
+            )
+        conn.commit()
+    finally:
+        db.release_connection(conn)
+
+
+def save_batched(db, attack):
+    """Текущий способ: многострочный INSERT или COPY"""
+    conn = db.get_connection()
+    try:
+        cursor = conn.cursor()
+        _insert_attack_row(cursor, attack)
+        db._insert_targets(cursor, attack["id"], attack["targets"])
+        conn.commit()
+    finally:
+        db.release_connection(conn)
+
+
+def measure(db, save, target_count, repeat):
+    timings = []
+    for _ in range(repeat):
+        attack = make_attack(target_count)
+        started = time.perf_counter()
+        save(db, attack)
+        timings.append(time.perf_counter() - started)
+        db.delete_attack(attack["id"])
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--max-targets", type=int, default=TARGET_COUNTS[-1])
+    args = parser.parse_args()
+
+    db = DatabaseManager()
+    db.initialize_database()
+
+    print(f"{'targets':>8} {'row-by-row, ms':>16} {'batched, ms':>12} {'speedup':>8}")
+    for count in [c for c in TARGET_COUNTS if c <= args.max_targets]:
+        legacy = measure(db, save_row_by_row, count, args.repeat)
+        batched = measure(db, save_batched, count, args.repeat)
+        print(f"{count:>8} {legacy * 1000:>16.1f} {batched * 1000:>12.1f} {legacy / batched:>7.1f}x")
+
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Бенчмарк повторной отправки атак сенсорами.
+
+Сравнивает запись через create_attack с откатом на update_attack_with_targets
+при конфликте id (несколько запросов на атаку) с пакетным upsert_attacks для
+первой отправки, повтора без изменений и повтора с частью измененных атак.
+Атаки бенчмарка удаляются после каждого прогона.
+Подключение берется из переменных окружения DB_* (см. api/db_config.py).
+
+    python benchmarks/bench_upsert_replay.py --attacks 2000 --changed 0.1
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.db_manager import DatabaseManager
+from utils.helpers import generate_id
+
+
+def make_attacks(count):
+    return [{
+        "id": generate_id(),
+        "name": f"sensor-{i}",
+        "frequency": "high",
+        "danger": "medium",
+        "attack_type": "volumetric",
+        "source_ips": [f"10.0.{i // 256 % 256}.{i % 256}"],
+        "affected_ports": [53, 80],
+        "mitigation_strategies": ["benchmark"],
+        "targets": [
+            {"target_ip": f"192.168.0.{j}", "target_domain": "sensor.example.com", "port": 80 + j,
+             "protocol": "udp", "tags": ["bench"]} for j in range(3)
+        ]
+    } for i in range(count)]
+
+
+def write_with_fallback(db, attacks):
+    """Старый способ: create_attack, при конфликте - update_attack_with_targets"""
+    for attack in attacks:
+        if not db.create_attack(attack)["success"]:
+            db.update_attack_with_targets(attack["id"], attack)
+
+
+def timed(function, *args):
+    started = time.perf_counter()
+    function(*args)
+    return (time.perf_counter() - started) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--attacks", type=int, default=2000)
+    parser.add_argument("--changed", type=float, default=0.1, help="share of attacks changed before replay")
+    args = parser.parse_args()
+
+    db = DatabaseManager()
+    try:
+        results = []
+        for title, write in (("create + update fallback", write_with_fallback),
+                             ("upsert_attacks", lambda manager, attacks: manager.upsert_attacks(attacks))):
+            attacks = make_attacks(args.attacks)
+            try:
+                first = timed(write, db, attacks)
+                replay = timed(write, db, attacks)
+                for attack in attacks[:int(len(attacks) * args.changed)]:
+                    attack["danger"] = "critical"
+                changed = timed(write, db, attacks)
+            finally:
+                db.delete_attacks([attack["id"] for attack in attacks])
+            results.append((title, first, replay, changed))
+    finally:
+        db.close()
+
+    print(f"attacks: {args.attacks}, changed on replay: {args.changed:.0%}")
+    print(f"{'method':<26} {'first, ms':>10} {'replay, ms':>11} {'changed, ms':>12}")
+    for title, first, replay, changed in results:
+        print(f"{title:<26} {first:>10.1f} {replay:>11.1f} {changed:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
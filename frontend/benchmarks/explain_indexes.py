@@ -0,0 +1,126 @@
+"""Проверка через EXPLAIN, что горячие запросы DatabaseManager используют индексы.
+
+Для каждого запроса (страница списка, фильтр, загрузка целей) выводит план
+и проверяет, что в нем встречается ожидаемый индекс управляемого набора.
+На маленькой таблице планировщик предпочтет последовательное чтение, поэтому
+можно добавить синтетические данные через --seed (удаляются после проверки).
+Подключение берется из переменных окружения DB_* (см. api/db_config.py).
+
+    python benchmarks/explain_indexes.py --seed 50000
+"""
+import argparse
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.db_manager import DatabaseManager
+
+SEED_NAME = "explain-seed"
+
+
+def seed_attacks(count):
+    for i in range(count):
+        yield {
+            "name": SEED_NAME,
+            "frequency": random.choice(["low", "medium", "high", "very_high", "continuous"]),
+            "danger": random.choice(["low", "medium", "high", "critical"]),
+            "attack_type": random.choice(["volumetric", "protocol", "application", "amplification"]),
+            "source_ips": [f"10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}"],
+            "affected_ports": [53] if i % 100 == 0 else [80, 443],
+            "mitigation_strategies": ["rate limiting"],
+            "targets": [
+                {"target_ip": f"192.168.0.{j}", "port": 80,
+                 "protocol": "icmp" if i % 50 == 0 else random.choice(["tcp", "udp", "http"]),
+                 "tags": ["seed"]}
+                for j in range(2)
+            ]
+        }
+
+
+def explain(cursor, sql, params):
+    cursor.execute("EXPLAIN " + sql, params)
+    # Длинные списки параметров (ANY) обрезаем для читаемости
+    return "\n".join(row[0] if len(row[0]) <= 150 else row[0][:147] + "..." for row in cursor.fetchall())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seed", type=int, default=0, help="количество синтетических атак")
+    args = parser.parse_args()
+
+    db = DatabaseManager()
+    db.initialize_database()
+    db.upgrade_indexes()
+
+    if args.seed:
+        result = db.bulk_import_attacks(seed_attacks(args.seed))
+        print(result.get("message", result.get("error")))
+
+    conn = db.get_connection()
+    failed = 0
+    try:
+        cursor = conn.cursor()
+        cursor.execute("ANALYZE attacks")
+        cursor.execute("ANALYZE targets")
+
+        cursor.execute("SELECT id FROM attacks ORDER BY created_at DESC, id DESC LIMIT 50")
+        page_ids = [row[0] for row in cursor.fetchall()]
+
+        filter_where, filter_params = db._build_filter_clause(danger_levels=["critical"], protocols=["icmp"])
+        protocol_where, protocol_params = db._build_filter_clause(protocols=["icmp"])
+
+        checks = [
+            (
+                "listing page",
+                "SELECT a.* FROM attacks a ORDER BY a.created_at DESC, a.id DESC LIMIT %s",
+                [db.PAGE_SIZE + 1],
+                "idx_attacks_created_at_id"
+            ),
+            (
+                "filter danger + protocol",
+                f"SELECT a.* FROM attacks a{filter_where} ORDER BY a.created_at DESC, a.id DESC LIMIT %s",
+                filter_params + [db.PAGE_SIZE + 1],
+                "idx_attacks_danger_created_at"
+            ),
+            (
+                "protocol EXISTS",
+                f"SELECT a.* FROM attacks a{protocol_where} ORDER BY a.created_at DESC, a.id DESC LIMIT %s",
+                protocol_params + [db.PAGE_SIZE + 1],
+                "idx_targets_attack_id_protocol"
+            ),
+            (
+                "targets hydration",
+                "SELECT * FROM targets WHERE attack_id = ANY(%s) ORDER BY id",
+                [page_ids],
+                "idx_targets_attack_id_protocol"
+            )
+        ]
+
+        for title, sql, params, index in checks:
+            plan = explain(cursor, sql, params)
+            ok = index in plan
+            failed += not ok
+            print(f"\n=== {title}: {'uses' if ok else 'DOES NOT use'} {index}")
+            print(plan)
+
+        conn.rollback()
+    finally:
+        db.release_connection(conn)
+
+    if args.seed:
+        conn = db.get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("DELETE FROM attacks WHERE name = %s", (SEED_NAME,))
+            conn.commit()
+        finally:
+            db.release_connection(conn)
+
+    db.close()
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
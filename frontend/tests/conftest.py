@@ -0,0 +1,104 @@
+import dataclasses
+import os
+
+import pytest
+
+from api.attack_queries import AttackQueries
+from api.db_config import db_config
+from api.db_manager import DatabaseManager
+
+
+@pytest.fixture
+def queries():
+    """SQL и преобразования AttackQueries без подключения к БД (несекционированный режим)"""
+    class Queries(AttackQueries):
+        config = dataclasses.replace(db_config, partitioned=False)
+
+    return Queries()
+
+
+@pytest.fixture
+def make_attack():
+    """Запись атаки для create/import/upsert: make_attack(id, **поля)"""
+    def make(attack_id=None, **fields):
+        record = {
+            "name": f"attack-{attack_id}",
+            "frequency": "high",
+            "danger": "medium",
+            "attack_type": "volumetric",
+            "source_ips": ["10.0.0.1"],
+            "affected_ports": [80],
+            "mitigation_strategies": ["rate limiting"],
+            "targets": [{"target_ip": "192.168.0.1", "port": 80, "protocol": "tcp", "tags": ["web"]}]
+        }
+        if attack_id is not None:
+            record["id"] = attack_id
+        record.update(fields)
+        return record
+
+    return make
+
+
+def scratch_database_name():
+    name = os.getenv("DB_TEST_NAME")
+    if not name:
+        pytest.skip("DB_TEST_NAME is not set (scratch database, its tables are recreated)")
+    return name
+
+
+@pytest.fixture
+def db():
+    """DatabaseManager на тестовой БД (DB_TEST_NAME) без пересоздания таблиц"""
+    config = dataclasses.replace(db_config, database=scratch_database_name(), pool_min_size=0)
+    manager = DatabaseManager(config)
+    try:
+        manager.release_connection(manager.get_connection())
+    except Exception as e:
+        manager.close()
+        pytest.skip(f"Test database is not available: {e}")
+    yield manager
+    manager.close()
+
+
+def reset_db(partitioned: bool) -> DatabaseManager:
+    """DatabaseManager на тестовой БД (DB_TEST_NAME) с заново созданными таблицами"""
+    config = dataclasses.replace(db_config, database=scratch_database_name(), partitioned=partitioned,
+                                 pool_min_size=0)
+    db = DatabaseManager(config)
+    result = db.reset_database()
+    if not result["success"]:
+        db.close()
+        pytest.skip(f"Test database is not available: {result['error']}")
+    return db
+
+
+@pytest.fixture
+def fresh_db():
+    """DatabaseManager на тестовой БД (DB_TEST_NAME) с пустыми несекционированными таблицами"""
+    db = reset_db(partitioned=False)
+    yield db
+    db.close()
+
+
+@pytest.fixture
+def partitioned_db():
+    """DatabaseManager на отдельной тестовой БД (DB_TEST_NAME) с секционированными таблицами.
+
+    Таблицы в этой БД пересоздаются, поэтому тесты с БД запускаются только при
+    явно заданной DB_TEST_NAME; остальные параметры подключения - из DB_*.
+    """
+    db = reset_db(partitioned=True)
+    yield db
+
+    # Архивы отсоединенных секций не удаляются вместе с таблицами
+    conn = db.get_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT relname FROM pg_class WHERE relname LIKE %s AND relkind = 'r'",
+                       (f"%{db.ARCHIVE_SUFFIX}%",))
+        for archive, in cursor.fetchall():
+            cursor.execute(f"DROP TABLE {archive}")
+        conn.commit()
+    finally:
+        db.release_connection(conn)
+    db.close()
@@ -0,0 +1,65 @@
+import time
+
+import pytest
+
+from api import adhoc_query
+from api.adhoc_query import QueryCancelled, StreamingQuery
+
+SERIES_SQL = "SELECT g FROM generate_series(1, %s) g"
+
+
+def free_slots():
+    return adhoc_query._slots._value
+
+
+def test_stream_reads_in_batches_and_closes_at_end(db):
+    slots = free_slots()
+    query = StreamingQuery(db, SERIES_SQL, [2500], batch_size=1000)
+
+    batches = []
+    assert query.fetch(1500, batches.append) == 1500
+    assert [len(rows) for rows in batches] == [1000, 500]
+    assert query.columns == ["g"] and query.is_open and free_slots() == slots - 1
+
+    rest = [row for rows in query.iter_batches() for row in rows]
+    assert rest[0] == (1501,) and len(rest) == 1000
+    assert query.exhausted and not query.is_open and free_slots() == slots
+
+
+def test_idle_stream_is_closed_by_server(db, monkeypatch):
+    monkeypatch.setattr(StreamingQuery, "IDLE_GRACE", 0)
+    slots = free_slots()
+    query = StreamingQuery(db, SERIES_SQL, [1000], batch_size=100, idle_timeout=0.3)
+    query.fetch(100, lambda rows: None)
+
+    time.sleep(1.0)
+    with pytest.raises(QueryCancelled) as error:
+        query.fetch(100, lambda rows: None)
+    assert error.value.timed_out
+    assert not query.is_open and free_slots() == slots
+
+
+@pytest.mark.parametrize("sql", [
+    "SELECT g FROM t ORDER BY g",
+    "SELECT g FROM t ORDER BY g;",
+    "SELECT g FROM t ORDER BY g ; \n;\n",
+])
+def test_count_query_strips_trailing_semicolons(sql):
+    assert StreamingQuery.count_query(sql) == "SELECT COUNT(*) FROM (SELECT g FROM t ORDER BY g\n) AS adhoc_rows"
+
+
+def test_count_query_survives_trailing_line_comment():
+    assert StreamingQuery.count_query("SELECT 1 -- last").endswith("-- last\n) AS adhoc_rows")
+
+
+def test_count_of_query_with_semicolon(db):
+    query = StreamingQuery(db, "SELECT g FROM generate_series(1, %s) g ORDER BY g DESC;", [1200],
+                           count_sql="SELECT g FROM generate_series(1, %s) g")
+    query.fetch(100, lambda rows: None)
+    assert query.count() == 1200
+    query.close()
+
+    query = StreamingQuery(db, "SELECT g FROM generate_series(1, 1200) g ORDER BY g;")
+    query.fetch(100, lambda rows: None)
+    assert query.count() == 1200
+    query.close()
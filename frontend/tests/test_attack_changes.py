@@ -0,0 +1,81 @@
+from datetime import timedelta
+
+import pytest
+
+
+@pytest.fixture
+def synced_db(fresh_db, make_attack):
+    """Три атаки и отметка полной синхронизации после них"""
+    db = fresh_db
+    # Без запаса на незафиксированные транзакции: дельта содержит только новые изменения
+    db.SYNC_OVERLAP = 0
+    assert db.bulk_import_attacks([make_attack(attack_id) for attack_id in ("a1", "a2", "a3")])["success"]
+
+    full = db.get_attack_changes()
+    assert full["full"] and sorted(attack["id"] for attack in full["changed"]) == ["a1", "a2", "a3"]
+    db.watermark = full["watermark"]
+    return db
+
+
+def test_delta_without_changes_is_empty(synced_db):
+    delta = synced_db.get_attack_changes(synced_db.watermark)
+    assert (delta["full"], delta["changed"], delta["deleted_ids"]) == (False, [], [])
+
+
+def test_deleted_attacks_come_as_tombstones(synced_db):
+    db = synced_db
+    assert db.delete_attack("a1")["success"]
+    assert db.delete_attacks(["a2", "missing"])["data"]["deleted"] == ["a2"]
+
+    delta = db.get_attack_changes(db.watermark)
+
+    assert not delta["full"]
+    assert delta["changed"] == []
+    assert sorted(delta["deleted_ids"]) == ["a1", "a2"]
+
+    # Следующая отметка не возвращает те же удаления повторно
+    assert db.get_attack_changes(delta["watermark"])["deleted_ids"] == []
+
+
+def test_changed_attack_comes_with_targets(synced_db):
+    db = synced_db
+    assert db.update_attacks(["a3"], {"danger": "critical"})["success"]
+
+    delta = db.get_attack_changes(db.watermark)
+
+    assert [(attack["id"], attack["danger"]) for attack in delta["changed"]] == [("a3", "critical")]
+    assert [target["target_ip"] for target in delta["changed"][0]["targets"]] == ["192.168.0.1"]
+    assert delta["deleted_ids"] == []
+
+
+def test_recreated_attack_is_changed_not_deleted(synced_db, make_attack):
+    db = synced_db
+    assert db.delete_attack("a1")["success"]
+    assert db.upsert_attacks([make_attack("a1", name="again")])["data"]["inserted"] == 1
+
+    delta = db.get_attack_changes(db.watermark)
+
+    assert [attack["name"] for attack in delta["changed"]] == ["again"]
+    assert delta["deleted_ids"] == []
+
+
+def test_watermark_older_than_tombstone_retention_forces_full_sync(synced_db):
+    db = synced_db
+    updated_at, attack_id, deleted_at, deleted_id, table_oid = db._decode_watermark(db.watermark)
+    expired = deleted_at - timedelta(days=db.TOMBSTONE_RETENTION_DAYS + 1)
+    watermark = db._encode_watermark(updated_at, attack_id, expired, deleted_id, table_oid)
+    assert db.delete_attack("a1")["success"]
+
+    delta = db.get_attack_changes(watermark)
+
+    assert delta["full"]
+    assert sorted(attack["id"] for attack in delta["changed"]) == ["a2", "a3"]
+
+
+def test_watermark_of_recreated_table_forces_full_sync(synced_db):
+    db = synced_db
+    assert db.reset_database()["success"]
+
+    delta = db.get_attack_changes(db.watermark)
+
+    assert (delta["full"], delta["changed"]) == (True, [])
@@ -0,0 +1,68 @@
+import pytest
+
+
+def count(db, sql, params=None):
+    conn = db.get_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(sql, params)
+        return cursor.fetchone()[0]
+    finally:
+        db.release_connection(conn)
+
+
+@pytest.fixture
+def bulk_db(fresh_db, make_attack):
+    """Четыре атаки по две цели"""
+    targets = [{"target_ip": "192.168.0.1", "port": 80}, {"target_ip": "192.168.0.2", "port": 443}]
+    result = fresh_db.bulk_import_attacks([make_attack(f"b{i}", targets=targets) for i in range(4)])
+    assert result["data"]["imported"] == 4
+    return fresh_db
+
+
+def test_delete_attacks_removes_targets_and_reports_missing(bulk_db):
+    result = bulk_db.delete_attacks(["b0", "b2", "missing", "b0"])
+
+    assert result["success"]
+    assert sorted(result["data"]["deleted"]) == ["b0", "b2"]
+    assert result["data"]["missing"] == ["missing"]
+    assert result["message"] == "Deleted 2 of 3 attacks"
+    assert count(bulk_db, "SELECT count(*) FROM attacks") == 2
+    assert count(bulk_db, "SELECT count(*) FROM targets WHERE attack_id = ANY(%s)", (["b0", "b2"],)) == 0
+    assert count(bulk_db, "SELECT count(*) FROM targets") == 4
+
+
+def test_delete_attacks_with_no_ids(bulk_db):
+    result = bulk_db.delete_attacks([])
+    assert result["success"] and result["data"] == {"deleted": [], "missing": []}
+    assert count(bulk_db, "SELECT count(*) FROM attacks") == 4
+
+
+def test_update_attacks_returns_new_versions(bulk_db):
+    before = bulk_db.get_attack("b1")["updated_at"]
+
+    result = bulk_db.update_attacks(["b1", "b3", "missing"], {"danger": "critical", "source_ips": ["10.9.9.9"]})
+
+    assert result["success"]
+    updated = {attack["id"]: attack for attack in result["data"]["updated"]}
+    assert sorted(updated) == ["b1", "b3"]
+    assert result["data"]["missing"] == ["missing"]
+    for attack in updated.values():
+        assert (attack["danger"], attack["source_ips"]) == ("critical", ["10.9.9.9"])
+        # Цели не меняются и возвращаются вместе с атакой
+        assert len(attack["targets"]) == 2
+    assert updated["b1"]["updated_at"] > before
+    assert bulk_db.get_attack("b0")["danger"] == "medium"
+
+
+@pytest.mark.parametrize("fields, error", [({"id": "x"}, "cannot be updated in bulk: id"), ({}, "No fields")])
+def test_update_attacks_rejects_fields(bulk_db, fields, error):
+    result = bulk_db.update_attacks(["b0"], fields)
+    assert not result["success"] and error in result["error"]
+
+
+def test_failed_update_changes_nothing(bulk_db):
+    result = bulk_db.update_attacks(["b0", "b1"], {"name": "x" * 300})
+
+    assert not result["success"]
+    assert count(bulk_db, "SELECT count(*) FROM attacks WHERE name LIKE 'x%%'") == 0
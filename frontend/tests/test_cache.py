@@ -0,0 +1,120 @@
+import pytest
+
+from api import cache as cache_module
+from api.cache import AttackCache, estimate_size, normalize_filters
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache_module.time, "monotonic", clock)
+    return clock
+
+
+def attack(attack_id, danger="high", protocol="tcp"):
+    return {"id": attack_id, "frequency": "low", "danger": danger, "attack_type": "volumetric",
+            "source_ips": [], "affected_ports": [80], "targets": [{"protocol": protocol, "tags": []}]}
+
+
+def test_hits_misses_and_size_accounting():
+    cache = AttackCache()
+    value = attack("a")
+
+    assert cache.get(("attack", "a")) == (False, None)
+    cache.put(("attack", "a"), value, members=("a",))
+    assert cache.get(("attack", "a")) == (True, value)
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
+    assert stats["bytes"] == estimate_size(value)
+
+    # Повторная запись по ключу не удваивает объем
+    cache.put(("attack", "a"), value, members=("a",))
+    assert cache.stats()["bytes"] == estimate_size(value)
+
+    cache.clear()
+    assert (cache.stats()["entries"], cache.stats()["bytes"]) == (0, 0)
+
+
+def test_least_recently_used_entry_is_evicted():
+    size = estimate_size(attack("a"))
+    cache = AttackCache(max_bytes=size * 2)
+    for attack_id in ("a", "b"):
+        cache.put(("attack", attack_id), attack(attack_id))
+
+    # "a" прочитана последней - вытесняется "b"
+    cache.get(("attack", "a"))
+    cache.put(("attack", "c"), attack("c"))
+
+    assert cache.get(("attack", "b"))[0] is False
+    assert cache.get(("attack", "a"))[0] and cache.get(("attack", "c"))[0]
+    stats = cache.stats()
+    assert stats["evictions"] == 1 and stats["bytes"] <= stats["max_bytes"]
+
+
+def test_value_larger_than_cache_is_not_stored():
+    cache = AttackCache(max_bytes=100)
+    cache.put(("attacks", ()), [attack(str(i)) for i in range(10)])
+    assert cache.stats()["entries"] == 0
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = AttackCache(ttl=30)
+    cache.put(("attack", "a"), attack("a"))
+    cache.put(("attack", "b"), attack("b"), ttl=100)
+
+    clock.now += 29
+    assert cache.get(("attack", "a"))[0]
+
+    clock.now += 1
+    assert cache.peek(("attack", "a")) is None
+    assert cache.get(("attack", "a")) == (False, None)
+    assert cache.get(("attack", "b"))[0]
+
+    stats = cache.stats()
+    assert (stats["expirations"], stats["entries"]) == (1, 1)
+    assert stats["bytes"] == estimate_size(attack("b"))
+
+
+def test_peek_does_not_count_or_refresh():
+    size = estimate_size(attack("a"))
+    cache = AttackCache(max_bytes=size * 2)
+    cache.put(("attack", "a"), attack("a"))
+    cache.put(("attack", "b"), attack("b"))
+
+    assert cache.peek(("attack", "a"))["id"] == "a"
+    cache.put(("attack", "c"), attack("c"))
+
+    assert cache.peek(("attack", "a")) is None
+    assert (cache.stats()["hits"], cache.stats()["misses"]) == (0, 0)
+
+
+def test_invalidation_by_members_and_filters():
+    cache = AttackCache()
+    high = normalize_filters({"danger_levels": ["high"]})
+    udp = normalize_filters({"protocols": ["udp"]})
+    cache.put(("attack", "a"), attack("a"), members=("a",))
+    cache.put(("attack", "b"), attack("b"), members=("b",))
+    cache.put(("attacks", high), [attack("b")], members=("b",), filters=high)
+    cache.put(("attacks", udp), [], members=(), filters=udp)
+
+    # Новая атака "c" попадает под фильтр high, а "a" меняется
+    cache.invalidate_attacks(["a", "c"], [attack("a", danger="low"), attack("c")])
+
+    assert cache.peek(("attack", "a")) is None
+    assert cache.peek(("attacks", high)) is None
+    assert cache.peek(("attack", "b")) is not None
+    assert cache.peek(("attacks", udp)) is not None
+    assert cache.stats()["invalidations"] == 2
+
+    cache.invalidate_lists()
+    assert cache.peek(("attacks", udp)) is None and cache.peek(("attack", "b")) is not None
+    assert cache.stats()["bytes"] == estimate_size(attack("b"))
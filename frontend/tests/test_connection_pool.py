@@ -0,0 +1,250 @@
+import threading
+
+import psycopg2
+import psycopg2.extensions
+import pytest
+
+from api import connection_pool as pool_module
+from api.connection_pool import ConnectionPool, PoolError, PoolTimeoutError
+
+IDLE = psycopg2.extensions.TRANSACTION_STATUS_IDLE
+INTRANS = psycopg2.extensions.TRANSACTION_STATUS_INTRANS
+UNKNOWN = psycopg2.extensions.TRANSACTION_STATUS_UNKNOWN
+
+
+class StubCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, sql, params=None):
+        if self.conn.dead:
+            raise psycopg2.OperationalError("server closed the connection unexpectedly")
+        self.conn.queries.append(sql)
+
+    def close(self):
+        pass
+
+
+class StubConnection:
+    """Соединение psycopg2 в объеме, который использует ConnectionPool"""
+
+    def __init__(self, number):
+        self.number = number
+        self.closed = 0
+        self.status = IDLE
+        self.autocommit = False
+        self.rollbacks = 0
+        self.queries = []
+        # Сервер разорвал соединение, а клиент еще не заметил
+        self.dead = False
+
+    def get_transaction_status(self):
+        return self.status
+
+    def cursor(self):
+        return StubCursor(self)
+
+    def rollback(self):
+        if self.dead:
+            raise psycopg2.InterfaceError("connection already closed")
+        self.rollbacks += 1
+        self.status = IDLE
+
+    def close(self):
+        self.closed = 1
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(pool_module.time, "monotonic", clock)
+    return clock
+
+
+@pytest.fixture
+def connections(monkeypatch):
+    """Подмена psycopg2.connect: открытые соединения по порядку"""
+    opened = []
+
+    def connect(**kwargs):
+        assert kwargs == {"dbname": "stub"}
+        opened.append(StubConnection(len(opened)))
+        return opened[-1]
+
+    monkeypatch.setattr(pool_module.psycopg2, "connect", connect)
+    return opened
+
+
+def make_pool(**kwargs):
+    return ConnectionPool({"dbname": "stub"}, **kwargs)
+
+
+@pytest.mark.parametrize("min_size, max_size", [(-1, 5), (0, 0), (6, 5)])
+def test_invalid_size_is_rejected(min_size, max_size):
+    with pytest.raises(ValueError, match="Invalid pool size"):
+        make_pool(min_size=min_size, max_size=max_size)
+
+
+def test_checkout_reuses_returned_connection(connections):
+    pool = make_pool(min_size=1, max_size=3)
+
+    first = pool.getconn()
+    second = pool.getconn()
+    assert (first.number, second.number) == (0, 1)
+
+    pool.putconn(first)
+    assert pool.getconn() is first
+
+    # Соединение из предзаполнения тоже выдается как простаивающее
+    stats = pool.stats()
+    assert (stats["created"], stats["checkouts"], stats["reused"]) == (2, 3, 2)
+    assert (stats["size"], stats["in_use"], stats["idle"]) == (2, 2, 0)
+
+
+def test_unavailable_database_does_not_break_prefill(monkeypatch, connections):
+    def refuse(**kwargs):
+        raise psycopg2.OperationalError("could not connect to server")
+
+    monkeypatch.setattr(pool_module.psycopg2, "connect", refuse)
+    pool = make_pool(min_size=2, max_size=2)
+    with pytest.raises(psycopg2.OperationalError):
+        pool.getconn()
+    assert pool.stats()["size"] == 0
+
+    monkeypatch.undo()
+    monkeypatch.setattr(pool_module.psycopg2, "connect", lambda **kwargs: StubConnection(0))
+    assert pool.getconn().number == 0
+
+
+def test_exhausted_pool_times_out(clock, connections):
+    pool = make_pool(min_size=0, max_size=1, timeout=0)
+    conn = pool.getconn()
+
+    with pytest.raises(PoolTimeoutError):
+        pool.getconn()
+    assert pool.stats()["timeouts"] == 1
+
+    pool.putconn(conn)
+    assert pool.getconn() is conn
+
+
+def test_waiter_gets_returned_connection(connections):
+    pool = make_pool(min_size=0, max_size=1, timeout=10)
+    conn = pool.getconn()
+    received = []
+
+    waiter = threading.Thread(target=lambda: received.append(pool.getconn()))
+    waiter.start()
+    while pool.stats()["waiting"] == 0:
+        waiter.join(0.01)
+    pool.putconn(conn)
+    waiter.join(5)
+
+    assert received == [conn]
+    assert pool.stats()["waiting"] == 0 and len(connections) == 1
+
+
+def test_recently_used_connection_is_not_validated(clock, connections):
+    pool = make_pool(min_size=1, max_size=1, validation_interval=30)
+    conn = pool.getconn()
+    pool.putconn(conn)
+
+    clock.now += 29
+    assert pool.getconn() is conn
+    assert conn.queries == []
+
+
+def test_idle_connection_is_validated_and_replaced(clock, connections):
+    pool = make_pool(min_size=1, max_size=1, validation_interval=30)
+    conn = pool.getconn()
+    pool.putconn(conn)
+
+    clock.now += 30
+    assert pool.getconn() is conn
+    assert conn.queries == ["SELECT 1"]
+    pool.putconn(conn)
+
+    # Сервер закрыл соединение, пока оно простаивало
+    conn.dead = True
+    clock.now += 60
+    replacement = pool.getconn()
+
+    assert replacement is connections[1] and conn.closed
+    stats = pool.stats()
+    assert (stats["discarded"], stats["size"]) == (1, 1)
+
+
+def test_closed_connection_is_replaced_without_query(connections):
+    pool = make_pool(min_size=2, max_size=2)
+    first = pool.getconn()
+    second = pool.getconn()
+    pool.putconn(first)
+    pool.putconn(second)
+    second.closed = 2
+    first.status = UNKNOWN
+
+    assert pool.getconn() is connections[2]
+    assert pool.getconn() is connections[3]
+    assert pool.stats()["discarded"] == 2
+
+
+def test_putconn_rolls_back_open_transaction(connections):
+    pool = make_pool(min_size=0, max_size=1)
+    conn = pool.getconn()
+    conn.status = INTRANS
+    conn.autocommit = True
+
+    pool.putconn(conn)
+
+    assert (conn.rollbacks, conn.status, conn.autocommit) == (1, IDLE, False)
+    assert pool.getconn() is conn
+
+
+def test_putconn_drops_broken_or_discarded_connection(connections):
+    pool = make_pool(min_size=0, max_size=2)
+    broken = pool.getconn()
+    discarded = pool.getconn()
+
+    broken.status, broken.dead = INTRANS, True
+    pool.putconn(broken)
+    pool.putconn(discarded, discard=True)
+
+    assert broken.closed and discarded.closed
+    stats = pool.stats()
+    assert (stats["discarded"], stats["size"], stats["idle"]) == (2, 0, 0)
+
+    with pytest.raises(PoolError, match="does not belong"):
+        pool.putconn(broken)
+
+
+def test_idle_connections_above_min_size_expire(clock, connections):
+    pool = make_pool(min_size=1, max_size=3, max_idle_time=300)
+    conns = [pool.getconn() for _ in range(3)]
+    pool.putconn(conns[0])
+    pool.putconn(conns[1])
+
+    clock.now += 301
+    pool.putconn(conns[2])
+
+    # Закрывается самое давнее, пока пул больше min_size
+    assert conns[0].closed and conns[1].closed and not conns[2].closed
+    assert pool.stats()["size"] == 1
+
+
+def test_closed_pool_refuses_checkout(connections):
+    pool = make_pool(min_size=1, max_size=2)
+    conn = pool.getconn()
+    pool.closeall()
+
+    with pytest.raises(PoolError, match="closed"):
+        pool.getconn()
+    pool.putconn(conn)
+    assert conn.closed and pool.stats()["size"] == 0
@@ -0,0 +1,45 @@
+def index_state(db):
+    """Индексы управляемого набора: имя -> валиден ли"""
+    conn = db.get_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT c.relname, i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+            WHERE c.relname = ANY(%s)
+        """, ([name for name, _, _ in db.INDEXES],))
+        return dict(cursor.fetchall())
+    finally:
+        db.release_connection(conn)
+
+
+def execute(db, *statements):
+    conn = db.get_connection()
+    try:
+        cursor = conn.cursor()
+        for sql in statements:
+            cursor.execute(sql)
+        conn.commit()
+    finally:
+        db.release_connection(conn)
+
+
+def test_new_tables_get_indexes_inline(fresh_db):
+    result = fresh_db.initialize_database()
+
+    assert result["success"], result.get("error")
+    assert result["data"] == {"deferred_indexes": [], "indexes": None}
+    assert index_state(fresh_db) == {name: True for name, _, _ in fresh_db.INDEXES}
+
+
+def test_missing_indexes_of_existing_tables_are_built_after_commit(fresh_db):
+    missing = ["idx_attacks_danger_created_at", "idx_attacks_source_ips_gin"]
+    execute(fresh_db, *[f"DROP INDEX {name}" for name in missing])
+
+    result = fresh_db.initialize_database()
+
+    assert result["success"], result.get("error")
+    assert result["data"]["deferred_indexes"] == missing
+    assert result["data"]["indexes"]["data"]["created"] == missing
+    assert "2 created" in result["message"]
+    assert index_state(fresh_db) == {name: True for name, _, _ in fresh_db.INDEXES}
+
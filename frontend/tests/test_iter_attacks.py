@@ -0,0 +1,55 @@
+import psycopg2
+import pytest
+
+
+@pytest.fixture
+def stream_db(fresh_db, make_attack):
+    """Пять атак, s0 - самая старая, нечетные - critical"""
+    db = fresh_db
+    attacks = [make_attack(f"s{i}", created_at=f"2025-09-0{i + 1}T12:00:00",
+                           danger="critical" if i % 2 else "low") for i in range(5)]
+    assert db.bulk_import_attacks(attacks)["data"]["imported"] == 5
+    return db
+
+
+def in_use(db):
+    return db.get_pool_stats()["in_use"]
+
+
+def test_batches_in_list_order_and_release(stream_db):
+    batches = stream_db.iter_attacks(batch_size=2)
+    first = next(batches)
+    assert [attack["id"] for attack in first] == ["s4", "s3"]
+    assert [target["target_ip"] for target in first[0]["targets"]] == ["192.168.0.1"]
+    assert in_use(stream_db) == 1
+
+    rest = [attack["id"] for batch in batches for attack in batch]
+
+    assert rest == ["s2", "s1", "s0"]
+    assert in_use(stream_db) == 0
+
+
+def test_closed_stream_releases_connection(stream_db):
+    batches = stream_db.iter_attacks(batch_size=2)
+    next(batches)
+    batches.close()
+    assert in_use(stream_db) == 0
+
+    # Соединение вернулось без открытого серверного курсора: тот же курсор открывается снова
+    filtered = [attack["id"] for batch in stream_db.iter_attacks(danger_levels=["critical"]) for attack in batch]
+    assert filtered == ["s3", "s1"]
+    assert in_use(stream_db) == 0
+
+
+def test_failed_query_releases_connection(stream_db):
+    with pytest.raises(psycopg2.DataError):
+        next(stream_db.iter_attacks(created_from="not a date"))
+    assert in_use(stream_db) == 0
+    assert next(stream_db.iter_attacks(batch_size=1))[0]["id"] == "s4"
+
+
+def test_unstarted_stream_holds_no_connection(stream_db):
+    batches = stream_db.iter_attacks()
+    assert in_use(stream_db) == 0
+    batches.close()
+    assert in_use(stream_db) == 0
@@ -0,0 +1,75 @@
+import string
+from datetime import datetime
+
+import pytest
+
+CREATED = datetime(2025, 9, 14, 12, 30, 15, 123456)
+
+
+def test_cursor_round_trip(queries):
+    cursor = queries._encode_page_cursor("next", {"id": "abc", "created_at": CREATED})
+
+    # Курсор передается в URL и JSON как есть
+    assert set(cursor) <= set(string.ascii_letters + string.digits + "-_=")
+    assert queries._decode_page_cursor(cursor) == ("next", CREATED.isoformat(), "abc")
+
+
+def test_cursor_accepts_serialized_created_at(queries):
+    # Атаки из снимка хранят created_at строкой
+    cursor = queries._encode_page_cursor("prev", {"id": "abc", "created_at": CREATED.isoformat()})
+    assert queries._decode_page_cursor(cursor) == ("prev", CREATED.isoformat(), "abc")
+
+
+@pytest.mark.parametrize("cursor", ["not base64!", "W10=", "e30=", "курсор"])
+def test_invalid_cursor_is_rejected(queries, cursor):
+    with pytest.raises(ValueError, match="Invalid page cursor"):
+        queries._decode_page_cursor(cursor)
+
+
+def test_cursor_direction_is_checked(queries):
+    cursor = queries._encode_page_cursor("sideways", {"id": "abc", "created_at": CREATED})
+    with pytest.raises(ValueError, match="direction"):
+        queries._decode_page_cursor(cursor)
+
+
+@pytest.mark.parametrize("direction, operator, order", [("next", "<", "DESC"), ("prev", ">", "ASC")])
+def test_page_query_continues_after_cursor(queries, direction, operator, order):
+    cursor = queries._encode_page_cursor(direction, {"id": "abc", "created_at": CREATED})
+    sql, params, read_direction = queries._page_query(50, cursor, danger_levels=["high"])
+
+    assert read_direction == direction
+    assert f"(a.created_at, a.id) {operator} (%s, %s)" in sql
+    assert sql.endswith(f"ORDER BY a.created_at {order}, a.id {order} LIMIT 51")
+    assert params[-2:] == [CREATED.isoformat(), "abc"]
+
+
+def test_first_page_has_no_keyset(queries):
+    sql, params, direction = queries._page_query(20, None)
+    assert direction == "next" and params == [] and "(a.created_at, a.id)" not in sql
+
+
+def page_attacks(*ids):
+    return [{"id": attack_id, "created_at": CREATED} for attack_id in ids]
+
+
+def test_next_page_result(queries):
+    rows, has_more = queries._page_rows(["c", "b", "a"], 2, "next")
+    assert (rows, has_more) == (["c", "b"], True)
+
+    first = queries._page_result(page_attacks("c", "b"), "next", has_more, None)
+    assert first["prev_cursor"] is None
+    assert queries._decode_page_cursor(first["next_cursor"])[::2] == ("next", "b")
+
+    last = queries._page_result(page_attacks("a"), "next", False, first["next_cursor"])
+    assert last["next_cursor"] is None
+    assert queries._decode_page_cursor(last["prev_cursor"])[::2] == ("prev", "a")
+
+
+def test_previous_page_result(queries):
+    # Назад читается по возрастанию, строки разворачиваются в порядок отображения
+    rows, has_more = queries._page_rows(["b", "c"], 2, "prev")
+    assert (rows, has_more) == (["c", "b"], False)
+
+    result = queries._page_result(page_attacks("c", "b"), "prev", has_more, "cursor")
+    assert result["prev_cursor"] is None
+    assert queries._decode_page_cursor(result["next_cursor"])[::2] == ("next", "b")
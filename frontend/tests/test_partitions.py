@@ -0,0 +1,98 @@
+from datetime import datetime
+
+import pytest
+
+
+def make_attack(index, created_at, targets=2):
+    return {
+        "name": f"expire-{index}",
+        "frequency": "high",
+        "danger": "medium",
+        "attack_type": "volumetric",
+        "source_ips": [f"10.0.0.{index}"],
+        "affected_ports": [80],
+        "mitigation_strategies": ["rate limiting"],
+        "created_at": created_at.isoformat(),
+        "targets": [
+            {"target_ip": f"192.168.0.{j}", "port": 80 + j, "protocol": "tcp", "tags": ["expire"]}
+            for j in range(targets)
+        ]
+    }
+
+
+def table_rows(db, table):
+    conn = db.get_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT to_regclass(%s)", (table,))
+        if cursor.fetchone()[0] is None:
+            return None
+        cursor.execute(f"SELECT count(*) FROM {table}")
+        return cursor.fetchone()[0]
+    finally:
+        db.release_connection(conn)
+
+
+def foreign_keys(db, table):
+    conn = db.get_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT count(*) FROM pg_constraint WHERE conrelid = %s::regclass AND contype = 'f'",
+                       (table,))
+        return cursor.fetchone()[0]
+    finally:
+        db.release_connection(conn)
+
+
+@pytest.fixture
+def expired_month(partitioned_db):
+    """Атаки с целями в месяце 8 месяцев назад (истекает при retain_months=6) и в текущем"""
+    db = partitioned_db
+    now = datetime.now()
+    old_month = db._month_start(now.date(), -8)
+    old = datetime.combine(old_month.replace(day=10), now.time())
+
+    result = db.bulk_import_attacks([make_attack(i, old) for i in range(3)] +
+                                    [make_attack(i, now) for i in range(3, 5)])
+    assert result["success"] and result["data"]["imported"] == 5
+    assert table_rows(db, db._partition_name("targets", old_month)) == 6
+    return old_month
+
+
+@pytest.mark.parametrize("drop", [False, True])
+def test_expire_month_with_targets(partitioned_db, expired_month, drop):
+    db = partitioned_db
+    attacks_partition = db._partition_name("attacks", expired_month)
+    targets_partition = db._partition_name("targets", expired_month)
+
+    result = db.expire_partitions(retain_months=6, drop=drop)
+
+    assert result["success"], result.get("error")
+    assert result["data"]["months"] == [f"{expired_month:%Y-%m}"]
+    assert result["data"]["attacks_removed"] == 3
+    assert db.get_attack_stats()["total"] == 2
+    names = {partition["name"] for partition in db.list_partitions()}
+    assert attacks_partition not in names and targets_partition not in names
+    # Удаленные секцией атаки видны клиентам как удаленные
+    assert table_rows(db, "attack_tombstones") == 3
+
+    archives = (attacks_partition + db.ARCHIVE_SUFFIX, targets_partition + db.ARCHIVE_SUFFIX)
+    if drop:
+        assert all(table_rows(db, archive) is None for archive in archives)
+    else:
+        assert [table_rows(db, archive) for archive in archives] == [3, 6]
+        assert foreign_keys(db, archives[1]) == 0
+
+
+def test_expired_month_can_be_imported_again(partitioned_db, expired_month):
+    db = partitioned_db
+    assert db.expire_partitions(retain_months=6)["success"]
+
+    # Архив не занимает имя секции: месяц снова получает свою секцию, а не DEFAULT
+    old = datetime.combine(expired_month.replace(day=12), datetime.min.time())
+    assert db.bulk_import_attacks([make_attack(10, old)])["data"]["imported"] == 1
+    assert table_rows(db, db._partition_name("attacks", expired_month)) == 1
+    assert table_rows(db, "attacks_default") == 0
+
+    assert db.expire_partitions(retain_months=6)["success"]
+    assert table_rows(db, db._partition_name("attacks", expired_month) + db.ARCHIVE_SUFFIX + "_2") == 1
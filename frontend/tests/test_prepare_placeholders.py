@@ -0,0 +1,64 @@
+import dataclasses
+import re
+from datetime import datetime
+
+import pytest
+
+from api.attack_queries import AttackQueries
+from api.db_config import db_config
+from api.prepared_statements import execute_statement, prepare_statement
+
+
+def test_placeholders_are_numbered():
+    assert prepare_statement("s", "SELECT * FROM t WHERE a = %s AND b = ANY(%s)") == \
+        "PREPARE s AS SELECT * FROM t WHERE a = $1 AND b = ANY($2)"
+
+
+def test_escaped_percent_is_not_a_placeholder():
+    assert prepare_statement("s", "SELECT %s WHERE name LIKE 'a%%s' AND 10 %% 3 = %s") == \
+        "PREPARE s AS SELECT $1 WHERE name LIKE 'a%s' AND 10 % 3 = $2"
+
+
+def test_placeholder_in_literal_matches_psycopg2():
+    # psycopg2 подставляет параметр и внутри кавычек - подготовленный запрос ведет себя так же
+    assert prepare_statement("s", "SELECT '%s' -- %s\n") == "PREPARE s AS SELECT '$1' -- $2\n"
+
+
+@pytest.mark.parametrize("sql", ["SELECT %(name)s", "SELECT 10 % 3", "SELECT 1 %"])
+def test_unsupported_placeholders_are_rejected(sql):
+    with pytest.raises(ValueError):
+        prepare_statement("s", sql)
+
+
+def test_execute_statement():
+    assert execute_statement("s", 0) == "EXECUTE s"
+    assert execute_statement("s", 2) == "EXECUTE s (%s, %s)"
+
+
+def parameter_numbers(sql):
+    return sorted({int(number) for number in re.findall(r"\$(\d+)", prepare_statement("s", sql))})
+
+
+@pytest.mark.parametrize("partitioned", [False, True])
+def test_hot_queries_can_be_prepared(partitioned):
+    class Queries(AttackQueries):
+        config = dataclasses.replace(db_config, partitioned=partitioned)
+
+    queries = Queries()
+    now = datetime.now()
+    where, where_params = queries._build_filter_clause(
+        ["high"], ["critical"], ["volumetric"], ["tcp"], [80], ["10.0.0.1"], ["tag"], now, now)
+    page_sql, page_params, _ = queries._page_query(
+        50, None, ["high"], ["critical"], ["volumetric"], ["tcp"], [80], ["10.0.0.1"], ["tag"], now, now)
+    targets_sql, targets_params = queries._targets_query([{"id": "a", "created_at": now}])
+
+    hot = [
+        (queries.SELECT_ATTACK_SQL, 1), (queries.SELECT_ATTACKS_BY_IDS_SQL, 1),
+        (queries.SELECT_ALL_ATTACKS_SQL, 0), (queries.SELECT_CHANGED_ATTACKS_SQL, 2),
+        (queries.SELECT_TOMBSTONES_SQL, 2), (queries.STATS_SQL, 0), (queries.ROLLUP_TYPE_DANGER_SQL, 0),
+        (queries.ROLLUP_PROTOCOL_SQL, 0), (queries.ROLLUP_DAY_SQL, 1),
+        (f"{queries.SELECT_ATTACKS}{where}", len(where_params)),
+        (page_sql, len(page_params)), (targets_sql, len(targets_params))
+    ]
+    for sql, param_count in hot:
+        assert parameter_numbers(sql) == list(range(1, param_count + 1)), sql
@@ -0,0 +1,69 @@
+import psycopg2.errors
+import pytest
+
+
+def prepared_names(cursor):
+    cursor.execute("SELECT name FROM pg_prepared_statements WHERE name LIKE 'dm_stmt_%'")
+    return {name for name, in cursor.fetchall()}
+
+
+@pytest.fixture
+def connection(db):
+    conn = db.get_connection()
+    yield conn
+    db.release_connection(conn, discard=True)
+
+
+def test_failed_execute_keeps_prepared_statement(db, connection):
+    cursor = connection.cursor()
+    sql = "SELECT 10 / %s"
+    db._execute_prepared(cursor, sql, [2])
+    prepared = prepared_names(cursor)
+
+    for _ in range(3):
+        with pytest.raises(psycopg2.errors.DivisionByZero):
+            db._execute_prepared(cursor, sql, [0])
+        connection.rollback()
+
+    assert prepared_names(cursor) == prepared
+    db._execute_prepared(cursor, sql, [5])
+    assert cursor.fetchone() == (2,)
+
+
+def test_stale_statement_is_deallocated(db, connection):
+    cursor = connection.cursor()
+    cursor.execute("CREATE TEMP TABLE prepared_probe (a INTEGER)")
+    cursor.execute("INSERT INTO prepared_probe VALUES (1)")
+    connection.commit()
+
+    sql = "SELECT * FROM prepared_probe WHERE a = %s"
+    db._execute_prepared(cursor, sql, [1])
+    stale = connection.prepared_name(sql)
+
+    # Изменение схемы: старый план возвращает другие столбцы
+    cursor.execute("ALTER TABLE prepared_probe ADD COLUMN b INTEGER")
+    connection.commit()
+    with pytest.raises(psycopg2.errors.FeatureNotSupported):
+        db._execute_prepared(cursor, sql, [1])
+    connection.rollback()
+
+    db._execute_prepared(cursor, sql, [1])
+    assert cursor.fetchone() == (1, None)
+    names = prepared_names(cursor)
+    assert stale not in names and connection.prepared_name(sql) in names
+
+
+def test_missing_statement_is_prepared_again(db, connection):
+    cursor = connection.cursor()
+    sql = "SELECT %s + 1"
+    db._execute_prepared(cursor, sql, [1])
+    cursor.execute(f"DEALLOCATE {connection.prepared_name(sql)}")
+    connection.commit()
+
+    with pytest.raises(psycopg2.errors.InvalidSqlStatementName):
+        db._execute_prepared(cursor, sql, [1])
+    connection.rollback()
+
+    db._execute_prepared(cursor, sql, [2])
+    assert cursor.fetchone() == (3,)
+    assert connection.prepared_name(sql) in prepared_names(cursor)
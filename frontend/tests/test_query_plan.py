@@ -0,0 +1,135 @@
+import pytest
+
+from api.query_plan import parse_plan
+
+# EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) для
+#   SELECT * FROM attacks a JOIN targets t ON t.attack_id = a.id WHERE a.danger = 'high'
+# (сокращен до полей, которые читает parse_plan)
+ANALYZED_JOIN = [{
+    "Plan": {
+        "Node Type": "Nested Loop",
+        "Plan Rows": 12,
+        "Actual Rows": 600,
+        "Actual Loops": 1,
+        "Actual Total Time": 48.5,
+        "Shared Hit Blocks": 1210,
+        "Shared Read Blocks": 40,
+        "Plans": [
+            {
+                "Node Type": "Seq Scan",
+                "Relation Name": "attacks",
+                "Plan Rows": 4,
+                "Actual Rows": 200,
+                "Actual Loops": 1,
+                "Actual Total Time": 30.0,
+                "Filter": "((danger)::text = 'high'::text)",
+                "Rows Removed by Filter": 49800,
+                "Shared Hit Blocks": 800,
+                "Shared Read Blocks": 40
+            },
+            {
+                "Node Type": "Index Scan",
+                "Relation Name": "targets",
+                "Index Name": "idx_targets_attack_id_protocol",
+                "Plan Rows": 3,
+                "Actual Rows": 3,
+                "Actual Loops": 200,
+                "Actual Total Time": 0.05,
+                "Index Cond": "(attack_id = a.id)",
+                "Shared Hit Blocks": 410,
+                "Shared Read Blocks": 0
+            }
+        ]
+    },
+    "Planning Time": 0.4,
+    "Execution Time": 49.1
+}]
+
+# EXPLAIN (FORMAT JSON) без ANALYZE: только оценки
+ESTIMATED_SCAN = [{
+    "Plan": {
+        "Node Type": "Sort",
+        "Plan Rows": 500,
+        "Sort Key": ["created_at DESC"],
+        "Plans": [
+            {"Node Type": "Seq Scan", "Relation Name": "attacks", "Plan Rows": 500,
+             "Filter": "((danger)::text = 'low'::text)"}
+        ]
+    }
+}]
+
+
+def test_analyzed_plan_tree():
+    plan = parse_plan("sql", ANALYZED_JOIN, analyzed=True, table_rows={"attacks": 50000, "targets": 150000})
+
+    assert [(node.title, node.depth) for node in plan.nodes] == [
+        ("Nested Loop", 0),
+        ("Seq Scan on attacks", 1),
+        ("Index Scan using idx_targets_attack_id_protocol on targets", 1)
+    ]
+    assert plan.planning_time == 0.4 and plan.execution_time == 49.1
+    scan = plan.nodes[1]
+    assert (scan.shared_hit, scan.shared_read) == (800, 40)
+    assert scan.details["Filter"] == "((danger)::text = 'high'::text)"
+
+
+def test_self_time_accounts_for_loops():
+    join, scan, index_scan = parse_plan("sql", ANALYZED_JOIN, analyzed=True).nodes
+
+    # Время узла - за все проходы: 0.05 мс * 200
+    assert index_scan.loops == 200
+    assert index_scan.total_time == pytest.approx(10.0)
+    assert scan.self_time == pytest.approx(30.0)
+    assert join.self_time == pytest.approx(8.5)
+
+
+def test_self_time_is_never_negative():
+    plan = [{"Plan": dict(ANALYZED_JOIN[0]["Plan"], **{"Actual Total Time": 35.0})}]
+    assert parse_plan("sql", plan, analyzed=True).nodes[0].self_time == 0.0
+
+
+def test_seq_scan_of_large_table_is_flagged():
+    plan = parse_plan("sql", ANALYZED_JOIN, analyzed=True, table_rows={"attacks": 50000}, large_table_rows=10000)
+    join, scan, index_scan = plan.nodes
+
+    assert any(warning.startswith("sequential scan of ~50,000 rows") for warning in scan.warnings)
+    assert not any("sequential" in warning for warning in index_scan.warnings)
+
+
+def test_seq_scan_uses_rows_read_without_statistics():
+    # Таблица не анализировалась (reltuples = -1): размер - по прочитанным строкам
+    scan = parse_plan("sql", ANALYZED_JOIN, analyzed=True, table_rows={"attacks": -1},
+                      large_table_rows=10000).nodes[1]
+    assert "sequential scan of ~50,000 rows" in scan.warnings
+
+
+def test_seq_scan_of_small_table_is_not_flagged():
+    plan = parse_plan("sql", ESTIMATED_SCAN, analyzed=False, table_rows={"attacks": 900}, large_table_rows=10000)
+    assert plan.warnings == []
+
+
+def test_estimated_plan_uses_table_statistics():
+    plan = parse_plan("sql", ESTIMATED_SCAN, analyzed=False, table_rows={"attacks": 20000}, large_table_rows=10000)
+    sort, scan = plan.nodes
+
+    assert sort.actual_rows is None and sort.total_time is None and sort.self_time is None
+    assert scan.warnings == ["sequential scan of ~20,000 rows"]
+    assert plan.warnings == ["Seq Scan on attacks: sequential scan of ~20,000 rows"]
+
+
+def test_estimate_mismatch_of_ten_times_is_flagged():
+    join, scan, index_scan = parse_plan("sql", ANALYZED_JOIN, analyzed=True, large_table_rows=10 ** 9).nodes
+
+    # 12 -> 600 и 4 -> 200: расхождение в 50 раз
+    assert join.warnings == ["rows estimated 12, actual 600"]
+    assert scan.warnings == ["rows estimated 4, actual 200"]
+    assert index_scan.warnings == []
+
+
+def test_estimate_mismatch_below_threshold_is_not_flagged():
+    plan = [{"Plan": {"Node Type": "Seq Scan", "Relation Name": "t", "Plan Rows": 100,
+                      "Actual Rows": 999, "Actual Loops": 1, "Actual Total Time": 1.0}}]
+    assert parse_plan("sql", plan, analyzed=True, large_table_rows=10 ** 9).warnings == []
+
+    plan[0]["Plan"]["Actual Rows"] = 1000
+    assert len(parse_plan("sql", plan, analyzed=True, large_table_rows=10 ** 9).warnings) == 1
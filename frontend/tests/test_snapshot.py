@@ -0,0 +1,51 @@
+import dataclasses
+from datetime import datetime
+
+import pytest
+
+from api.db_config import db_config
+from api.snapshot import AttackSnapshot
+
+STATS = {"total": 3, "critical": 1, "high_frequency": 2, "last_attack_at": datetime(2025, 9, 14, 12, 30),
+         "facets": {"frequency": {"high": 1, "very_high": 1}}}
+
+
+@pytest.fixture
+def snapshot_path(tmp_path):
+    return str(tmp_path / "attacks.sqlite3")
+
+
+def make_snapshot(path, database="ddos"):
+    return AttackSnapshot(path, dataclasses.replace(db_config, database=database))
+
+
+def test_stats_are_restored_with_save_time(snapshot_path):
+    snapshot = make_snapshot(snapshot_path)
+    assert snapshot.load_stats() is None
+
+    snapshot.save_stats(STATS)
+    snapshot.close()
+
+    stats = make_snapshot(snapshot_path).load_stats()
+    assert isinstance(stats.pop("snapshot_saved_at"), datetime)
+    assert stats == STATS
+
+
+def test_stats_of_other_database_are_ignored(snapshot_path):
+    snapshot = make_snapshot(snapshot_path)
+    snapshot.save_stats(STATS)
+    snapshot.close()
+
+    assert make_snapshot(snapshot_path, database="other").load_stats() is None
+
+
+def test_stats_survive_attack_writes(snapshot_path):
+    snapshot = make_snapshot(snapshot_path)
+    snapshot.save_stats(STATS)
+    snapshot.save({"changed": [{"id": "a", "created_at": datetime(2025, 9, 14)}], "deleted_ids": [],
+                   "watermark": "w1", "full": True})
+    snapshot.close()
+
+    snapshot = make_snapshot(snapshot_path)
+    assert snapshot.load() == ([{"id": "a", "created_at": datetime(2025, 9, 14)}], "w1")
+    assert snapshot.load_stats()["total"] == 3
@@ -0,0 +1,72 @@
+import json
+
+
+def target(ip, port=80, protocol="tcp", tags=(), domain=""):
+    return {"target_ip": ip, "target_domain": domain, "port": port, "protocol": protocol, "tags": list(tags)}
+
+
+def stored(target_id, ip, port=80, protocol="tcp", tags=(), domain=""):
+    # Строка LOCK_TARGETS_SQL: tags приходят из JSONB уже списком
+    return (target_id, ip, domain, port, protocol, list(tags))
+
+
+def row(target_id, ip, port=80, protocol="tcp", tags=(), domain=""):
+    return (target_id, ip, domain, port, protocol, json.dumps(list(tags)))
+
+
+def test_same_targets_are_left_alone(queries):
+    rows = [stored(1, "10.0.0.1", tags=["web"]), stored(2, "10.0.0.2", port=53, protocol="udp")]
+    targets = [target("10.0.0.2", port=53, protocol="udp"), target("10.0.0.1", tags=["web"])]
+
+    assert queries._plan_target_sync("a", rows, targets) == ([], [], [], 2)
+
+
+def test_changed_target_is_updated_in_place(queries):
+    rows = [stored(1, "10.0.0.1"), stored(2, "10.0.0.2")]
+    targets = [target("10.0.0.1"), target("10.0.0.2", port=443, tags=["tls"])]
+
+    updates, deletes, inserts, unchanged = queries._plan_target_sync("a", rows, targets)
+
+    assert updates == [row(2, "10.0.0.2", port=443, tags=["tls"])]
+    assert (deletes, inserts, unchanged) == ([], [], 1)
+
+
+def test_removed_targets_are_deleted(queries):
+    rows = [stored(3, "10.0.0.3"), stored(1, "10.0.0.1"), stored(2, "10.0.0.2")]
+
+    assert queries._plan_target_sync("a", rows, [target("10.0.0.2")]) == ([], [1, 3], [], 1)
+    assert queries._plan_target_sync("a", rows, []) == ([], [1, 2, 3], [], 0)
+
+
+def test_added_targets_are_inserted(queries):
+    rows = [stored(1, "10.0.0.1")]
+    targets = [target("10.0.0.1"), target("10.0.0.2"), target("", domain="example.com")]
+
+    updates, deletes, inserts, unchanged = queries._plan_target_sync("a", rows, targets)
+
+    assert (updates, deletes, unchanged) == ([], [], 1)
+    assert inserts == [("a",) + row(None, "10.0.0.2")[1:], ("a",) + row(None, "", domain="example.com")[1:]]
+
+
+def test_updates_reuse_stale_rows_before_insert_or_delete(queries):
+    rows = [stored(5, "10.0.0.5"), stored(4, "10.0.0.4")]
+    targets = [target("10.0.0.7"), target("10.0.0.8"), target("10.0.0.9")]
+
+    updates, deletes, inserts, unchanged = queries._plan_target_sync("a", rows, targets)
+
+    # Старые строки по возрастанию id получают новые цели по порядку, остаток вставляется
+    assert updates == [row(4, "10.0.0.7"), row(5, "10.0.0.8")]
+    assert (deletes, unchanged) == ([], 0)
+    assert inserts == [("a",) + row(None, "10.0.0.9")[1:]]
+
+
+def test_duplicate_targets_are_matched_one_to_one(queries):
+    rows = [stored(1, "10.0.0.1"), stored(2, "10.0.0.1"), stored(3, "10.0.0.1")]
+
+    # Из трех одинаковых строк остаются две, третья удаляется
+    assert queries._plan_target_sync("a", rows, [target("10.0.0.1")] * 2) == ([], [3], [], 2)
+
+    # Дубликат сверх сохраненных - вставка
+    updates, deletes, inserts, unchanged = queries._plan_target_sync("a", rows[:1], [target("10.0.0.1")] * 2)
+    assert (updates, deletes, unchanged) == ([], [], 1)
+    assert inserts == [("a",) + row(None, "10.0.0.1")[1:]]
@@ -0,0 +1,74 @@
+import pytest
+
+
+@pytest.fixture(params=["fresh_db", "partitioned_db"])
+def upsert_db(request):
+    """Обычные и секционированные таблицы: при секционировании конфликт ищется по (id, created_at)"""
+    return request.getfixturevalue(request.param)
+
+
+def stored(db, attack_id):
+    attack = db.get_attack(attack_id)
+    return attack, [(target["target_ip"], target["port"]) for target in attack["targets"]]
+
+
+def test_replayed_batch_is_unchanged(upsert_db, make_attack):
+    db = upsert_db
+    batch = [make_attack("u1"), make_attack("u2")]
+
+    first = db.upsert_attacks(batch)["data"]
+    assert (first["inserted"], first["updated"], first["unchanged"]) == (2, 0, 0)
+    assert first["targets_written"] == 2
+    before, _ = stored(db, "u1")
+
+    replay = db.upsert_attacks(batch)["data"]
+
+    assert (replay["inserted"], replay["updated"], replay["unchanged"]) == (0, 0, 2)
+    assert replay["targets_written"] == 0
+    # Неизмененная атака не перезаписывается: updated_at прежний
+    assert stored(db, "u1")[0]["updated_at"] == before["updated_at"]
+
+
+def test_changed_attack_is_updated_with_its_targets(upsert_db, make_attack):
+    db = upsert_db
+    db.upsert_attacks([make_attack("u1"), make_attack("u2")])
+
+    targets = [{"target_ip": "10.1.1.1", "port": 443, "protocol": "tcp"},
+               {"target_ip": "10.1.1.2", "port": 53, "protocol": "udp"}]
+    result = db.upsert_attacks([make_attack("u1", danger="critical", targets=targets), make_attack("u2"),
+                                make_attack("u3")])["data"]
+
+    assert (result["inserted_ids"], result["updated_ids"], result["unchanged"]) == (["u3"], ["u1"], 1)
+    assert result["targets_written"] == 3
+    attack, attack_targets = stored(db, "u1")
+    assert attack["danger"] == "critical"
+    assert attack_targets == [("10.1.1.1", 443), ("10.1.1.2", 53)]
+    assert stored(db, "u2")[1] == [("192.168.0.1", 80)]
+
+
+def test_other_write_makes_next_upsert_rewrite(upsert_db, make_attack):
+    db = upsert_db
+    db.upsert_attacks([make_attack("u1")])
+    assert db.update_attacks(["u1"], {"danger": "low"})["success"]
+
+    # Хеш сброшен записью не через upsert: прежняя версия записывается снова
+    result = db.upsert_attacks([make_attack("u1")])["data"]
+
+    assert (result["updated"], result["unchanged"]) == (1, 0)
+    assert db.get_attack("u1")["danger"] == "medium"
+
+
+def test_duplicates_and_invalid_records_in_batch(upsert_db, make_attack):
+    db = upsert_db
+    result = db.upsert_attacks([make_attack("u1", name="old"), make_attack(None), make_attack("u1", name="new"),
+                                make_attack("u2", danger="")], batch_size=2)["data"]
+
+    assert (result["total"], result["inserted"], result["superseded"], result["failed"]) == (4, 1, 0, 2)
+    assert [error["index"] for error in result["errors"]] == [1, 3]
+    # Повтор id в разных пакетах - обновление второй версией
+    assert result["updated"] == 1
+    assert db.get_attack("u1")["name"] == "new"
+
+    result = db.upsert_attacks([make_attack("u3", name="old"), make_attack("u3", name="new")])["data"]
+    assert (result["inserted"], result["superseded"]) == (1, 1)
+    assert db.get_attack("u3")["name"] == "new"
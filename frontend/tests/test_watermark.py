@@ -0,0 +1,62 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+UPDATED = datetime(2025, 9, 14, 12, 30, 15, 123456)
+DELETED = datetime(2025, 9, 14, 12, 31, 0, 5)
+SAFE_UNTIL = datetime(2025, 9, 14, 12, 35)
+TABLE_OID = 16384
+
+
+def test_watermark_round_trip(queries):
+    watermark = queries._encode_watermark(UPDATED, "a1", DELETED, "d1", TABLE_OID)
+    assert queries._decode_watermark(watermark) == (UPDATED, "a1", DELETED, "d1", TABLE_OID)
+
+
+@pytest.mark.parametrize("watermark", ["???", "W10=", "WzFd", "eyJhIjogMX0=",
+                                       # Пять полей, но даты нечитаемые
+                                       "WyJ4IiwgImEiLCAieSIsICJkIiwgMV0="])
+def test_invalid_watermark_is_rejected(queries, watermark):
+    with pytest.raises(ValueError, match="Invalid sync watermark"):
+        queries._decode_watermark(watermark)
+
+
+def test_unreadable_watermark_means_full_sync(queries, capsys):
+    assert queries._watermark_position(None) is None
+    assert queries._watermark_position("???") is None
+    assert "Ignoring sync watermark" in capsys.readouterr().out
+    assert queries._needs_full_sync(None, DELETED, TABLE_OID)
+
+
+def test_full_sync_after_retention_or_table_change(queries):
+    position = queries._decode_watermark(queries._encode_watermark(UPDATED, "a1", DELETED, "d1", TABLE_OID))
+
+    assert not queries._needs_full_sync(position, DELETED - timedelta(days=1), TABLE_OID)
+    # Надгробия старше отметки уже удалены - удаления могли потеряться
+    assert queries._needs_full_sync(position, DELETED + timedelta(seconds=1), TABLE_OID)
+    # Таблицу пересоздали (reset_database)
+    assert queries._needs_full_sync(position, DELETED - timedelta(days=1), TABLE_OID + 1)
+
+
+def test_full_result_watermark_starts_at_safe_boundary(queries):
+    result = queries._changes_result([], [], SAFE_UNTIL, TABLE_OID, None, full=True)
+    assert result["full"]
+    assert queries._decode_watermark(result["watermark"]) == (SAFE_UNTIL, "", SAFE_UNTIL, "", TABLE_OID)
+
+
+def test_delta_watermark_never_moves_back(queries):
+    later = SAFE_UNTIL + timedelta(minutes=1)
+    position = (later, "a9", DELETED, "d1", TABLE_OID)
+
+    result = queries._changes_result([], [], SAFE_UNTIL, TABLE_OID, position, full=False)
+
+    # Изменения уже прочитаны дальше границы - их позиция сохраняется, удаления подтягиваются к границе
+    assert queries._decode_watermark(result["watermark"]) == (later, "a9", SAFE_UNTIL, "", TABLE_OID)
+
+
+def test_recreated_attack_is_not_reported_deleted(queries):
+    position = (UPDATED, "a1", DELETED, "d1", TABLE_OID)
+    result = queries._changes_result([{"id": "a2"}], ["a2", "a3"], SAFE_UNTIL, TABLE_OID, position, full=False)
+
+    assert [attack["id"] for attack in result["changed"]] == ["a2"]
+    assert result["deleted_ids"] == ["a3"]
@@ -1,12 +1,27 @@
 import customtkinter as ctk
-from tkinter import ttk
+from tkinter import ttk, messagebox, filedialog
 import threading
 from api.client import DDOSDatabaseClient
+from api.adhoc_query import QueryCancelled
+from api.db_config import db_config
+from utils.file_handler import FileHandler
+from ui.query_progress import QueryProgress
 
 
 class AdvancedQueryBuilder:
+    # Столбцы таблицы результатов в режиме плана запроса (узел плана - в колонке дерева)
+    PLAN_COLUMNS = ("Est. rows", "Actual rows", "Loops", "Time, ms", "Self, ms",
+                    "Buffers hit", "Buffers read", "Warnings", "Details")
+
     def __init__(self, parent, app):
         self.app = app
+        # Текущий запрос с серверным курсором, показанные строки и идет ли чтение
+        self.stream = None
+        self.stream_rows = []
+        self.stream_total = None
+        self.stream_busy = False
+        # Отложенное закрытие результата после простоя (after id)
+        self.idle_job = None
         self.setup_ui(parent)
 
     def setup_ui(self, parent):
@@ -133,6 +148,20 @@ class AdvancedQueryBuilder:
             fg_color=self.app.colors["primary"]
         ).pack(fill="x", pady=2)
 
+        # План запроса
+        explain_frame = ctk.CTkFrame(button_frame, fg_color="transparent")
+        explain_frame.pack(fill="x", pady=2)
+
+        ctk.CTkButton(
+            explain_frame,
+            text="Explain Plan",
+            command=self.explain_query,
+            fg_color=self.app.colors["secondary"]
+        ).pack(side="left", fill="x", expand=True, padx=(0, 10))
+
+        self.analyze_var = ctk.BooleanVar()
+        ctk.CTkCheckBox(explain_frame, text="ANALYZE (runs query)", variable=self.analyze_var).pack(side="left")
+
     def create_results_section(self, parent):
         """Создание панели результатов"""
         # SQL preview
@@ -152,8 +181,23 @@ class AdvancedQueryBuilder:
         self.results_count = ctk.CTkLabel(results_label_frame, text="0 rows", text_color=self.app.colors["text_muted"])
         self.results_count.pack(side="right")
 
+        # Время выполнения и отмена запроса
+        self.progress = QueryProgress(results_label_frame, self.app)
+        self.progress.pack(side="right", padx=10)
+
+        # Дочитывание результата сверх предпросмотра
+        self.export_btn = ctk.CTkButton(results_label_frame, text="💾 Fetch all to file", width=130,
+                                        command=self.fetch_all_to_file, state="disabled")
+        self.export_btn.pack(side="right", padx=(10, 0))
+
+        self.load_more_btn = ctk.CTkButton(results_label_frame, text="⬇ Load more", width=100,
+                                           command=self.load_more, state="disabled")
+        self.load_more_btn.pack(side="right", padx=(10, 0))
+
         # Таблица результатов
         self.results_tree = ttk.Treeview(parent, show="headings", height=15)
+        # Открытый курсор держит соединение - закрываем его вместе с окном
+        self.results_tree.bind("<Destroy>", lambda e: self.close_stream())
 
         scrollbar = ctk.CTkScrollbar(parent, orientation="vertical", command=self.results_tree.yview)
         self.results_tree.configure(yscrollcommand=scrollbar.set)
@@ -165,7 +209,8 @@ class AdvancedQueryBuilder:
         """Построение и выполнение запроса"""
         sql = self.generate_sql_query()
         if sql:
-            self.execute_custom_query(sql)
+            # Общее число строк считается без ORDER BY: сортировка на подсчет не влияет
+            self.execute_custom_query(sql, count_sql=self.generate_sql_query(order=False))
 
     def generate_sql_only(self):
         """Только генерация SQL без выполнения"""
@@ -174,8 +219,8 @@ class AdvancedQueryBuilder:
             self.sql_preview.delete("1.0", "end")
             self.sql_preview.insert("1.0", sql)
 
-    def generate_sql_query(self):
-        """Генерация SQL запроса на основе введенных параметров"""
+    def generate_sql_query(self, order=True):
+        """Генерация SQL запроса на основе введенных параметров (order=False - без ORDER BY)"""
         try:
             # Базовый SELECT
             columns = self.columns_entry.get().strip() or "*"
@@ -203,7 +248,7 @@ class AdvancedQueryBuilder:
 
             # ORDER BY clause
             order_field = self.order_field.get().strip()
-            if order_field:
+            if order and order_field:
                 order_dir = self.order_direction.get()
                 sql += f" ORDER BY {order_field} {order_dir}"
 
@@ -213,30 +258,244 @@ class AdvancedQueryBuilder:
             messagebox.showerror("Error", f"Failed to generate SQL: {e}")
             return None
 
-    def execute_custom_query(self, sql):
-        """Выполнение пользовательского SQL запроса"""
+    def execute_custom_query(self, sql, count_sql=None):
+        """Выполнение пользовательского SQL запроса: первые строки результата через серверный курсор"""
+        if self.progress.query is not None:
+            messagebox.showwarning("Warning", "A query is already running - cancel it or wait for it to finish")
+            return
+
+        self.close_stream()
+        query = self.app.api_client.stream_query(sql, count_sql=count_sql)
+        self.stream = query
+        self.display_results([], [])
+        self.results_count.configure(text="Running...")
+        self.read_stream(query, db_config.adhoc_preview_rows, count=True)
+
+    def read_stream(self, query, limit, count=False):
+        """Чтение следующих limit строк в фоновом потоке с отрисовкой пакетами по мере получения"""
+        self.cancel_idle_close()
+        self.stream_busy = True
+        self.progress.start(query)
+        self.update_stream_buttons()
+
+        def stream_thread():
+            try:
+                for rows in query.iter_batches(limit):
+                    self.app.window.after(0, lambda rows=rows: self.on_stream_batch(query, rows))
+                total = None
+                if count:
+                    self.app.window.after(0, lambda: self.on_stream_preview(query))
+                    # Общее число строк - отдельным запросом, показанные строки уже на экране
+                    total = query.count()
+                self.app.window.after(0, lambda: self.on_stream_paused(query, total))
+            except Exception as e:
+                error = e
+                self.app.window.after(0, lambda: self.on_stream_failed(query, error))
 
-        def execute_thread():
+        thread = threading.Thread(target=stream_thread)
+        thread.daemon = True
+        thread.start()
+
+    def on_stream_batch(self, query, rows):
+        """Пакет строк результата"""
+        if query is not self.stream:
+            return
+        if not self.stream_rows:
+            self.display_results(query.columns, [])
+        self.stream_rows.extend(rows)
+        for row in rows:
+            self.results_tree.insert("", "end", values=row)
+        self.show_stream_count(query)
+
+    def on_stream_preview(self, query):
+        """Предпросмотр получен, идет подсчет общего числа строк"""
+        if query is self.stream:
+            self.show_stream_count(query, counting=not query.exhausted)
+
+    def on_stream_paused(self, query, total):
+        """Чтение остановлено (предпросмотр или очередная порция получены)"""
+        if query is not self.stream:
+            return
+        self.progress.finish()
+        self.stream_busy = False
+        if total is not None:
+            self.stream_total = total
+        # Пустой результат: пакетов не было, показываем только столбцы
+        if not self.stream_rows:
+            self.display_results(query.columns, [])
+        self.show_stream_count(query)
+        self.update_stream_buttons()
+        self.schedule_idle_close()
+
+    def on_stream_failed(self, query, error):
+        """Ошибка или отмена чтения (запрос при этом закрыт)"""
+        if query is not self.stream:
+            return
+        self.stream_busy = False
+        self.update_stream_buttons()
+        self.on_query_failed(error)
+        if self.stream_rows:
+            self.show_stream_count(query, suffix=" (stopped)")
+
+    def show_stream_count(self, query, counting=False, suffix=""):
+        """Показанные строки и общее число строк результата"""
+        shown = len(self.stream_rows)
+        if query.exhausted:
+            text = f"{shown:,} rows"
+        elif counting:
+            text = f"{shown:,} rows shown, counting..."
+        elif self.stream_total is not None:
+            text = f"{shown:,} of {self.stream_total:,} rows"
+        else:
+            text = f"{shown:,} rows shown, more available"
+        self.results_count.configure(text=text + suffix)
+
+    def update_stream_buttons(self):
+        """Кнопки дочитывания доступны, пока курсор открыт и не занят"""
+        state = "normal" if self.stream is not None and self.stream.is_open and not self.stream_busy else "disabled"
+        self.load_more_btn.configure(state=state)
+        self.export_btn.configure(state=state)
+
+    def load_more(self):
+        """Показ следующей порции строк"""
+        if self.stream is None or self.stream_busy or not self.stream.is_open:
+            return
+        self.read_stream(self.stream, db_config.adhoc_preview_rows)
+
+    def fetch_all_to_file(self):
+        """Выгрузка всего результата (показанные строки и остаток курсора) в CSV файл"""
+        query = self.stream
+        if query is None or self.stream_busy or not query.is_open:
+            return
+        filename = filedialog.asksaveasfilename(
+            title="Fetch all rows to file",
+            defaultextension=".csv",
+            filetypes=[("CSV files", "*.csv"), ("All files", "*.*")]
+        )
+        if not filename:
+            return
+
+        shown = list(self.stream_rows)
+        self.cancel_idle_close()
+        self.stream_busy = True
+        self.progress.start(query)
+        self.update_stream_buttons()
+        self.results_count.configure(text="Fetching all rows to file...")
+
+        def export_thread():
             try:
-                conn = self.app.api_client.db.get_connection()
-                cursor = conn.cursor()
+                # Остаток результата пишется в файл пакетами, без отрисовки в таблице
+                def chunks():
+                    yield shown
+                    yield from query.iter_batches()
 
-                cursor.execute(sql)
-                results = cursor.fetchall()
-                columns = [desc[0] for desc in cursor.description]
+                count = FileHandler(filename).save_rows_stream(query.columns, chunks())
+                self.app.window.after(0, lambda: self.on_stream_exported(query, count, filename))
+            except Exception as e:
+                error = e
+                self.app.window.after(0, lambda: self.on_stream_failed(query, error))
 
-                conn.close()
+        thread = threading.Thread(target=export_thread)
+        thread.daemon = True
+        thread.start()
 
-                # Обновляем UI в основном потоке
-                self.app.window.after(0, lambda: self.display_results(columns, results))
+    def on_stream_exported(self, query, count, filename):
+        """Результат выгружен в файл"""
+        if query is not self.stream:
+            return
+        self.on_stream_paused(query, count)
+        self.results_count.configure(text=f"{len(self.stream_rows):,} rows shown, {count:,} saved to file")
+        self.app.show_success(f"Saved {count} rows to {filename}")
+
+    def schedule_idle_close(self):
+        """Закрытие недочитанного результата после простоя: курсор держит транзакцию и блокировки таблиц"""
+        self.cancel_idle_close()
+        if self.stream is not None and self.stream.is_open and self.stream.idle_timeout > 0:
+            self.idle_job = self.results_tree.after(int(self.stream.idle_timeout * 1000), self.close_idle_stream)
+
+    def cancel_idle_close(self):
+        if self.idle_job is not None:
+            self.results_tree.after_cancel(self.idle_job)
+            self.idle_job = None
+
+    def close_idle_stream(self):
+        """Результат не дочитывали дольше idle_timeout - закрываем курсор, показанные строки остаются"""
+        self.idle_job = None
+        query = self.stream
+        if query is None or self.stream_busy or not query.is_open:
+            return
+        query.close()
+        self.update_stream_buttons()
+        self.show_stream_count(query, suffix=" - cursor closed after idle, run the query again for more")
+
+    def close_stream(self):
+        """Закрытие курсора текущего результата (идущее чтение отменяется)"""
+        self.cancel_idle_close()
+        query, self.stream = self.stream, None
+        self.stream_rows = []
+        self.stream_total = None
+        if query is None:
+            return
+        if self.stream_busy:
+            # Поток чтения сам закроет запрос после отмены
+            query.cancel()
+            self.progress.finish()
+            self.stream_busy = False
+        else:
+            query.close()
+        self.update_stream_buttons()
+
+    def explain_query(self):
+        """Построение плана запроса (EXPLAIN, при включенном ANALYZE - с выполнением запроса)"""
+        sql = self.generate_sql_query()
+        if not sql:
+            return
+        self.sql_preview.delete("1.0", "end")
+        self.sql_preview.insert("1.0", sql)
+
+        analyze = self.analyze_var.get()
+        self.run_query(lambda: self.app.api_client.explain_query(sql, analyze=analyze),
+                       self.display_plan, "Explaining...")
+
+    def run_query(self, make_query, on_finished, status):
+        """Выполнение запроса (AdhocQuery) в фоновом потоке, результат - в on_finished"""
+        if self.progress.query is not None:
+            messagebox.showwarning("Warning", "A query is already running - cancel it or wait for it to finish")
+            return
+
+        # Результат прошлого запроса заменяется - его курсор больше не нужен
+        self.close_stream()
+        query = make_query()
+        self.progress.start(query)
+        self.results_count.configure(text=status)
 
+        def execute_thread():
+            try:
+                result = query.run()
+                # Обновляем UI в основном потоке
+                self.app.window.after(0, lambda: self.on_query_finished(on_finished, result))
             except Exception as e:
-                self.app.window.after(0, lambda: messagebox.showerror("Error", f"Query failed: {e}"))
+                error = e
+                self.app.window.after(0, lambda: self.on_query_failed(error))
 
         thread = threading.Thread(target=execute_thread)
         thread.daemon = True
         thread.start()
 
+    def on_query_finished(self, on_finished, result):
+        """Запрос выполнен"""
+        self.progress.finish()
+        on_finished(result)
+
+    def on_query_failed(self, error):
+        """Запрос завершился ошибкой или был отменен"""
+        self.progress.finish()
+        if isinstance(error, QueryCancelled) and not error.timed_out:
+            self.results_count.configure(text="Query cancelled")
+            return
+        self.results_count.configure(text="Query failed")
+        messagebox.showerror("Error", f"Query failed: {error}")
+
     def display_results(self, columns, results):
         """Отображение результатов запроса"""
         # Очищаем таблицу
@@ -244,6 +503,7 @@ class AdvancedQueryBuilder:
             self.results_tree.delete(item)
 
         # Настраиваем колонки
+        self.results_tree.configure(show="headings")
         self.results_tree["columns"] = columns
         for col in columns:
             self.results_tree.heading(col, text=col)
@@ -254,4 +514,49 @@ class AdvancedQueryBuilder:
             self.results_tree.insert("", "end", values=row)
 
         # Обновляем счетчик
-        self.results_count.configure(text=f"{len(results)} rows")
\ No newline at end of file
+        self.results_count.configure(text=f"{len(results)} rows")
+
+    def display_plan(self, plan):
+        """Отображение плана запроса деревом узлов с подсветкой проблемных узлов"""
+        for item in self.results_tree.get_children():
+            self.results_tree.delete(item)
+
+        self.results_tree.configure(show="tree headings")
+        self.results_tree["columns"] = self.PLAN_COLUMNS
+        self.results_tree.heading("#0", text="Plan node")
+        self.results_tree.column("#0", width=280)
+        for col in self.PLAN_COLUMNS:
+            self.results_tree.heading(col, text=col)
+            self.results_tree.column(col, width=260 if col in ("Warnings", "Details") else 90)
+        self.results_tree.tag_configure("warning", foreground=self.app.colors["danger"])
+
+        # Последний узел каждого уровня - родитель для следующего уровня
+        parents = []
+        for node in plan.nodes:
+            del parents[node.depth:]
+            details = "; ".join(f"{key}: {value}" for key, value in node.details.items())
+            values = (
+                self.format_number(node.plan_rows),
+                self.format_number(node.actual_rows),
+                node.loops if node.actual_rows is not None else "",
+                self.format_number(node.total_time, 2),
+                self.format_number(node.self_time, 2),
+                self.format_number(node.shared_hit),
+                self.format_number(node.shared_read),
+                "; ".join(node.warnings),
+                details
+            )
+            item = self.results_tree.insert(parents[-1] if parents else "", "end", text=node.title, values=values,
+                                            tags=("warning",) if node.warnings else (), open=True)
+            parents.append(item)
+
+        summary = f"{len(plan.nodes)} plan nodes, {len(plan.warnings)} warnings"
+        if plan.execution_time is not None:
+            summary += f", execution {plan.execution_time:.2f} ms"
+        elif plan.planning_time is not None:
+            summary += f", planning {plan.planning_time:.2f} ms"
+        self.results_count.configure(text=summary)
+
+    @staticmethod
+    def format_number(value, digits=0):
+        return "" if value is None else f"{value:,.{digits}f}"
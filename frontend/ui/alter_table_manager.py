@@ -263,6 +263,7 @@ class AlterTableManager:
 
     def get_table_columns(self, table_name):
         """Получение списка столбцов таблицы"""
+        conn = None
         try:
             conn = self.app.api_client.db.get_connection()
             cursor = conn.cursor()
@@ -275,11 +276,13 @@ class AlterTableManager:
             """, (table_name,))
 
             columns = [row[0] for row in cursor.fetchall()]
-            conn.close()
             return columns
         except Exception as e:
             messagebox.showerror("Error", f"Failed to load columns: {e}")
             return []
+        finally:
+            if conn is not None:
+                self.app.api_client.db.release_connection(conn)
 
     def execute_add_column(self):
         """Выполнение добавления столбца"""
@@ -383,6 +386,7 @@ class AlterTableManager:
         """Выполнение SQL в транзакции"""
 
         def execute_thread():
+            conn = None
             try:
                 conn = self.app.api_client.db.get_connection()
                 cursor = conn.cursor()
@@ -390,12 +394,14 @@ class AlterTableManager:
                 # Выполняем SQL
                 cursor.execute(sql)
                 conn.commit()
-                conn.close()
 
                 self.app.window.after(0, lambda: messagebox.showinfo("Success", success_message))
 
             except Exception as e:
                 self.app.window.after(0, lambda: messagebox.showerror("Error", f"SQL Error: {e}"))
+            finally:
+                if conn is not None:
+                    self.app.api_client.db.release_connection(conn)
 
         thread = threading.Thread(target=execute_thread)
         thread.daemon = True
@@ -2,9 +2,13 @@ import customtkinter as ctk
 
 
 class Dashboard:
+    # За сколько последних дней показывается динамика
+    SUMMARY_DAYS = 7
+
     def __init__(self, parent, app):
         self.app = app
         self.setup_ui(parent)
+        self.load_rollups()
 
     def setup_ui(self, parent):
         """Создание главной страницы с тремя кнопками"""
@@ -47,6 +51,105 @@ class Dashboard:
                                 "Browse and manage all registered attacks",
                                 self.app.show_attacks_list)
 
+        self.create_summary_section(dashboard_frame)
+
+    def create_summary_section(self, parent):
+        """Секция сводок (материализованные представления на сервере)"""
+        summary_frame = ctk.CTkFrame(parent, fg_color=self.app.colors["card_bg"], corner_radius=12)
+        summary_frame.pack(fill="x", pady=(20, 0))
+
+        header_frame = ctk.CTkFrame(summary_frame, fg_color="transparent")
+        header_frame.pack(fill="x", padx=20, pady=(15, 5))
+
+        ctk.CTkLabel(header_frame, text="Attack Summary",
+                     font=ctk.CTkFont(size=18, weight="bold")).pack(side="left")
+
+        self.refresh_summary_btn = ctk.CTkButton(header_frame, text="🔄 Refresh Summary", width=150,
+                                                 command=self.refresh_rollups,
+                                                 fg_color=self.app.colors["primary"])
+        self.refresh_summary_btn.pack(side="right")
+
+        self.freshness_label = ctk.CTkLabel(header_frame, text="Loading...",
+                                            text_color=self.app.colors["text_muted"])
+        self.freshness_label.pack(side="right", padx=15)
+
+        self.summary_label = ctk.CTkLabel(summary_frame, text="", justify="left", anchor="w",
+                                          font=ctk.CTkFont(family="Courier", size=12))
+        self.summary_label.pack(fill="x", padx=20, pady=(5, 15))
+
+    def load_rollups(self):
+        """Загрузка сводок с сервера"""
+        self.app.api_client.submit(
+            self.app.window,
+            "get_dashboard_rollups",
+            self.on_rollups_loaded,
+            lambda e: self.freshness_label.configure(text=f"❌ Failed to load summary: {e}"),
+            days=self.SUMMARY_DAYS
+        )
+
+    def refresh_rollups(self):
+        """Обновление сводок на сервере по кнопке"""
+        self.refresh_summary_btn.configure(state="disabled")
+        self.freshness_label.configure(text="🔄 Refreshing...")
+        self.app.api_client.submit(
+            self.app.window,
+            "refresh_rollups",
+            self.on_rollups_refreshed,
+            lambda e: self.on_rollups_refreshed({"success": False, "error": str(e)})
+        )
+
+    def on_rollups_refreshed(self, result):
+        """Обработка обновления сводок"""
+        if not self.summary_label.winfo_exists():
+            return
+        self.refresh_summary_btn.configure(state="normal")
+        if not result.get("success"):
+            self.freshness_label.configure(text="❌ Refresh failed")
+            self.app.show_error(result.get("error", "Rollup refresh failed"))
+            return
+        self.load_rollups()
+
+    def on_rollups_loaded(self, rollups):
+        """Отображение сводок и их свежести"""
+        if not self.summary_label.winfo_exists():
+            return
+        if not rollups:
+            self.freshness_label.configure(text="Summary is not available - initialize the database")
+            return
+
+        state = rollups["state"]
+        age = state.get("age_seconds")
+        if age is None:
+            freshness = "Never refreshed"
+        elif age < 60:
+            freshness = f"Updated {int(age)}s ago"
+        elif age < 3600:
+            freshness = f"Updated {int(age // 60)} min ago"
+        else:
+            freshness = f"Updated {age / 3600:.1f} h ago"
+        if state.get("pending_changes"):
+            freshness += f" · {state['pending_changes']} changes pending"
+        self.freshness_label.configure(text=freshness)
+
+        # Матрица тип атаки × опасность
+        danger_levels = self.app.danger_levels
+        matrix = {}
+        for row in rollups["by_type_danger"]:
+            matrix.setdefault(row["attack_type"], {})[row["danger"]] = row["attacks"]
+        lines = [f"{'Type':<15}" + "".join(f"{danger.title():>10}" for danger in danger_levels)]
+        for attack_type in sorted(matrix):
+            counts = matrix[attack_type]
+            lines.append(f"{attack_type.title():<15}" + "".join(f"{counts.get(danger, 0):>10}" for danger in danger_levels))
+
+        protocols = ", ".join(f"{row['protocol'].upper()}: {row['attacks']}" for row in rollups["by_protocol"])
+        lines += ["", f"Protocols: {protocols or '-'}"]
+
+        days = ", ".join(f"{row['day'].strftime('%m/%d')}: {row['attacks']} ({row['critical']} critical)"
+                         for row in rollups["by_day"])
+        lines.append(f"Last {self.SUMMARY_DAYS} days: {days or 'no attacks'}")
+
+        self.summary_label.configure(text="\n".join(lines))
+
     def create_action_card(self, parent, row, col, emoji, title, description, command):
         """Создание карточки действия"""
         card = ctk.CTkFrame(parent, fg_color=self.app.colors["card_bg"],
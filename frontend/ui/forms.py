@@ -442,7 +442,7 @@ class AttackForm:
         """Обработка успешного создания"""
         self.app.show_success(f"Attack '{name}' created successfully!")
         self.clear_form()
-        self.app.refresh_attacks()
+        self.app.refresh_after_write()
 
     def clear_form(self):
         """Очистка формы"""
@@ -1,4 +1,5 @@
 import customtkinter as ctk
+import threading
 from ui.modal_windows import AddAttackModal, DataViewModal
 
 
@@ -60,30 +61,44 @@ class MainWindow:
         ).pack(fill="x", pady=10)
 
     def create_schema(self):
-        """Создание схемы БД"""
-        try:
-            self.app.logger.log_info("Создание схемы базы данных...")
-            result = self.app.api_client.initialize_database()
-
-            if result.get('success') or result.get('status') == 'already_exists':
-                self.app.logger.log_database_operation("CREATE_SCHEMA", True)
-                if result.get('status') == 'already_exists':
-                    self.app.show_success("Таблицы уже существуют в базе данных!")
-                else:
-                    self.app.show_success("Схема базы данных успешно создана!")
-            else:
-                self.app.logger.log_database_operation("CREATE_SCHEMA", False)
-                self.app.show_error("Не удалось создать схему базы данных")
+        """Создание схемы БД (в фоне: недостающие индексы большой базы строятся долго)"""
+        self.app.logger.log_info("Создание схемы базы данных...")
+
+        def create_schema_thread():
+            try:
+                result = self.app.api_client.initialize_database()
+                self.parent.after(0, lambda: self.show_schema_result(result))
+            except Exception as e:
+                self.parent.after(0, lambda: self.show_schema_error(e))
 
-        except Exception as e:
-            # Если таблицы уже существуют - это не ошибка
-            if "409" in str(e) or "already exists" in str(e).lower():
-                self.app.logger.log_database_operation("CREATE_SCHEMA", True)
+        thread = threading.Thread(target=create_schema_thread)
+        thread.daemon = True
+        thread.start()
+
+    def show_schema_result(self, result):
+        """Вывод результата создания схемы"""
+        if result.get('success') or result.get('status') == 'already_exists':
+            self.app.logger.log_database_operation("CREATE_SCHEMA", True)
+            if result.get('message'):
+                self.app.logger.log_info(result['message'])
+            if result.get('status') == 'already_exists':
                 self.app.show_success("Таблицы уже существуют в базе данных!")
             else:
-                self.app.logger.log_error(f"Ошибка создания схемы БД: {e}")
-                self.app.logger.log_database_operation("CREATE_SCHEMA", False)
-                self.app.show_error(f"Ошибка создания схемы: {e}")
+                self.app.show_success("Схема базы данных успешно создана!")
+        else:
+            self.app.logger.log_database_operation("CREATE_SCHEMA", False)
+            self.app.show_error("Не удалось создать схему базы данных")
+
+    def show_schema_error(self, e):
+        """Вывод ошибки создания схемы"""
+        # Если таблицы уже существуют - это не ошибка
+        if "409" in str(e) or "already exists" in str(e).lower():
+            self.app.logger.log_database_operation("CREATE_SCHEMA", True)
+            self.app.show_success("Таблицы уже существуют в базе данных!")
+        else:
+            self.app.logger.log_error(f"Ошибка создания схемы БД: {e}")
+            self.app.logger.log_database_operation("CREATE_SCHEMA", False)
+            self.app.show_error(f"Ошибка создания схемы: {e}")
 
     def open_add_attack_modal(self):
         """Открытие модального окна добавления новой атаки"""
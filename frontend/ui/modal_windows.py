@@ -510,7 +510,7 @@ class AddAttackModal(ModalWindow):
 
     def on_creation_success(self, attack_name):
         """Обработка успешного создания атаки"""
-        self.app.refresh_attacks()
+        self.app.refresh_after_write()
         self.app.show_success(f"Атака '{attack_name}' успешно создана!")
         self.on_close()
 
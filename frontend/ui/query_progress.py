@@ -0,0 +1,51 @@
+import customtkinter as ctk
+
+
+class QueryProgress:
+    """Время выполнения пользовательского запроса и кнопка его отмены"""
+
+    # Период обновления времени выполнения, мс
+    TICK_MS = 100
+
+    def __init__(self, parent, app):
+        self.app = app
+        self.query = None
+
+        self.frame = ctk.CTkFrame(parent, fg_color="transparent")
+
+        self.elapsed_label = ctk.CTkLabel(self.frame, text="", text_color=self.app.colors["text_muted"])
+        self.elapsed_label.pack(side="left", padx=(0, 10))
+
+        self.cancel_btn = ctk.CTkButton(self.frame, text="⏹ Cancel", width=90,
+                                        command=self.cancel,
+                                        fg_color=self.app.colors["danger"],
+                                        state="disabled")
+        self.cancel_btn.pack(side="left")
+
+    def pack(self, **kwargs):
+        self.frame.pack(**kwargs)
+
+    def start(self, query):
+        """Начало отображения для запроса (AdhocQuery)"""
+        self.query = query
+        self.cancel_btn.configure(state="normal", text="⏹ Cancel")
+        self.tick()
+
+    def tick(self):
+        if self.query is None or not self.frame.winfo_exists():
+            return
+        self.elapsed_label.configure(text=f"⏱ {self.query.elapsed:.1f} s")
+        self.frame.after(self.TICK_MS, self.tick)
+
+    def cancel(self):
+        """Отмена текущего запроса (результат придет в обработчик ошибки запроса)"""
+        if self.query is not None:
+            self.query.cancel()
+            self.cancel_btn.configure(state="disabled", text="Cancelling...")
+
+    def finish(self):
+        """Запрос завершен: показываем итоговое время"""
+        if self.query is not None:
+            self.elapsed_label.configure(text=f"⏱ {self.query.elapsed:.2f} s")
+        self.query = None
+        self.cancel_btn.configure(state="disabled", text="⏹ Cancel")
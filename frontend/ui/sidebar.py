@@ -69,12 +69,17 @@ class Sidebar:
 
     def update_stats(self):
         """Обновление статистики"""
-        total_attacks = len(self.app.attacks)
-        critical_attacks = len([a for a in self.app.attacks if str(a.get("danger", "")).lower() == "critical"])
-        high_freq_attacks = len(
-            [a for a in self.app.attacks if str(a.get("frequency", "")).lower() in ["high", "very_high", "continuous"]])
-
-        current_time = datetime.now().strftime("%H:%M")
+        # Счетчики считает сервер (get_attack_stats)
+        stats = self.app.attack_stats
+        if not stats:
+            return
+        total_attacks = stats["total"]
+        critical_attacks = stats["critical"]
+        high_freq_attacks = stats["high_frequency"]
+
+        # Счетчики из снимка прошлого запуска показываются до ответа сервера
+        saved_at = stats.get("snapshot_saved_at")
+        current_time = f"{saved_at:%H:%M} (cached)" if saved_at else datetime.now().strftime("%H:%M")
 
         stats_text = f"""Total Attacks: {total_attacks}
 Critical: {critical_attacks}
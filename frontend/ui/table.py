@@ -1,14 +1,31 @@
 import customtkinter as ctk
-from tkinter import ttk
+from tkinter import ttk, filedialog
 import threading
 from datetime import datetime
+from utils.file_handler import FileHandler
+from api.cache import normalize_filters, attack_matches
 
 
 class AttackTable:
+    # Количество атак в одном пакете потоковой загрузки (экспорт)
+    STREAM_BATCH_SIZE = 500
+
+    # Количество атак на странице таблицы
+    PAGE_SIZE = 100
+
     def __init__(self, parent, app):
         self.app = app
         self.tree = None
         self.filtered_attacks = []
+        # Номер текущей загрузки: ответы устаревших загрузок отбрасываются
+        self.load_generation = 0
+        # Состояние keyset-пагинации
+        self.page_filters = {}
+        self.page_number = 1
+        # Курсор, которым загружена текущая страница (для ее перезагрузки)
+        self.page_cursor = None
+        self.next_cursor = None
+        self.prev_cursor = None
         self.current_filters = {
             "frequency": [],
             "danger": [],
@@ -53,7 +70,7 @@ class AttackTable:
 
         # Кнопка обновления
         refresh_btn = ctk.CTkButton(left_controls, text="🔄 Refresh Data",
-                                    command=self.refresh_table,
+                                    command=self.reload_from_server,
                                     width=140, height=36,
                                     fg_color=self.app.colors["primary"],
                                     hover_color="#1f4a63",
@@ -70,6 +87,23 @@ class AttackTable:
                                         state="disabled")
         self.delete_btn.pack(side="left", padx=(0, 15))
 
+        # Изменение опасности сразу у всех выбранных атак
+        self.bulk_danger = ctk.CTkComboBox(left_controls,
+                                           values=["low", "medium", "high", "critical"],
+                                           width=140, height=36,
+                                           command=self.set_selected_danger,
+                                           state="disabled")
+        self.bulk_danger.set("⚡ Set danger")
+        self.bulk_danger.pack(side="left", padx=(0, 15))
+
+        # Кнопка экспорта
+        export_btn = ctk.CTkButton(left_controls, text="💾 Export JSON",
+                                   command=self.export_attacks,
+                                   width=140, height=36,
+                                   fg_color=self.app.colors["secondary"],
+                                   font=ctk.CTkFont(weight="bold"))
+        export_btn.pack(side="left", padx=(0, 15))
+
         # Правая часть - фильтры
         right_controls = ctk.CTkFrame(control_content, fg_color="transparent")
         right_controls.pack(side="right")
@@ -132,6 +166,20 @@ class AttackTable:
                                          font=ctk.CTkFont(size=12))
         self.status_label.pack(side="left")
 
+        # Пагинация
+        self.next_page_btn = ctk.CTkButton(self.status_frame, text="Next ▶", width=80, height=26,
+                                           command=self.load_next_page, state="disabled")
+        self.next_page_btn.pack(side="right")
+
+        self.page_label = ctk.CTkLabel(self.status_frame, text="Page 1",
+                                       text_color=self.app.colors["text_muted"],
+                                       font=ctk.CTkFont(size=12))
+        self.page_label.pack(side="right", padx=10)
+
+        self.prev_page_btn = ctk.CTkButton(self.status_frame, text="◀ Prev", width=80, height=26,
+                                           command=self.load_prev_page, state="disabled")
+        self.prev_page_btn.pack(side="right")
+
     def create_table(self, parent):
         """Создание стилизованной таблицы"""
         # Кастомный стиль для таблицы
@@ -162,7 +210,9 @@ class AttackTable:
 
         # Создание таблицы БЕЗ колонки Actions
         columns = ("Name", "Frequency", "Danger", "Type", "Source IPs", "Ports", "Targets", "Created")
-        self.tree = ttk.Treeview(parent, columns=columns, show="headings", style="Custom.Treeview")
+        # Выбор нескольких строк (Ctrl/Shift) для массовых операций
+        self.tree = ttk.Treeview(parent, columns=columns, show="headings", style="Custom.Treeview",
+                                 selectmode="extended")
 
         # Настройка колонок с улучшенными заголовками
         column_config = {
@@ -229,87 +279,151 @@ class AttackTable:
 
     def apply_api_filters(self):
         """Применение фильтров через API"""
-        self.status_label.configure(text="🔄 Applying filters...")
-
-        def filter_thread():
-            try:
-                # Получаем отфильтрованные данные с сервера
-                frequencies = self.current_filters["frequency"]
-                danger_levels = self.current_filters["danger"]
-                attack_types = self.current_filters["attack_type"]
-                protocols = self.current_filters["protocol"]
-
-                if frequencies or danger_levels or attack_types or protocols:
-                    # Используем API фильтрацию
-                    filtered_attacks = self.app.api_client.filter_attacks_by_multiple(
-                        frequencies=frequencies,
-                        danger_levels=danger_levels,
-                        attack_types=attack_types,
-                        protocols=protocols
-                    )
-                else:
-                    # Если фильтры пустые, загружаем все атаки
-                    filtered_attacks = self.app.api_client.get_all_attacks()
-
-                # Обновляем данные в основном потоке
-                self.app.window.after(0, lambda: self.on_filters_applied(filtered_attacks))
-
-            except Exception as e:
-                self.app.window.after(0, lambda: self.show_error(f"Failed to apply filters: {e}"))
-
-        thread = threading.Thread(target=filter_thread)
-        thread.daemon = True
-        thread.start()
-
-    def on_filters_applied(self, filtered_attacks):
-        """Обработка применения фильтров"""
-        self.app.attacks = filtered_attacks
-        self.update_table_content()
-        self.status_label.configure(text=f"✅ Filters applied - {len(filtered_attacks)} attacks")
+        self.load_page(filters=dict(self.current_filters), status_text="🔄 Applying filters...")
 
     def on_row_select(self, event):
         """Обработка выбора строки"""
-        selection = self.tree.selection()
-        if selection:
-            self.delete_btn.configure(state="normal")
-        else:
-            self.delete_btn.configure(state="disabled")
+        state = "normal" if self.tree.selection() else "disabled"
+        self.delete_btn.configure(state=state)
+        self.bulk_danger.configure(state=state)
+
+    def selected_attacks(self):
+        """Выбранные строки: [(id атаки, название)]"""
+        selected = []
+        for item in self.tree.selection():
+            tags = self.tree.item(item)["tags"]
+            values = self.tree.item(item)["values"]
+            if tags:
+                selected.append((str(tags[0]), values[0] if values else "Unknown"))
+        return selected
 
     def delete_selected_attack(self):
-        """Удаление выбранной атаки"""
-        selection = self.tree.selection()
-        if not selection:
+        """Удаление выбранных атак"""
+        selected = self.selected_attacks()
+        if not selected:
             self.app.show_error("Please select an attack to delete!")
             return
 
-        item = selection[0]
-        attack_id = self.tree.item(item)["tags"][0] if self.tree.item(item)["tags"] else None
-        attack_name = self.tree.item(item)["values"][0] if self.tree.item(item)["values"] else "Unknown"
+        self.delete_attacks(selected)
 
-        if attack_id:
-            self.delete_attack(attack_id, attack_name)
+    def set_selected_danger(self, danger):
+        """Изменение уровня опасности выбранных атак одним запросом"""
+        self.bulk_danger.set("⚡ Set danger")
+        selected = self.selected_attacks()
+        if not selected:
+            return
 
-    def refresh_table(self):
-        """Обновление таблицы"""
-        self.status_label.configure(text="🔄 Loading attacks...")
+        self.status_label.configure(text=f"⚡ Updating {len(selected)} attacks...")
+        self.app.api_client.submit(
+            self.app.window,
+            "update_attacks",
+            self.on_attacks_updated,
+            lambda e: self.show_error(f"Failed to update: {e}"),
+            [attack_id for attack_id, _ in selected],
+            {"danger": danger}
+        )
+
+    def export_attacks(self):
+        """Экспорт атак с текущими фильтрами в JSON файл"""
+        filename = filedialog.asksaveasfilename(
+            title="Export attacks",
+            defaultextension=".json",
+            filetypes=[("JSON files", "*.json"), ("All files", "*.*")]
+        )
+        if not filename:
+            return
+
+        filters = dict(self.current_filters)
+        self.status_label.configure(text="💾 Exporting attacks...")
 
-        def refresh_thread():
+        def export_thread():
             try:
-                # Загружаем все атаки (игнорируем текущие фильтры)
-                attacks = self.app.api_client.get_all_attacks()
-                self.app.window.after(0, lambda: self.on_data_loaded(attacks))
+                # Атаки пишутся в файл пакетами по мере чтения из БД
+                count = FileHandler(filename).save_stream(self.app.api_client.iter_attacks(
+                    batch_size=self.STREAM_BATCH_SIZE,
+                    frequencies=filters["frequency"],
+                    danger_levels=filters["danger"],
+                    attack_types=filters["attack_type"],
+                    protocols=filters["protocol"]
+                ))
+                self.app.window.after(0, lambda: self.on_attacks_exported(count, filename))
             except Exception as e:
-                self.app.window.after(0, lambda: self.show_error(f"Failed to refresh: {e}"))
+                error = str(e)
+                self.app.window.after(0, lambda: self.show_error(f"Failed to export: {error}"))
 
-        thread = threading.Thread(target=refresh_thread)
+        thread = threading.Thread(target=export_thread)
         thread.daemon = True
         thread.start()
 
-    def on_data_loaded(self, attacks):
-        """Обработка загруженных данных"""
-        self.app.attacks = attacks
+    def on_attacks_exported(self, count, filename):
+        """Обработка успешного экспорта"""
+        self.status_label.configure(text=f"✅ Exported {count} attacks")
+        self.app.show_success(f"Exported {count} attacks to {filename}")
+
+    def refresh_table(self):
+        """Обновление таблицы"""
+        # Пока страница грузится, показываем начало уже загруженного набора (например, из снимка)
+        if not self.filtered_attacks and self.app.attacks:
+            self.filtered_attacks = self.app.attacks[:self.PAGE_SIZE]
+            self.update_table_content()
+
+        # Загружаем первую страницу всех атак (игнорируем текущие фильтры)
+        self.load_page(filters={}, status_text="🔄 Loading attacks...")
+
+    def reload_from_server(self):
+        """Обновление таблицы в обход клиентского кеша"""
+        self.app.api_client.clear_cache()
+        self.refresh_table()
+
+    def load_next_page(self):
+        """Переход на следующую страницу"""
+        if self.next_cursor:
+            self.load_page(cursor=self.next_cursor, page_number=self.page_number + 1)
+
+    def load_prev_page(self):
+        """Переход на предыдущую страницу"""
+        if self.prev_cursor:
+            self.load_page(cursor=self.prev_cursor, page_number=self.page_number - 1)
+
+    def load_page(self, cursor=None, filters=None, page_number=1, status_text="🔄 Loading page..."):
+        """Загрузка страницы атак: время не зависит от размера таблицы"""
+        if filters is not None:
+            self.page_filters = filters
+        filters = self.page_filters
+
+        self.status_label.configure(text=status_text)
+        self.load_generation += 1
+        generation = self.load_generation
+        self.page_cursor = cursor
+
+        self.app.api_client.submit(
+            self.app.window,
+            "get_attacks_page",
+            lambda page: self.on_page_loaded(generation, page, page_number),
+            lambda e: self.show_error(f"Failed to load attacks: {e}"),
+            page_size=self.PAGE_SIZE,
+            cursor=cursor,
+            frequencies=filters.get("frequency"),
+            danger_levels=filters.get("danger"),
+            attack_types=filters.get("attack_type"),
+            protocols=filters.get("protocol")
+        )
+
+    def on_page_loaded(self, generation, page, page_number):
+        """Отображение загруженной страницы"""
+        # Ответ устаревшего запроса или таблица уже закрыта
+        if generation != self.load_generation or not self.tree.winfo_exists():
+            return
+
+        self.filtered_attacks = page["items"]
+        self.next_cursor = page["next_cursor"]
+        self.prev_cursor = page["prev_cursor"]
+        self.page_number = page_number if self.prev_cursor else 1
+
         self.update_table_content()
-        self.status_label.configure(text=f"✅ Loaded {len(attacks)} attacks")
+        self.page_label.configure(text=f"Page {self.page_number}")
+        self.prev_page_btn.configure(state="normal" if self.prev_cursor else "disabled")
+        self.next_page_btn.configure(state="normal" if self.next_cursor else "disabled")
 
     def update_table_content(self):
         """Обновление содержимого таблицы"""
@@ -320,138 +434,251 @@ class AttackTable:
         for item in self.tree.get_children():
             self.tree.delete(item)
 
-        self.filtered_attacks = self.app.attacks.copy()
+        # Заполняем данными текущей страницы с проверкой структуры
+        for attack in self.filtered_attacks:
+            self.insert_attack_row(attack)
+
+        self.update_stats()
+        self.status_label.configure(text=f"✅ Showing {len(self.filtered_attacks)} attacks")
+        self.delete_btn.configure(state="disabled")
+
+    def apply_changes(self, changed, deleted_ids):
+        """Применение изменений атак из БД к открытой странице без ее перезагрузки.
 
-        # Заполняем данными с проверкой структуры
+        Строки измененных атак обновляются на месте, удаленные и переставшие подходить
+        под фильтры - убираются. Страница перезагружается, только если на нее попадает
+        атака, которой на ней не было.
+        """
+        if not self.tree or not self.tree.winfo_exists():
+            return
+
+        filters = normalize_filters({
+            "frequencies": self.page_filters.get("frequency"),
+            "danger_levels": self.page_filters.get("danger"),
+            "attack_types": self.page_filters.get("attack_type"),
+            "protocols": self.page_filters.get("protocol")
+        })
+        changed_by_id = {attack["id"]: attack for attack in changed}
+        deleted_ids = set(deleted_ids)
+
+        rows = {}
+        for item in self.tree.get_children():
+            tags = self.tree.item(item)["tags"]
+            if tags:
+                rows[str(tags[0])] = item
+        selected = {str(self.tree.item(item)["tags"][0]) for item in self.tree.selection() if self.tree.item(item)["tags"]}
+
+        kept = []
         for attack in self.filtered_attacks:
-            try:
-                # Проверяем что attack - это словарь
-                if not isinstance(attack, dict):
-                    print(f"Warning: Skipping non-dict attack: {attack}")
-                    continue
-
-                # Безопасное извлечение данных с значениями по умолчанию
-                name = attack.get("name", "Unknown")
-                frequency = attack.get("frequency", "unknown")
-                danger = attack.get("danger", "unknown")
-                attack_type = attack.get("attack_type", "unknown")
-
-                # Обработка source_ips - теперь это уже список из БД
-                source_ips = attack.get("source_ips", [])
-                if not isinstance(source_ips, list):
-                    source_ips = []
-                source_ips_preview = ", ".join(source_ips[:2])
-                if len(source_ips) > 2:
-                    source_ips_preview += "..."
-
-                # Обработка affected_ports - теперь это уже список из БД
-                affected_ports = attack.get("affected_ports", [])
-                if not isinstance(affected_ports, list):
-                    affected_ports = []
-                ports_preview = ", ".join(map(str, affected_ports[:3]))
-                if len(affected_ports) > 3:
-                    ports_preview += "..."
-
-                # Обработка targets
-                targets = attack.get("targets", [])
-                if not isinstance(targets, list):
-                    targets = []
-                targets_count = len(targets)
-
-                # Форматирование даты
-                created_date = "Unknown"
-                created_at = attack.get("created_at", "")
-                if created_at:
-                    try:
-                        # Пробуем разные форматы даты
-                        if isinstance(created_at, str):
-                            if "T" in created_at:
-                                # ISO format: 2024-01-15T10:30:00
-                                dt = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
-                            else:
-                                # PostgreSQL timestamp format: 2024-01-15 10:30:00
-                                dt = datetime.strptime(created_at, "%Y-%m-%d %H:%M:%S")
-                            created_date = dt.strftime("%m/%d/%Y")
-                        else:
-                            created_date = str(created_at)[:10]
-                    except Exception as date_error:
-                        created_date = str(created_at)[:10] if created_at else "Unknown"
-
-                # Вставляем данные в таблицу
-                item = self.tree.insert("", "end", values=(
-                    name,
-                    frequency.title(),
-                    danger.title(),
-                    attack_type.title(),
-                    source_ips_preview,
-                    ports_preview,
-                    f"🎯 {targets_count}",
-                    created_date
-                ), tags=(attack.get("id", ""),))
-
-                # Добавляем цветовое кодирование для уровня опасности
-                danger_lower = str(danger).lower()
-                if danger_lower == "critical":
-                    self.tree.set(item, "Danger", "🔴 Critical")
-                elif danger_lower == "high":
-                    self.tree.set(item, "Danger", "🟠 High")
-                elif danger_lower == "medium":
-                    self.tree.set(item, "Danger", "🟡 Medium")
-                elif danger_lower == "low":
-                    self.tree.set(item, "Danger", "🟢 Low")
+            attack_id = attack.get("id")
+            item = rows.pop(attack_id, None)
+            new_version = changed_by_id.pop(attack_id, None)
 
-            except Exception as e:
-                print(f"Error processing attack data: {e}")
-                print(f"Problematic attack data: {attack}")
+            if attack_id in deleted_ids or (new_version is not None and not attack_matches(new_version, filters)):
+                if item is not None:
+                    self.tree.delete(item)
                 continue
 
+            if new_version is not None:
+                attack = new_version
+                if item is not None:
+                    index = self.tree.index(item)
+                    self.tree.delete(item)
+                    item = self.insert_attack_row(attack, index)
+                    if item is not None and attack_id in selected:
+                        self.tree.selection_add(item)
+            kept.append(attack)
+        self.filtered_attacks = kept
+
+        # Оставшиеся изменения - атаки, которых нет на странице
+        if any(attack_matches(attack, filters) and self.belongs_on_page(attack)
+               for attack in changed_by_id.values()):
+            self.load_page(cursor=self.page_cursor, page_number=self.page_number, status_text="🔄 Updating page...")
+            return
+
         self.update_stats()
-        self.status_label.configure(text=f"✅ Loaded {len(self.filtered_attacks)} attacks")
-        self.delete_btn.configure(state="disabled")
+        self.status_label.configure(text=f"✅ Showing {len(self.filtered_attacks)} attacks")
+        if not self.tree.selection():
+            self.delete_btn.configure(state="disabled")
+
+    @staticmethod
+    def sort_key(attack):
+        """Ключ порядка строк (как в запросе страницы: created_at DESC, id DESC)"""
+        return attack.get("created_at"), attack.get("id")
+
+    def belongs_on_page(self, attack) -> bool:
+        """Попадает ли атака в диапазон текущей страницы"""
+        if not self.filtered_attacks:
+            return self.prev_cursor is None
+        key = self.sort_key(attack)
+        try:
+            if key > self.sort_key(self.filtered_attacks[0]):
+                return self.prev_cursor is None
+            if key < self.sort_key(self.filtered_attacks[-1]):
+                return self.next_cursor is None
+        except TypeError:
+            # Несравнимые значения created_at - проще перечитать страницу
+            pass
+        return True
+
+    def insert_attack_row(self, attack, index="end"):
+        """Добавление строки атаки в таблицу (возвращает элемент дерева)"""
+        try:
+            # Проверяем что attack - это словарь
+            if not isinstance(attack, dict):
+                print(f"Warning: Skipping non-dict attack: {attack}")
+                return
+
+            # Безопасное извлечение данных с значениями по умолчанию
+            name = attack.get("name", "Unknown")
+            frequency = attack.get("frequency", "unknown")
+            danger = attack.get("danger", "unknown")
+            attack_type = attack.get("attack_type", "unknown")
+
+            # Обработка source_ips - теперь это уже список из БД
+            source_ips = attack.get("source_ips", [])
+            if not isinstance(source_ips, list):
+                source_ips = []
+            source_ips_preview = ", ".join(source_ips[:2])
+            if len(source_ips) > 2:
+                source_ips_preview += "..."
+
+            # Обработка affected_ports - теперь это уже список из БД
+            affected_ports = attack.get("affected_ports", [])
+            if not isinstance(affected_ports, list):
+                affected_ports = []
+            ports_preview = ", ".join(map(str, affected_ports[:3]))
+            if len(affected_ports) > 3:
+                ports_preview += "..."
+
+            # Обработка targets
+            targets = attack.get("targets", [])
+            if not isinstance(targets, list):
+                targets = []
+            targets_count = len(targets)
+
+            # Форматирование даты
+            created_date = "Unknown"
+            created_at = attack.get("created_at", "")
+            if created_at:
+                try:
+                    # Пробуем разные форматы даты
+                    if isinstance(created_at, str):
+                        if "T" in created_at:
+                            # ISO format: 2024-01-15T10:30:00
+                            dt = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
+                        else:
+                            # PostgreSQL timestamp format: 2024-01-15 10:30:00
+                            dt = datetime.strptime(created_at, "%Y-%m-%d %H:%M:%S")
+                        created_date = dt.strftime("%m/%d/%Y")
+                    else:
+                        created_date = str(created_at)[:10]
+                except Exception as date_error:
+                    created_date = str(created_at)[:10] if created_at else "Unknown"
+
+            # Вставляем данные в таблицу
+            item = self.tree.insert("", index, values=(
+                name,
+                frequency.title(),
+                danger.title(),
+                attack_type.title(),
+                source_ips_preview,
+                ports_preview,
+                f"🎯 {targets_count}",
+                created_date
+            ), tags=(attack.get("id", ""),))
+
+            # Добавляем цветовое кодирование для уровня опасности
+            danger_lower = str(danger).lower()
+            if danger_lower == "critical":
+                self.tree.set(item, "Danger", "🔴 Critical")
+            elif danger_lower == "high":
+                self.tree.set(item, "Danger", "🟠 High")
+            elif danger_lower == "medium":
+                self.tree.set(item, "Danger", "🟡 Medium")
+            elif danger_lower == "low":
+                self.tree.set(item, "Danger", "🟢 Low")
+
+            return item
+
+        except Exception as e:
+            print(f"Error processing attack data: {e}")
+            print(f"Problematic attack data: {attack}")
 
     def update_stats(self):
         """Обновление статистики"""
-        total = len(self.app.attacks)
-        critical = len([a for a in self.app.attacks if str(a.get("danger", "")).lower() == "critical"])
-        high_freq = len([a for a in self.app.attacks if str(a.get("frequency", "")).lower() in ["high", "very_high"]])
+        # Счетчики считает сервер (get_attack_stats): таблица держит только одну страницу
+        stats = self.app.attack_stats
+        if not stats:
+            self.stats_label.configure(text="📊 Loading stats...")
+            return
+        total = stats["total"]
+        critical = stats["critical"]
+        frequencies = stats["facets"]["frequency"]
+        high_freq = frequencies["high"] + frequencies["very_high"]
 
         self.stats_label.configure(text=f"📊 Total: {total} | 🔴 Critical: {critical} | 🚀 High Freq: {high_freq}")
 
-    def delete_attack(self, attack_id, attack_name):
-        """Удаление атаки"""
+    def delete_attacks(self, attacks):
+        """Удаление атак [(id, название)] одной транзакцией"""
         import tkinter.messagebox as mb
 
+        if len(attacks) == 1:
+            description = f"the attack?\n\n📛 Name: {attacks[0][1]}"
+        else:
+            names = "\n".join(f"📛 {name}" for _, name in attacks[:5])
+            more = f"\n... and {len(attacks) - 5} more" if len(attacks) > 5 else ""
+            description = f"{len(attacks)} attacks?\n\n{names}{more}"
+
         # Диалог подтверждения с улучшенным дизайном
         result = mb.askyesno(
             "Confirm Deletion",
-            f"Are you sure you want to delete the attack?\n\n"
-            f"📛 Name: {attack_name}\n"
+            f"Are you sure you want to delete {description}\n"
             f"⚠️ This action cannot be undone!",
             icon='warning'
         )
 
         if result:
-            def delete_thread():
-                try:
-                    self.app.api_client.delete_attack(attack_id)
-                    self.app.window.after(0, lambda: self.on_attack_deleted(attack_name))
-                except Exception as e:
-                    self.app.window.after(0, lambda: self.show_error(f"Failed to delete: {e}"))
+            self.status_label.configure(text=f"🗑️ Deleting {len(attacks)} attacks...")
+            self.app.api_client.submit(
+                self.app.window,
+                "delete_attacks",
+                lambda response: self.on_attacks_deleted(response, attacks),
+                lambda e: self.show_error(f"Failed to delete: {e}"),
+                [attack_id for attack_id, _ in attacks]
+            )
+
+    def on_attacks_deleted(self, result, attacks):
+        """Обработка удаления"""
+        if not result.get("success"):
+            self.show_error(f"Failed to delete: {result.get('error')}")
+            return
 
-            self.status_label.configure(text="🗑️ Deleting attack...")
-            thread = threading.Thread(target=delete_thread)
-            thread.daemon = True
-            thread.start()
+        deleted = result["data"]["deleted"]
+        if len(attacks) == 1 and deleted:
+            self.app.show_success(f"Attack '{attacks[0][1]}' was successfully deleted!")
+        else:
+            self.app.show_success(f"{len(deleted)} attacks were successfully deleted!")
+        self.after_bulk_write()
+
+    def on_attacks_updated(self, result):
+        """Обработка массового изменения"""
+        if not result.get("success"):
+            self.show_error(f"Failed to update: {result.get('error')}")
+            return
 
-    def on_attack_deleted(self, attack_name):
-        """Обработка успешного удаления"""
-        self.app.show_success(f"Attack '{attack_name}' was successfully deleted!")
+        self.status_label.configure(text=f"✅ {result['message']}")
+        self.after_bulk_write()
 
-        # ОБНОВЛЯЕМ СТАТИСТИКУ В ДАШБОРДЕ И БОКОВОЙ ПАНЕЛИ
-        self.app.refresh_attacks()  # Это обновит данные во всем приложении
+    def after_bulk_write(self):
+        """Одно обновление таблицы после массовой операции"""
+        # При живых обновлениях изменения придут через NOTIFY одной пачкой
+        if not self.app.live_updates_active():
+            # ОБНОВЛЯЕМ СТАТИСТИКУ В ДАШБОРДЕ И БОКОВОЙ ПАНЕЛИ
+            self.app.refresh_attacks()  # Это обновит данные во всем приложении
 
-        # Обновляем таблицу
-        self.refresh_table()
+            # Обновляем таблицу
+            self.refresh_table()
 
     def show_error(self, message):
         """Показ ошибки"""
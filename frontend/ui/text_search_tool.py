@@ -1,8 +1,10 @@
 import customtkinter as ctk
-from tkinter import ttk
+from tkinter import ttk, messagebox
 import threading
 import re
 from api.client import DDOSDatabaseClient
+from api.adhoc_query import QueryCancelled
+from ui.query_progress import QueryProgress
 
 
 class TextSearchTool:
@@ -108,6 +110,10 @@ class TextSearchTool:
                                           text_color=self.app.colors["text_muted"])
         self.results_count.pack(side="right")
 
+        # Время выполнения и отмена поиска
+        self.progress = QueryProgress(results_header, self.app)
+        self.progress.pack(side="right", padx=10)
+
         # Таблица результатов
         self.results_tree = ttk.Treeview(results_frame, show="headings", height=15)
 
@@ -124,51 +130,65 @@ class TextSearchTool:
             messagebox.showwarning("Warning", "Please enter search pattern")
             return
 
+        if self.progress.query is not None:
+            messagebox.showwarning("Warning", "A search is already running - cancel it or wait for it to finish")
+            return
+
         table = self.search_table.get()
         column = self.search_column.get()
         search_type = self.search_type.get()
 
+        # Формируем SQL в зависимости от типа поиска
+        if search_type == "LIKE (Case Sensitive)":
+            sql = f"SELECT * FROM {table} WHERE {column} LIKE %s"
+            params = [f"%{pattern}%"]
+        elif search_type == "ILIKE (Case Insensitive)":
+            sql = f"SELECT * FROM {table} WHERE {column} ILIKE %s"
+            params = [f"%{pattern}%"]
+        elif search_type == "POSIX Regex (~)":
+            sql = f"SELECT * FROM {table} WHERE {column} ~ %s"
+            params = [pattern]
+        elif search_type == "POSIX Regex Case Insensitive (~*)":
+            sql = f"SELECT * FROM {table} WHERE {column} ~* %s"
+            params = [pattern]
+        elif search_type == "POSIX Regex Not Match (!~)":
+            sql = f"SELECT * FROM {table} WHERE {column} !~ %s"
+            params = [pattern]
+        elif search_type == "POSIX Regex Not Match Case Insensitive (!~*)":
+            sql = f"SELECT * FROM {table} WHERE {column} !~* %s"
+            params = [pattern]
+
+        query = self.app.api_client.adhoc_query(sql, params)
+        self.progress.start(query)
+        self.results_count.configure(text="Searching...")
+
         def search_thread():
             try:
-                conn = self.app.api_client.db.get_connection()
-                cursor = conn.cursor()
-
-                # Формируем SQL в зависимости от типа поиска
-                if search_type == "LIKE (Case Sensitive)":
-                    sql = f"SELECT * FROM {table} WHERE {column} LIKE %s"
-                    params = [f"%{pattern}%"]
-                elif search_type == "ILIKE (Case Insensitive)":
-                    sql = f"SELECT * FROM {table} WHERE {column} ILIKE %s"
-                    params = [f"%{pattern}%"]
-                elif search_type == "POSIX Regex (~)":
-                    sql = f"SELECT * FROM {table} WHERE {column} ~ %s"
-                    params = [pattern]
-                elif search_type == "POSIX Regex Case Insensitive (~*)":
-                    sql = f"SELECT * FROM {table} WHERE {column} ~* %s"
-                    params = [pattern]
-                elif search_type == "POSIX Regex Not Match (!~)":
-                    sql = f"SELECT * FROM {table} WHERE {column} !~ %s"
-                    params = [pattern]
-                elif search_type == "POSIX Regex Not Match Case Insensitive (!~*)":
-                    sql = f"SELECT * FROM {table} WHERE {column} !~* %s"
-                    params = [pattern]
-
-                cursor.execute(sql, params)
-                results = cursor.fetchall()
-                columns = [desc[0] for desc in cursor.description]
-
-                conn.close()
-
+                columns, results = query.run()
                 # Обновляем UI
-                self.app.window.after(0, lambda: self.display_search_results(columns, results, pattern))
-
+                self.app.window.after(0, lambda: self.on_search_finished(columns, results, pattern))
             except Exception as e:
-                self.app.window.after(0, lambda: messagebox.showerror("Error", f"Search failed: {e}"))
+                error = e
+                self.app.window.after(0, lambda: self.on_search_failed(error))
 
         thread = threading.Thread(target=search_thread)
         thread.daemon = True
         thread.start()
 
+    def on_search_finished(self, columns, results, pattern):
+        """Поиск выполнен"""
+        self.progress.finish()
+        self.display_search_results(columns, results, pattern)
+
+    def on_search_failed(self, error):
+        """Поиск завершился ошибкой или был отменен"""
+        self.progress.finish()
+        if isinstance(error, QueryCancelled) and not error.timed_out:
+            self.results_count.configure(text="Search cancelled")
+            return
+        self.results_count.configure(text="Search failed")
+        messagebox.showerror("Error", f"Search failed: {error}")
+
     def display_search_results(self, columns, results, pattern):
         """Отображение результатов поиска"""
         # Очищаем таблицу
@@ -1,6 +1,7 @@
+import csv
 import json
 import os
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterable, Sequence
 
 class FileHandler:
     def __init__(self, filename: str):
@@ -19,4 +20,28 @@ class FileHandler:
     def save_data(self, data: List[Dict[str, Any]]):
         """Сохранение данных в файл"""
         with open(self.filename, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
\ No newline at end of file
+            json.dump(data, f, ensure_ascii=False, indent=2)
+
+    def save_stream(self, chunks: Iterable[List[Dict[str, Any]]]) -> int:
+        """Потоковое сохранение данных в файл пакетами, без загрузки всего набора в память"""
+        count = 0
+        with open(self.filename, 'w', encoding='utf-8') as f:
+            f.write("[")
+            for chunk in chunks:
+                for item in chunk:
+                    f.write(",\n" if count else "\n")
+                    json.dump(item, f, ensure_ascii=False, default=str)
+                    count += 1
+            f.write("\n]" if count else "]")
+        return count
+
+    def save_rows_stream(self, columns: Sequence[str], chunks: Iterable[List[Sequence[Any]]]) -> int:
+        """Потоковое сохранение строк результата запроса в CSV пакетами"""
+        count = 0
+        with open(self.filename, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(columns)
+            for chunk in chunks:
+                writer.writerows(chunk)
+                count += len(chunk)
+        return count